@@ -34,6 +34,7 @@ setup(
         ],
         'mysql': ['mysql-connector-python-rf==2.2.2'],
         'postgresql': ['psycopg2==2.8.4'],
+        'numpy': ['numpy'],
     },
     zip_safe=True,
     license='Apache License, Version 2.0',
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import and_, func, select
+from sqlalchemy.inspection import inspect
+
+from .exceptions import BadSortFormat
+from .models import Field, get_relationship, sqlalchemy_version_lt
+
+
+AGGREGATES = ('count', 'max', 'min', 'sum')
+
+JOINED_AGGREGATE_DIALECTS = {'mysql'}
+"""
+Dialects where aggregates are computed once, in a ``GROUP BY`` subquery
+joined to the query, instead of with a correlated subquery per row, which
+their databases run as a dependent subquery.
+"""
+
+AGGREGATE_LABEL = 'aggregate'
+
+
+def get_relationship_field(model, field_name):
+    """ Split `field_name` (e.g. ``'foos'`` or ``'foos.count'``) into a
+    relationship of `model` and the name of a field of its target, if any.
+    """
+    relationship_name, _, target_field_name = field_name.partition('.')
+    relationship = get_relationship(model, relationship_name)
+    if relationship.target is relationship.parent.local_table:
+        raise BadSortFormat(
+            'Aggregates over the self-referential relationship `{}` are not '
+            'supported.'.format(relationship_name)
+        )
+    return relationship, target_field_name or None
+
+
+def get_aggregate_function(model, field_name, aggregate):
+    """ Return the relationship of `model` named by `field_name` and the
+    `aggregate` function of its target rows.
+
+    ``count`` without a target field counts the related rows. With a field,
+    as for the rest of the aggregates, only its non null values are used.
+    `aggregate` is one of :data:`AGGREGATES`, as validated by :class:`Sort`.
+    """
+    relationship, target_field_name = get_relationship_field(
+        model, field_name
+    )
+    if target_field_name is None:
+        if aggregate != 'count':
+            raise BadSortFormat(
+                'Aggregate `{}` needs a field of the related model, e.g. '
+                '`{}.id`.'.format(aggregate, field_name)
+            )
+        return relationship, func.count()
+
+    target_field = Field(
+        relationship.mapper.class_, target_field_name
+    ).get_sqlalchemy_field()
+    return relationship, getattr(func, aggregate)(target_field)
+
+
+def _get_from_clause(relationship):
+    if relationship.secondary is not None:
+        return relationship.secondary.join(
+            relationship.target, relationship.secondaryjoin
+        )
+    return relationship.target
+
+
+def _scalar_subquery(statement):
+    if sqlalchemy_version_lt('1.4'):  # pragma: no_cover_sqlalchemy_gte_1_4
+        return statement.as_scalar()
+    return statement.scalar_subquery()  # pragma: no_cover_sqlalchemy_lt_1_4
+
+
+def correlated_aggregate(model, field_name, aggregate):
+    """ Return a scalar subquery with the `aggregate` of the rows related to
+    each row of `model` through the relationship named by `field_name`.
+    """
+    relationship, function = get_aggregate_function(
+        model, field_name, aggregate
+    )
+    from_clause = _get_from_clause(relationship)
+
+    statement = select([function]).select_from(from_clause).where(
+        relationship.primaryjoin
+    )
+    if relationship.secondary is not None:
+        statement = statement.correlate_except(
+            relationship.secondary, relationship.target
+        )
+    else:
+        statement = statement.correlate_except(relationship.target)
+    return _scalar_subquery(statement)
+
+
+def joined_aggregate(query, model, field_name, aggregate):
+    """ Join to `query` a subquery with the `aggregate` of the related rows
+    of every row of `model`, grouped by their foreign key.
+
+    :returns:
+        The joined query, and the aggregated column. Counts are `0`
+        instead of `NULL` for rows without related rows, as with
+        :func:`correlated_aggregate`.
+    """
+    relationship, function = get_aggregate_function(
+        model, field_name, aggregate
+    )
+
+    if relationship.secondary is not None:
+        pairs = relationship.synchronize_pairs
+    else:
+        pairs = relationship.local_remote_pairs
+    keys = [
+        remote.label('key_{}'.format(position))
+        for position, (_, remote) in enumerate(pairs)
+    ]
+
+    subquery = select(
+        keys + [function.label(AGGREGATE_LABEL)]
+    ).select_from(_get_from_clause(relationship)).group_by(
+        *[remote for _, remote in pairs]
+    ).alias()
+
+    query = query.outerjoin(subquery, and_(*[
+        getattr(model, inspect(model).get_property_by_column(local).key) ==
+        subquery.c['key_{}'.format(position)]
+        for position, (local, _) in enumerate(pairs)
+    ]))
+
+    column = subquery.c[AGGREGATE_LABEL]
+    if aggregate == 'count':
+        column = func.coalesce(column, 0)
+    return query, column
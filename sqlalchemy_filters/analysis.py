@@ -0,0 +1,608 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import namedtuple
+
+from six import string_types
+from sqlalchemy import Column, UniqueConstraint, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.inspection import inspect
+from sqlalchemy.sql.elements import (
+    BinaryExpression, BindParameter, BooleanClauseList, UnaryExpression
+)
+from sqlalchemy.sql.operators import (
+    and_, desc_op, eq, nullsfirst_op, nullslast_op
+)
+
+from .aggregates import get_aggregate_function
+from .exceptions import UnindexedSpec
+from .filters import build_filters, get_named_models as get_filter_models
+from .models import (
+    Field, auto_join, get_default_model, get_json_path, get_model_from_spec
+)
+from .specs import (
+    SORT_ASCENDING, SORT_DESCENDING, Sort, get_sort_models,
+    get_tiebreaker_sorts
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+STRICT_LOG = 'log'
+STRICT_RAISE = 'raise'
+
+UNINDEXED = 'unindexed'
+LEADING_WILDCARD = 'leading_wildcard'
+CASE_INSENSITIVE = 'case_insensitive'
+EXPRESSION = 'expression'
+MULTIPLE_TABLES = 'multiple_tables'
+UNORDERED = 'unordered'
+
+PATTERN_OPERATORS = ('like', 'ilike', 'not_ilike')
+CASE_INSENSITIVE_OPERATORS = ('ilike', 'not_ilike')
+
+NULLS_FIRST = 'first'
+NULLS_LAST = 'last'
+
+NULLS_LARGEST_DIALECTS = {'postgresql', 'oracle'}
+"""
+Dialects whose databases sort ``NULL`` values as larger than any other
+value, i.e. last in ascending order. The rest sort them first.
+"""
+
+
+IndexInfo = namedtuple('IndexInfo', ['name', 'columns', 'unique', 'nulls'])
+"""
+An index usable by the database: ``columns`` is a tuple of
+``(column, direction)`` pairs in index order, and ``nulls`` the explicit
+placement of ``NULL`` values of each column (``'first'``, ``'last'`` or
+`None` for the default of the database).
+"""
+
+Issue = namedtuple('Issue', ['code', 'model', 'field', 'op', 'message'])
+
+
+class LintReport(namedtuple('LintReport', ['predicates', 'sorts', 'issues'])):
+    """ Result of analysing filter and sort specs against the indexes
+    declared on the models.
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return not self.issues
+
+    def as_metrics(self):
+        """ Return a flat dictionary of counters, suitable to be exported
+        as metrics.
+        """
+        metrics = {
+            'predicates': self.predicates,
+            'sorts': self.sorts,
+            'issues': len(self.issues),
+        }
+        for issue in self.issues:
+            key = 'issues.{}'.format(issue.code)
+            metrics[key] = metrics.get(key, 0) + 1
+        return metrics
+
+
+def get_table_indexes(table):
+    """ Return the :class:`IndexInfo` of every index, primary key and unique
+    constraint declared on `table`.
+
+    Functional indexes are skipped, as they can't be matched against plain
+    column predicates.
+    """
+    indexes = []
+
+    primary_key = list(table.primary_key.columns)
+    if primary_key:
+        indexes.append(IndexInfo(
+            table.primary_key.name,
+            tuple((column, SORT_ASCENDING) for column in primary_key),
+            True,
+            (None,) * len(primary_key),
+        ))
+
+    for index in sorted(table.indexes, key=lambda index: index.name or ''):
+        columns, nulls = _get_index_columns(index.expressions)
+        if columns:
+            indexes.append(
+                IndexInfo(index.name, columns, bool(index.unique), nulls)
+            )
+
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.columns:
+            indexes.append(IndexInfo(
+                constraint.name,
+                tuple((column, SORT_ASCENDING) for column in constraint.columns),
+                True,
+                (None,) * len(constraint.columns),
+            ))
+
+    return indexes
+
+
+def _get_index_columns(expressions):
+    columns = []
+    nulls = []
+    for expression in expressions:
+        direction = SORT_ASCENDING
+        placement = None
+        if isinstance(expression, UnaryExpression) and (
+            expression.modifier in (nullsfirst_op, nullslast_op)
+        ):
+            if expression.modifier is nullsfirst_op:
+                placement = NULLS_FIRST
+            else:
+                placement = NULLS_LAST
+            expression = expression.element
+        if isinstance(expression, UnaryExpression):
+            if expression.modifier is desc_op:
+                direction = SORT_DESCENDING
+            expression = expression.element
+        if not isinstance(expression, Column):
+            break
+        columns.append((expression, direction))
+        nulls.append(placement)
+    return tuple(columns), tuple(nulls)
+
+
+def is_indexed(column):
+    """ Whether `column` is the leading column of any index. """
+    return any(
+        index.columns[0][0] is column
+        for index in get_table_indexes(column.table)
+    )
+
+
+def _get_column(model, field_name):
+    """ Return the :class:`sqlalchemy.Column` mapped to `field_name`, or
+    `None` if the field is not a plain column (e.g. a hybrid attribute).
+    """
+    Field(model, field_name).get_sqlalchemy_field()
+
+    column = inspect(model).columns.get(field_name)
+    if isinstance(column, Column):
+        return column
+
+
+def _iter_leaf_filters(filters):
+    for filter in filters:
+        if hasattr(filter, 'filters'):
+            for leaf in _iter_leaf_filters(filter.filters):
+                yield leaf
+        else:
+            yield filter
+
+
+def _check_column(model, field_name, op, issues):
+    column = _get_column(model, field_name)
+    if column is None and get_json_path(model, field_name) is not None:
+        issues.append(Issue(
+            EXPRESSION, model.__name__, field_name, op,
+            '`{}.{}` is a JSON path and needs a matching expression '
+            'index.'.format(model.__name__, field_name)
+        ))
+    elif column is None:
+        issues.append(Issue(
+            EXPRESSION, model.__name__, field_name, op,
+            '`{}.{}` is not a plain column and cannot use an index.'.format(
+                model.__name__, field_name
+            )
+        ))
+    elif not is_indexed(column):
+        issues.append(Issue(
+            UNINDEXED, model.__name__, field_name, op,
+            '`{}.{}` is not the leading column of any index.'.format(
+                model.__name__, field_name
+            )
+        ))
+
+
+def _lint_filter(filter, query, default_model, issues):
+    model = get_model_from_spec(filter.filter_spec, query, default_model)
+    field_name = filter.filter_spec['field']
+    op = filter.operator.operator
+
+    _check_column(model, field_name, op, issues)
+
+    if (
+        op in PATTERN_OPERATORS and
+        isinstance(filter.value, string_types) and
+        filter.value[:1] in ('%', '_')
+    ):
+        issues.append(Issue(
+            LEADING_WILDCARD, model.__name__, field_name, op,
+            'Pattern `{}` starts with a wildcard.'.format(filter.value)
+        ))
+    if op in CASE_INSENSITIVE_OPERATORS:
+        issues.append(Issue(
+            CASE_INSENSITIVE, model.__name__, field_name, op,
+            '`{}` cannot use a plain index on `{}.{}`.'.format(
+                op, model.__name__, field_name
+            )
+        ))
+
+
+def _get_aggregate_issue(model, sort):
+    get_aggregate_function(model, sort.field_name, sort.aggregate)
+    return Issue(
+        EXPRESSION, model.__name__, sort.field_name, None,
+        '`{}.{}` is sorted by its `{}` and cannot use an index.'.format(
+            model.__name__, sort.field_name, sort.aggregate
+        )
+    )
+
+
+def lint_spec(query, filter_spec=None, sort_spec=None, strict=None):
+    """Check that filter and sort specs can be served by an index.
+
+    Every predicate and sort key is resolved against `query` the same way
+    :func:`~sqlalchemy_filters.apply_filters` and
+    :func:`~sqlalchemy_filters.apply_sort` would, and compared with the
+    indexes, primary keys and unique constraints declared on the tables.
+
+    :param query:
+        A :class:`sqlalchemy.orm.Query` instance.
+
+    :param filter_spec:
+        A filter spec, as accepted by ``apply_filters``.
+
+    :param sort_spec:
+        A sort spec, as accepted by ``apply_sort``.
+
+    :param strict:
+        ``None`` (default) to only return the report, ``'log'`` to also log
+        a warning per issue, or ``'raise'`` to raise
+        :class:`~sqlalchemy_filters.exceptions.UnindexedSpec` if any issue
+        is found.
+
+    :returns:
+        A :class:`LintReport` with the number of predicates and sort keys
+        checked and the list of :class:`Issue` found.
+    """
+    if strict not in (None, STRICT_LOG, STRICT_RAISE):
+        raise ValueError('Strict mode `{}` not valid.'.format(strict))
+
+    filters = build_filters(filter_spec) if filter_spec is not None else []
+
+    if isinstance(sort_spec, dict):
+        sort_spec = [sort_spec]
+    sorts = [Sort(item) for item in sort_spec or []]
+
+    default_model = get_default_model(query)
+    query = auto_join(
+        query, *(get_filter_models(filters) | get_sort_models(sorts))
+    )
+
+    issues = []
+
+    predicates = 0
+    for filter in _iter_leaf_filters(filters):
+        predicates += 1
+        _lint_filter(filter, query, default_model, issues)
+
+    for sort in sorts:
+        model = get_model_from_spec(sort.sort_spec, query, default_model)
+        if sort.aggregate is not None:
+            issues.append(_get_aggregate_issue(model, sort))
+        else:
+            _check_column(model, sort.field_name, None, issues)
+
+    report = LintReport(predicates, len(sorts), issues)
+
+    if strict == STRICT_LOG:
+        for issue in issues:
+            logger.warning(issue.message)
+    elif strict == STRICT_RAISE and issues:
+        raise UnindexedSpec(
+            ' '.join(issue.message for issue in issues)
+        )
+
+    return report
+
+
+class SortPlan(namedtuple('SortPlan', ['index', 'backward', 'issues'])):
+    """ Result of matching the ``ORDER BY`` of a sort spec against the
+    indexes of a table: `index` is the :class:`IndexInfo` that returns the
+    rows in order, if any, scanned `backward` or not.
+    """
+
+    __slots__ = ()
+
+    @property
+    def index_ordered(self):
+        """ Whether the rows can be read in order, without sorting them. """
+        return not self.issues
+
+
+def _default_nulls(dialect_name, direction):
+    nulls_last = (direction == SORT_ASCENDING) == (
+        dialect_name in NULLS_LARGEST_DIALECTS
+    )
+    return NULLS_LAST if nulls_last else NULLS_FIRST
+
+
+def _flip_nulls(placement):
+    return NULLS_FIRST if placement == NULLS_LAST else NULLS_LAST
+
+
+def _describe_sort_key(column, direction, nulls):
+    description = '{} {}'.format(column.name, direction.upper())
+    if nulls is not None:
+        description += ' NULLS {}'.format(nulls.upper())
+    return description
+
+
+def _get_equality_columns(clause):
+    """ Return the columns compared to a value with ``=`` in the ``WHERE``
+    clause of a query, outside of any ``OR`` or ``NOT``.
+    """
+    if clause is None:
+        return set()
+    if isinstance(clause, BooleanClauseList):
+        if clause.operator is not and_:
+            return set()
+        columns = set()
+        for child in clause.clauses:
+            columns |= _get_equality_columns(child)
+        return columns
+    if isinstance(clause, BinaryExpression) and clause.operator is eq:
+        for column, value in (
+            (clause.left, clause.right), (clause.right, clause.left)
+        ):
+            if isinstance(value, BindParameter):
+                return set(
+                    proxy for proxy in column.proxy_set
+                    if isinstance(proxy, Column)
+                )
+    return set()
+
+
+def _match_index(index, keys, dialect_name, equal_columns=()):
+    """ Return whether `index` returns rows in the order of `keys` when
+    scanned backward, or `None` if it can't return them in that order.
+
+    Columns of the index in `equal_columns` hold a single value, and are
+    skipped.
+    """
+    backward = None
+    position = 0
+    for column, direction, nulls in keys:
+        while (
+            position < len(index.columns) and
+            index.columns[position][0] is not column and
+            index.columns[position][0] in equal_columns
+        ):
+            position += 1
+
+        if position == len(index.columns):
+            # the rows are unique on the columns of the index, so they
+            # are in order whatever the rest of the keys are
+            return backward if index.unique else None
+
+        index_column, index_direction = index.columns[position]
+        if index_column is not column:
+            return None
+
+        reverse = direction != index_direction
+        if backward is None:
+            backward = reverse
+        elif backward != reverse:
+            return None
+
+        if column.nullable:
+            index_nulls = index.nulls[position] or _default_nulls(
+                dialect_name, index_direction
+            )
+            if reverse:
+                index_nulls = _flip_nulls(index_nulls)
+            if index_nulls != (
+                nulls or _default_nulls(dialect_name, direction)
+            ):
+                return None
+
+        position += 1
+
+    return backward
+
+
+def plan_sort(query, sort_spec, tiebreaker=False):
+    """Check whether the ``ORDER BY`` of a sort spec can be served by
+    reading an index in order, instead of sorting the rows.
+
+    The sort keys, including the tiebreaker and the ``nullsfirst`` and
+    ``nullslast`` attributes, must be a prefix of the columns of an index,
+    primary key or unique constraint declared on the same table, all in
+    the order of the index or all in the reverse order (a backward scan).
+    Columns compared to a value with ``=`` in the filters of `query` hold
+    a single value: they can be skipped in the index, and are ignored in
+    the sort keys, e.g. ``WHERE a = ? ORDER BY b`` can read an index on
+    ``(a, b)`` in order.
+    ``NULL`` values must be placed as the database places them in the
+    index, which depends on the dialect of the session of `query`.
+
+    :param query:
+        A :class:`sqlalchemy.orm.Query` instance.
+
+    :param sort_spec:
+        A sort spec, as accepted by ``apply_sort``.
+
+    :param tiebreaker:
+        As in ``apply_sort``.
+
+    :returns:
+        A :class:`SortPlan`.
+    """
+    if isinstance(sort_spec, dict):
+        sort_spec = [sort_spec]
+    sorts = [Sort(item) for item in sort_spec]
+    if tiebreaker:
+        sorts += get_tiebreaker_sorts(query, sorts, tiebreaker)
+
+    default_model = get_default_model(query)
+    query = auto_join(query, *get_sort_models(sorts))
+
+    session = query.session
+    dialect_name = session.get_bind().dialect.name if session else None
+
+    equal_columns = _get_equality_columns(query.whereclause)
+
+    issues = []
+    keys = []
+    for sort in sorts:
+        model = get_model_from_spec(sort.sort_spec, query, default_model)
+        if sort.aggregate is not None:
+            issues.append(_get_aggregate_issue(model, sort))
+            continue
+
+        column = _get_column(model, sort.field_name)
+        if column is None or sort.rank is not None:
+            issues.append(Issue(
+                EXPRESSION, model.__name__, sort.field_name, None,
+                '`{}.{}` is not sorted by a plain column and cannot use an '
+                'index.'.format(model.__name__, sort.field_name)
+            ))
+            continue
+
+        if column in equal_columns:
+            continue
+
+        nulls = None
+        if sort.nullsfirst:
+            nulls = NULLS_FIRST
+        elif sort.nullslast:
+            nulls = NULLS_LAST
+        keys.append((column, sort.direction, nulls))
+
+    if issues or not keys:
+        return SortPlan(None, False, issues)
+
+    tables = []
+    for column, _, _ in keys:
+        if column.table not in tables:
+            tables.append(column.table)
+    if len(tables) > 1:
+        return SortPlan(None, False, [Issue(
+            MULTIPLE_TABLES, None, None, None,
+            'Sort keys on tables {} cannot be served by a single '
+            'index.'.format(', '.join(
+                '`{}`'.format(table.name) for table in tables
+            ))
+        )])
+
+    for index in get_table_indexes(tables[0]):
+        backward = _match_index(index, keys, dialect_name, equal_columns)
+        if backward is not None:
+            return SortPlan(index, backward, [])
+
+    return SortPlan(None, False, [Issue(
+        UNORDERED, None, None, None,
+        'No index on `{}` matches ORDER BY {}.'.format(
+            tables[0].name,
+            ', '.join(_describe_sort_key(*key) for key in keys)
+        )
+    )])
+
+
+def estimate_rows(session, table):
+    """ Return the number of rows of `table` estimated by the statistics of
+    the database, or `None` if it's not known.
+
+    PostgreSQL and MySQL estimates come from their catalogs, and SQLite
+    estimates from ``sqlite_stat1``: the number of rows of SQLite tables
+    that have not been analysed is not known, as counting them would scan
+    the whole table.
+    """
+    dialect_name = session.get_bind().dialect.name
+    try:
+        if dialect_name == 'postgresql':
+            rows = session.execute(
+                text(
+                    'SELECT reltuples FROM pg_class '
+                    'WHERE oid = CAST(:name AS regclass)'
+                ),
+                {'name': table.fullname},
+            ).scalar()
+        elif dialect_name == 'mysql':
+            rows = session.execute(
+                text(
+                    'SELECT table_rows FROM information_schema.tables '
+                    'WHERE table_schema = DATABASE() AND table_name = :name'
+                ),
+                {'name': table.name},
+            ).scalar()
+        elif dialect_name == 'sqlite':
+            rows = _estimate_sqlite_rows(session, table)
+        else:
+            return None
+    except DBAPIError:
+        return None
+
+    if rows is None or rows < 0:
+        return None
+    return int(rows)
+
+
+def _estimate_sqlite_rows(session, table):
+    analysed = session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+        "AND name = 'sqlite_stat1'"
+    )).scalar()
+    if analysed:
+        stat = session.execute(
+            text('SELECT stat FROM sqlite_stat1 WHERE tbl = :name'),
+            {'name': table.name},
+        ).scalar()
+        if stat:
+            return int(stat.split()[0])
+    return None
+
+
+def check_sort(query, sort_spec, tiebreaker=False, strict=STRICT_RAISE,
+               max_rows=None):
+    """Reject sort specs that can't be served by an index, as returned by
+    :func:`plan_sort`, if the table of the queried model has more than
+    `max_rows` rows according to :func:`estimate_rows`. Any sort that
+    can't use an index is rejected if `max_rows` is `None`, or if the
+    number of rows is not known (e.g. `query` has no session).
+
+    :param strict:
+        ``'log'`` to log a warning per issue, or ``'raise'`` (default) to
+        raise :class:`~sqlalchemy_filters.exceptions.UnindexedSpec`.
+
+    :returns:
+        The :class:`SortPlan` of the sort spec.
+    """
+    if strict not in (STRICT_LOG, STRICT_RAISE):
+        raise ValueError('Strict mode `{}` not valid.'.format(strict))
+
+    plan = plan_sort(query, sort_spec, tiebreaker)
+    if plan.index_ordered:
+        return plan
+
+    rows = None
+    if max_rows is not None and query.session is not None:
+        model = get_default_model(query)
+        if model is None:
+            model = query.column_descriptions[0]['entity']
+        rows = estimate_rows(query.session, inspect(model).local_table)
+        if rows is not None and rows <= max_rows:
+            return plan
+
+    messages = [issue.message for issue in plan.issues]
+    if rows is not None:
+        messages.append(
+            'The sort would be done over an estimate of {} rows.'.format(rows)
+        )
+
+    if strict == STRICT_LOG:
+        for message in messages:
+            logger.warning(message)
+    else:
+        raise UnindexedSpec(' '.join(messages))
+
+    return plan
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import and_, case, func, literal
+from sqlalchemy.inspection import inspect
+
+from .aggregates import _scalar_subquery
+from .exceptions import BadQuery
+from .filters import (
+    apply_filters, build_filters, format_filters, get_named_models,
+    join_filter_models
+)
+from .instrumentation import instrumented
+from .models import get_default_model, get_query_models
+
+
+SPEC_INDEX_LABEL = 'spec_index'
+
+
+def union_filters(query, filter_specs, use_exists=False):
+    """Build a single ``UNION ALL`` query with the results of applying each
+    of `filter_specs` to `query`.
+
+    Each row has an extra ``spec_index`` column with the position of the
+    filter spec that returned it. The base query should not be ordered or
+    limited, as most databases don't allow it in the members of a union.
+
+    :returns:
+        A :class:`sqlalchemy.orm.Query` instance, or `None` if
+        `filter_specs` is empty.
+    """
+    queries = [
+        apply_filters(query, filter_spec, use_exists=use_exists).add_columns(
+            literal(index).label(SPEC_INDEX_LABEL)
+        )
+        for index, filter_spec in enumerate(filter_specs)
+    ]
+    if not queries:
+        return None
+    return queries[0].union_all(*queries[1:])
+
+
+@instrumented('apply_filters_batch')
+def apply_filters_batch(query, filter_specs, use_exists=False):
+    """Apply each of `filter_specs` to `query`, in a single round trip.
+
+    :param query:
+        A :class:`sqlalchemy.orm.Query` instance, shared by all the specs.
+
+    :param filter_specs:
+        A list of filter specs, as accepted by ``apply_filters``.
+
+    :param use_exists:
+        As in ``apply_filters``.
+
+    :returns:
+        A list with the results of each filter spec, in order.
+
+    Basic usage::
+
+        foos_1, foos_2 = apply_filters_batch(
+            session.query(Foo), [filter_spec_1, filter_spec_2]
+        )
+    """
+    results = [[] for _ in filter_specs]
+
+    union_query = union_filters(query, filter_specs, use_exists)
+    if union_query is None:
+        return results
+
+    for row in union_query:
+        *entities, spec_index = row
+        results[spec_index].append(
+            entities[0] if len(entities) == 1 else tuple(entities)
+        )
+    return results
+
+
+def _supports_aggregate_filter(dialect):
+    """ Whether `dialect` supports ``count(*) FILTER (WHERE ...)``. """
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 30)
+    return False
+
+
+@instrumented('count_filters_batch')
+def count_filters_batch(query, filter_specs, use_exists=False):
+    """Count the results of applying each of `filter_specs` to `query`, with
+    a single statement of conditional aggregates.
+
+    The count of each spec is computed with ``count(...) FILTER (WHERE
+    ...)`` where it's supported (PostgreSQL and SQLite 3.30+), and with
+    ``count(CASE WHEN ... END)`` otherwise.
+
+    Specs that need to join other models are counted in their own
+    subquery of the same statement, as ``apply_filters(...).count()``
+    would, so that their joins don't change the counts of the other specs.
+    With `use_exists`, the models reachable through relationships are
+    filtered with ``EXISTS`` instead, and need no subquery.
+
+    :returns:
+        A list with the number of results of each filter spec, in order.
+
+    :raise BadQuery:
+        If the first column of `query` is not a model or one of its
+        attributes, e.g. ``session.query(func.count('*'))``.
+    """
+    if not filter_specs:
+        return []
+
+    # counting the primary key of the queried entity makes it part of the
+    # `FROM` clause, even if no filter refers to it
+    entity = query.column_descriptions[0]['entity']
+    if entity is None:
+        raise BadQuery(
+            'Counting filter specs needs a query whose first column is a '
+            'model or one of its attributes.'
+        )
+    primary_key = inspect(entity).primary_key[0]
+
+    all_filters = [build_filters(filter_spec) for filter_spec in filter_specs]
+    default_model = get_default_model(query)
+    query_models = set(get_query_models(query))
+
+    _, exists_paths = join_filter_models(
+        query,
+        [filter for filters in all_filters for filter in filters],
+        do_auto_join=False,
+        use_exists=use_exists,
+    )
+
+    use_filter = _supports_aggregate_filter(query.session.get_bind().dialect)
+
+    counts = []
+    for filter_spec, filters in zip(filter_specs, all_filters):
+        if get_named_models(filters) - query_models - set(exists_paths):
+            counts.append(_scalar_subquery(
+                apply_filters(
+                    query, filter_spec, use_exists=use_exists
+                ).order_by(None).with_entities(func.count(primary_key))
+            ))
+            continue
+
+        clauses = format_filters(
+            filters, query, default_model, exists_paths=exists_paths
+        )
+        if not clauses:
+            counts.append(func.count(primary_key))
+        elif use_filter:
+            counts.append(func.count(primary_key).filter(and_(*clauses)))
+        else:
+            counts.append(
+                func.count(case([(and_(*clauses), primary_key)]))
+            )
+
+    return list(query.order_by(None).with_entities(*counts).one())
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import Table, event
+from sqlalchemy.inspection import inspect
+from sqlalchemy.sql import visitors
+
+from .instrumentation import count, instrumented, stage
+
+
+FLUSHED_TABLES_KEY = 'sqlalchemy_filters_flushed_tables'
+"""
+The key of the session ``info`` with the tables written by the flushes of
+the current transaction.
+"""
+
+
+class LRUBackend(object):
+    """An in-process cache backend that keeps the `maxsize` most recently
+    used entries.
+
+    Backends store bytes under string keys, and must implement ``get``
+    (returning `None` for missing keys), ``set``, ``delete`` and ``clear``.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_statement_tables(statement):
+    """ Return the names of the tables read by `statement`, including the
+    ones in joins and subqueries.
+    """
+    return {
+        element.name for element in visitors.iterate(statement, {})
+        if isinstance(element, Table)
+    }
+
+
+def get_flushed_tables(session):
+    """ Return the names of the tables written by the flush of `session`,
+    including the association tables of the modified relationships.
+    """
+    tables = set()
+    for instance in set(session.new) | set(session.dirty) | set(
+        session.deleted
+    ):
+        state = inspect(instance)
+        mapper = state.mapper
+        tables.update(table.name for table in mapper.tables)
+        for relationship in mapper.relationships:
+            if (
+                relationship.secondary is not None and
+                state.attrs[relationship.key].history.has_changes()
+            ):
+                tables.add(relationship.secondary.name)
+    return tables
+
+
+def _has_uncommitted_changes(session):
+    return bool(
+        session.info.get(FLUSHED_TABLES_KEY) or
+        session.new or session.dirty or session.deleted
+    )
+
+
+class ResultCache(object):
+    """Cache the results of queries, such as the ones returned by the
+    ``apply_*`` functions.
+
+    Entries are keyed by the database URL of the session, the compiled
+    statement and its bound parameters, and are invalidated when the
+    transaction of an attached session that flushed writes to any of the
+    tables read by the statement ends. Results read while their tables are
+    invalidated are not stored. While a session has changes that are not
+    committed, its queries bypass the cache, so uncommitted rows are never
+    stored. Changes made without a flush (e.g. bulk updates, or other
+    processes) are not detected: use :meth:`invalidate` for them.
+
+    :param backend:
+        Where the results are stored. Defaults to a :class:`LRUBackend`.
+
+    Basic usage::
+
+        cache = ResultCache(LRUBackend(maxsize=1000))
+        cache.attach(Session)
+
+        query = apply_filters(session.query(Foo), filter_spec)
+        results = cache.all(query)
+    """
+
+    def __init__(self, backend=None):
+        self.backend = LRUBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+        self._keys_by_table = {}
+        # bumped on each invalidation, so that results read before it are
+        # not stored after it
+        self._generations = {}
+        self._clears = 0
+        self._lock = threading.Lock()
+
+    def attach(self, target):
+        """ Invalidate entries on the transactions of `target`, a session, a
+        session class or a ``sessionmaker``.
+        """
+        event.listen(target, 'after_flush', self._after_flush)
+        event.listen(
+            target, 'after_transaction_end', self._after_transaction_end
+        )
+
+    def detach(self, target):
+        event.remove(target, 'after_flush', self._after_flush)
+        event.remove(
+            target, 'after_transaction_end', self._after_transaction_end
+        )
+
+    def get_key(self, query):
+        bind = query.session.get_bind()
+        compiled = query.statement.compile(bind=bind)
+        key = '{}\n{}\n{!r}'.format(
+            bind.engine.url, compiled, sorted(compiled.params.items())
+        )
+        return hashlib.blake2b(
+            key.encode('utf-8'), digest_size=16
+        ).hexdigest()
+
+    @instrumented('ResultCache.all')
+    def all(self, query):
+        """ Return the results of `query`, from the cache if possible.
+
+        Cached instances are merged into the session of `query` without
+        being loaded again from the database. Queries of sessions with
+        changes that are not committed are run without the cache.
+        """
+        if _has_uncommitted_changes(query.session):
+            count('cache_bypasses')
+            with stage('execute'):
+                return query.all()
+
+        with stage('compile'):
+            key = self.get_key(query)
+
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            count('cache_hits')
+            return list(query.merge_result(pickle.loads(value), load=False))
+
+        self.misses += 1
+        count('cache_misses')
+        tables = get_statement_tables(query.statement)
+        generation = self._get_generation(tables)
+        with stage('execute'):
+            results = query.all()
+
+        with self._lock:
+            # invalidated while the query ran: the results may be stale
+            if self._get_generation(tables) != generation:
+                return results
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            self.backend.set(key, pickle.dumps(results))
+        return results
+
+    def invalidate(self, *tables):
+        """ Remove the entries that read any of `tables` (names). """
+        with self._lock:
+            keys = set()
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                keys.update(self._keys_by_table.pop(table, ()))
+            for key in keys:
+                self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._keys_by_table.clear()
+            self.backend.clear()
+
+    def _get_generation(self, tables):
+        return self._clears, [
+            self._generations.get(table, 0) for table in sorted(tables)
+        ]
+
+    def _after_flush(self, session, flush_context):
+        session.info.setdefault(FLUSHED_TABLES_KEY, set()).update(
+            get_flushed_tables(session)
+        )
+
+    def _after_transaction_end(self, session, transaction):
+        # committed or rolled back: the flushed tables are invalidated
+        # either way, once the outermost transaction ends
+        if transaction.parent is None:
+            self.invalidate(*session.info.pop(FLUSHED_TABLES_KEY, ()))
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import datetime
+import numbers
+import re
+from collections import namedtuple
+
+from six import string_types
+from sqlalchemy import and_
+from sqlalchemy.types import Date, DateTime
+
+from .exceptions import BadFilterFormat
+
+
+_MONTH_RE = re.compile(r'^\d{4}-\d{2}$')
+
+
+def _get_kind(field, operator):
+    """ Return the type of `field`: ``Date`` or ``DateTime``. """
+    type_ = getattr(field, 'type', None)
+    if isinstance(type_, DateTime):
+        return DateTime
+    if isinstance(type_, Date):
+        return Date
+    raise BadFilterFormat(
+        'Operator `{}` can only be applied to Date and DateTime '
+        'fields.'.format(operator)
+    )
+
+
+def _parse(value, operator):
+    """ Return `value` as a `date` or `datetime`, parsing ISO strings. """
+    if isinstance(value, string_types):
+        text = value[:-1] + '+00:00' if value.endswith('Z') else value
+        try:
+            if len(text) == 10:
+                return datetime.date.fromisoformat(text)
+            return datetime.datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    elif isinstance(value, datetime.date):
+        return value
+
+    raise BadFilterFormat(
+        'Value `{}` of operator `{}` is not a date.'.format(value, operator)
+    )
+
+
+def _start_of_day(day, tzinfo):
+    return datetime.datetime.combine(day, datetime.time(0), tzinfo=tzinfo)
+
+
+def _convert(value, kind, timezone):
+    """ Convert `value` to the `kind` of a column, with or without
+    `timezone`.
+
+    Aware datetimes are converted to UTC for columns without time zone,
+    which are expected to store UTC times. Dates are midnight for
+    ``DateTime`` columns.
+    """
+    if kind is Date:
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        return value
+
+    if not isinstance(value, datetime.datetime):
+        value = _start_of_day(value, None)
+    if value.tzinfo is not None and not timezone:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_column(field, value):
+    """ Convert the bound `value` to the type of `field`. """
+    kind = _get_kind(field, None)
+    return _convert(value, kind, kind is DateTime and field.type.timezone)
+
+
+def _range(field, bounds):
+    start, end = bounds
+    return and_(
+        field >= _to_column(field, start), field < _to_column(field, end)
+    )
+
+
+def _day_bounds(value):
+    """ The start of the day of `value` and of the next day, in the time
+    zone of `value` if it's an aware datetime.
+    """
+    tzinfo = getattr(value, 'tzinfo', None)
+    day = value.date() if isinstance(value, datetime.datetime) else value
+    if tzinfo is None:
+        return day, day + datetime.timedelta(days=1)
+    return (
+        _start_of_day(day, tzinfo),
+        _start_of_day(day + datetime.timedelta(days=1), tzinfo),
+    )
+
+
+def _between_bounds(value, kind):
+    try:
+        start, end = value
+    except (TypeError, ValueError):
+        raise BadFilterFormat(
+            'Value of operator `between` must be a pair of dates.'
+        )
+    return _parse(start, 'between'), _parse(end, 'between')
+
+
+def _on_date_bounds(value, kind):
+    return _day_bounds(_parse(value, 'on_date'))
+
+
+def _in_month_bounds(value, kind):
+    if isinstance(value, string_types) and _MONTH_RE.match(value):
+        try:
+            value = datetime.date.fromisoformat(value + '-01')
+        except ValueError:
+            pass
+    value = _parse(value, 'in_month')
+
+    start = value.replace(day=1)
+    if isinstance(start, datetime.datetime):
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def _within_last_bounds(value, kind):
+    error = BadFilterFormat(
+        'Value `{}` of operator `within_last` is not a valid '
+        'duration.'.format(value)
+    )
+    now = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        if isinstance(value, dict):
+            value = datetime.timedelta(**value)
+        elif isinstance(value, numbers.Number) and not isinstance(
+            value, bool
+        ):
+            value = datetime.timedelta(days=value)
+        elif not isinstance(value, datetime.timedelta):
+            raise error
+        # raises OverflowError if the start is out of the range of datetimes
+        start = now - value
+    except (TypeError, OverflowError):
+        raise error
+
+    if kind is Date:
+        return start.date(), now.date() + datetime.timedelta(days=1)
+    return start, now
+
+
+_BOUNDS = {
+    'between': _between_bounds,
+    'on_date': _on_date_bounds,
+    'in_month': _in_month_bounds,
+    'within_last': _within_last_bounds,
+}
+
+DATE_OPERATORS = frozenset(_BOUNDS)
+
+
+def between(field, value):
+    """ Half-open range: `field` is at or after the first item of `value`
+    and before the second one.
+    """
+    return _range(field, _between_bounds(value, _get_kind(field, 'between')))
+
+
+def on_date(field, value):
+    """ `field` is on the day of `value`. """
+    return _range(field, _on_date_bounds(value, _get_kind(field, 'on_date')))
+
+
+def in_month(field, value):
+    """ `field` is in the month of `value`, a date or a ``YYYY-MM``
+    string.
+    """
+    return _range(
+        field, _in_month_bounds(value, _get_kind(field, 'in_month'))
+    )
+
+
+def within_last(field, value):
+    """ `field` is within the last `value`: a number of days, a
+    `timedelta` or a dictionary of `timedelta` arguments.
+
+    The range ends now, in UTC. For ``Date`` columns, today (in UTC) is
+    included and `value` is rounded down to whole days.
+    """
+    return _range(
+        field, _within_last_bounds(value, _get_kind(field, 'within_last'))
+    )
+
+
+DateBounds = namedtuple('DateBounds', ['date', 'naive', 'aware'])
+"""
+The half-open ranges ``(start, end)`` of a date operator, for `date`
+values, `naive` datetimes, which are expected to be UTC times, and `aware`
+datetimes.
+"""
+
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def get_bounds(operator, value):
+    """ Return the :class:`DateBounds` of the date `operator` with
+    `value`, to evaluate it outside of the database with the same results.
+    """
+    get_operator_bounds = _BOUNDS[operator]
+    date_start, date_end = get_operator_bounds(value, Date)
+    start, end = get_operator_bounds(value, DateTime)
+    return DateBounds(
+        (_convert(date_start, Date, False), _convert(date_end, Date, False)),
+        (_convert(start, DateTime, False), _convert(end, DateTime, False)),
+        (
+            _as_utc(_convert(start, DateTime, True)),
+            _as_utc(_convert(end, DateTime, True)),
+        ),
+    )
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+import datetime
+import operator
+import re
+import types
+from functools import lru_cache
+from operator import attrgetter
+
+from sqlalchemy import and_, not_, or_
+
+from .dates import DATE_OPERATORS, _get_kind, get_bounds
+from .exceptions import BadFilterFormat, BadSpec
+from .filters import BooleanFilter, build_filters
+from .jsonpath import JSONPath, parse_json_path
+from .models import Field
+
+
+# Predicates return `True`, `False` or `None` when the result is unknown
+# (e.g. when comparing with `NULL`), following the three-valued logic of SQL.
+def _comparison(function):
+    def evaluate(value, argument):
+        if value is None or argument is None:
+            return None
+        return function(value, argument)
+    return evaluate
+
+
+def _negate(value):
+    return None if value is None else not value
+
+
+@lru_cache(maxsize=256)
+def _like_regex(pattern, flags=0):
+    regex = ''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+    return re.compile('^{}$'.format(regex), flags | re.DOTALL)
+
+
+def _like(flags=0):
+    def evaluate(value, pattern):
+        if value is None or pattern is None:
+            return None
+        return _like_regex(pattern, flags).match(value) is not None
+    return evaluate
+
+
+def _in(value, values):
+    if not values:
+        return False
+    if value is None:
+        return None
+    if value in values:
+        return True
+    return None if None in values else False
+
+
+def _any(values, value):
+    if values is None or value is None:
+        return None
+    return _in(value, values)
+
+
+def _search(value, terms):
+    if value is None:
+        return None
+    words = set(re.findall(r'\w+', value.lower()))
+    return all(term in words for term in re.findall(r'\w+', terms.lower()))
+
+
+def _contains(document, value):
+    if isinstance(value, dict):
+        return isinstance(document, dict) and all(
+            key in document and _contains(document[key], item)
+            for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return isinstance(document, list) and all(
+            any(_contains(element, item) for element in document)
+            for item in value
+        )
+    return document == value
+
+
+def _json_contains(document, value):
+    if document is None:
+        return None
+    return _contains(document, value)
+
+
+def _json_has_key(document, key):
+    if document is None:
+        return None
+    return isinstance(document, dict) and key in document
+
+
+def _in_date_range(value, bounds):
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        start, end = bounds.naive if value.tzinfo is None else bounds.aware
+    elif isinstance(value, datetime.date):
+        start, end = bounds.date
+    else:
+        raise BadFilterFormat('Value `{}` is not a date.'.format(value))
+    return start <= value < end
+
+
+_ilike = _like(re.IGNORECASE)
+
+DIALECT_LIKE = {
+    # only ASCII letters are case insensitive in SQLite
+    'sqlite': _like(re.IGNORECASE | re.ASCII),
+    # with the default, case insensitive, collations
+    'mysql': _ilike,
+}
+"""
+The ``like`` of the dialects where it's not case sensitive.
+"""
+
+OPERATORS = {
+    'is_null': lambda v: v is None,
+    'is_not_null': lambda v: v is not None,
+    '==': _comparison(operator.eq),
+    'eq': _comparison(operator.eq),
+    '!=': _comparison(operator.ne),
+    'ne': _comparison(operator.ne),
+    '>': _comparison(operator.gt),
+    'gt': _comparison(operator.gt),
+    '<': _comparison(operator.lt),
+    'lt': _comparison(operator.lt),
+    '>=': _comparison(operator.ge),
+    'ge': _comparison(operator.ge),
+    '<=': _comparison(operator.le),
+    'le': _comparison(operator.le),
+    'like': _like(),
+    'ilike': _ilike,
+    'not_ilike': lambda v, a: _negate(_ilike(v, a)),
+    'in': _in,
+    'not_in': lambda v, a: _negate(_in(v, a)),
+    'any': _any,
+    'not_any': lambda v, a: _negate(_any(v, a)),
+    'search': _search,
+    'json_contains': _json_contains,
+    'json_has_key': _json_has_key,
+    'between': _in_date_range,
+    'on_date': _in_date_range,
+    'in_month': _in_date_range,
+    'within_last': _in_date_range,
+}
+"""
+Python counterparts of :attr:`sqlalchemy_filters.filters.Operator.OPERATORS`.
+
+``like`` is case sensitive, as in PostgreSQL, unless a dialect of
+:data:`DIALECT_LIKE` is given, and ``search`` only checks that every word
+of the searched text is in the value. ``match`` can't be
+evaluated, as its syntax depends on the database. The date operators take
+the :class:`sqlalchemy_filters.dates.DateBounds` of the filter value, and
+compare naive datetimes as UTC times.
+"""
+
+
+def _and(predicates):
+    def evaluate(row):
+        result = True
+        for predicate in predicates:
+            value = predicate(row)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+    return evaluate
+
+
+def _or(predicates):
+    def evaluate(row):
+        result = False
+        for predicate in predicates:
+            value = predicate(row)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+    return evaluate
+
+
+def _not(predicates):
+    predicate, = predicates
+    return lambda row: _negate(predicate(row))
+
+
+BOOLEAN_FUNCTIONS = {and_: _and, or_: _or, not_: _not}
+
+
+def _make_json_getter(field_name):
+    column_name, _, path = field_name.partition('.')
+    keys = parse_json_path(path)
+    get_document = _make_getter(column_name, None)
+
+    def get(row):
+        value = get_document(row)
+        for key in keys:
+            try:
+                value = value[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return value
+
+    return get
+
+
+def _make_getter(field_name, model):
+    if model is not None:
+        field = Field(model, field_name).get_sqlalchemy_field()
+        if isinstance(field, JSONPath):
+            return _make_json_getter(field_name)
+    elif '.' in field_name:
+        _, _, path = field_name.partition('.')
+        if parse_json_path(path) is None:
+            raise BadSpec(
+                'Field `{}` is not a valid JSON path.'.format(field_name)
+            )
+        return _make_json_getter(field_name)
+
+    get_attribute = attrgetter(field_name)
+
+    call = False
+    if model is not None:
+        call = isinstance(
+            getattr(model, field_name), types.MethodType
+        )
+
+    def get(row):
+        if type(row) is dict:
+            return row.get(field_name)
+        value = get_attribute(row)
+        return value() if call else value
+
+    return get
+
+
+def _compile_filter(filter, model, dialect):
+    filter_spec = filter.filter_spec
+    op = filter.operator.operator
+
+    model_name = filter_spec.get('model')
+    if model is not None and model_name not in (None, model.__name__):
+        raise BadSpec(
+            'The query does not contain model `{}`.'.format(model_name)
+        )
+
+    try:
+        function = OPERATORS[op]
+        if op == 'like':
+            function = DIALECT_LIKE.get(dialect, function)
+    except KeyError:
+        raise BadFilterFormat(
+            'Operator `{}` cannot be evaluated in Python.'.format(op)
+        )
+
+    get = _make_getter(filter_spec['field'], model)
+    if op in DATE_OPERATORS and model is not None:
+        _get_kind(Field(model, filter_spec['field']).get_sqlalchemy_field(), op)
+
+    if filter.operator.arity == 1:
+        return lambda row: function(get(row))
+
+    value = filter.value
+    if value is None and op in ('==', 'eq', '!=', 'ne'):
+        # SQLAlchemy renders these comparisons as `IS NULL`/`IS NOT NULL`
+        function = OPERATORS['is_null' if op in ('==', 'eq') else 'is_not_null']
+        return lambda row: function(get(row))
+    if op in ('in', 'not_in'):
+        try:
+            value = frozenset(value)
+        except TypeError:
+            value = list(value)
+    elif op in DATE_OPERATORS:
+        value = get_bounds(op, value)
+    return lambda row: function(get(row), value)
+
+
+def _compile(filters, model, dialect):
+    predicates = []
+    for filter in filters:
+        if isinstance(filter, BooleanFilter):
+            predicates.append(BOOLEAN_FUNCTIONS[filter.function](
+                _compile(filter.filters, model, dialect)
+            ))
+        else:
+            predicates.append(_compile_filter(filter, model, dialect))
+    return predicates
+
+
+def compile_predicate(filter_spec, model=None, dialect=None):
+    """Compile `filter_spec` into a Python predicate.
+
+    :param filter_spec:
+        A filter spec, as accepted by ``apply_filters``.
+
+    :param model:
+        The model of the evaluated rows. If given, the fields are validated
+        against it and filters naming another model are rejected. Without
+        a model, dotted field names are paths in the JSON documents of the
+        rows (e.g. ``attrs.sizes.0.width``).
+
+    :param dialect:
+        The name of the database dialect to give the same results as
+        (e.g. ``'sqlite'``), for the operators whose results depend on it:
+        ``like`` is case sensitive, as in PostgreSQL, unless it's
+        ``'sqlite'`` (only for ASCII letters) or ``'mysql'``.
+
+    :returns:
+        A function that takes a model instance or a dictionary, and returns
+        whether it matches the filters. As in SQL, rows for which a filter
+        is unknown (e.g. ``count > 5`` with a ``None`` count) don't match.
+    """
+    evaluate = _and(_compile(build_filters(filter_spec), model, dialect))
+    return lambda row: evaluate(row) is True
+
+
+def apply_filters_in_memory(rows, filter_spec, model=None, dialect=None):
+    """ Return the items of `rows` that match `filter_spec`. """
+    predicate = compile_predicate(filter_spec, model, dialect)
+    return [row for row in rows if predicate(row)]
@@ -13,6 +13,14 @@ class BadLoadFormat(Exception):
     pass
 
 
+class BadFacetFormat(Exception):
+    pass
+
+
+class BadGroupFormat(Exception):
+    pass
+
+
 class BadSpec(Exception):
     pass
 
@@ -25,5 +33,28 @@ class BadQuery(Exception):
     pass
 
 
+class BadModel(Exception):
+    pass
+
+
 class InvalidPage(Exception):
     pass
+
+
+class UnindexedSpec(Exception):
+    pass
+
+
+class TooManyStatements(Exception):
+    pass
+
+
+class SpecTooComplex(Exception):
+    pass
+
+
+class InvalidSpec(Exception):
+
+    def __init__(self, message, errors=()):
+        super(InvalidSpec, self).__init__(message)
+        self.errors = list(errors)
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import random
+import re
+from collections import namedtuple
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from .recorder import SlowStatementRecorder
+
+
+logger = logging.getLogger(__name__)
+
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN (FORMAT JSON) ',
+}
+DEFAULT_EXPLAIN_PREFIX = 'EXPLAIN '
+
+
+PlanNode = namedtuple(
+    'PlanNode', ['operation', 'table', 'index', 'full_scan', 'detail']
+)
+"""
+A step of a query plan: `operation` is the name used by the database
+(e.g. ``SCAN``, ``Seq Scan``, ``ALL``), `full_scan` tells whether every
+row of `table` is read, and `index` is the name of the index used, if any.
+"""
+
+
+class QueryPlan(namedtuple('QueryPlan', ['dialect', 'nodes', 'raw'])):
+
+    __slots__ = ()
+
+    @property
+    def full_scans(self):
+        """ Tables read in full. """
+        return [node.table for node in self.nodes if node.full_scan]
+
+    @property
+    def indexes(self):
+        """ Indexes used by the plan. """
+        return [node.index for node in self.nodes if node.index]
+
+
+SlowQuery = namedtuple(
+    'SlowQuery', ['statement', 'parameters', 'duration', 'plan']
+)
+
+
+class Explain(Executable, ClauseElement):
+    """ The dialect specific ``EXPLAIN`` statement of `statement`. """
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    sql = EXPLAIN_PREFIXES.get(
+        compiler.dialect.name, DEFAULT_EXPLAIN_PREFIX
+    ) + compiler.process(element.statement, **kw)
+    # the rows of the plan don't match the columns of the statement
+    compiler._result_columns = []
+    return sql
+
+
+# a query, after any whitespace, comments and opening parentheses
+_QUERY_RE = re.compile(
+    r'(?:\s+|--[^\n]*|/\*.*?\*/|\()*(?:SELECT|WITH)\b',
+    re.IGNORECASE | re.DOTALL
+)
+
+_SQLITE_DETAIL_RE = re.compile(
+    r'^(?P<operation>SCAN|SEARCH)(?: TABLE)? (?!CONSTANT ROW)(?P<table>\S+)'
+    r'(?: USING (?:(?:INTEGER )?(?P<primary_key>PRIMARY KEY)|'
+    r'(?:AUTOMATIC )?(?:PARTIAL )?(?:COVERING )?INDEX (?P<index>\S+)))?'
+)
+
+
+def parse_sqlite_plan(rows):
+    nodes = []
+    for row in rows:
+        detail = row[3]
+        match = _SQLITE_DETAIL_RE.match(detail)
+        if match is None:
+            nodes.append(PlanNode(detail, None, None, False, detail))
+            continue
+        index = match.group('index') or match.group('primary_key')
+        nodes.append(PlanNode(
+            match.group('operation'),
+            match.group('table'),
+            index,
+            match.group('operation') == 'SCAN',
+            detail,
+        ))
+    return nodes
+
+
+def parse_postgresql_plan(rows):
+    document = rows[0][0]
+    if not isinstance(document, list):
+        document = json.loads(document)
+
+    nodes = []
+    pending = [item['Plan'] for item in document]
+    while pending:
+        plan = pending.pop(0)
+        nodes.append(PlanNode(
+            plan['Node Type'],
+            plan.get('Relation Name'),
+            plan.get('Index Name'),
+            plan['Node Type'] == 'Seq Scan',
+            plan.get('Index Cond') or plan.get('Filter') or '',
+        ))
+        pending.extend(plan.get('Plans', []))
+    return nodes
+
+
+def parse_mysql_plan(rows, columns):
+    nodes = []
+    for row in rows:
+        row = dict(zip(columns, row))
+        nodes.append(PlanNode(
+            row['type'],
+            row['table'],
+            row['key'],
+            row['type'] in ('ALL', 'index'),
+            row.get('Extra') or '',
+        ))
+    return nodes
+
+
+def parse_plan(dialect_name, rows, columns=None):
+    """ Parse the rows returned by ``EXPLAIN`` into a :class:`QueryPlan`.
+    """
+    rows = [tuple(row) for row in rows]
+    if dialect_name == 'sqlite':
+        nodes = parse_sqlite_plan(rows)
+    elif dialect_name == 'postgresql':
+        nodes = parse_postgresql_plan(rows)
+    elif dialect_name == 'mysql':
+        nodes = parse_mysql_plan(rows, columns)
+    else:
+        nodes = []
+    return QueryPlan(dialect_name, nodes, rows)
+
+
+def explain(query):
+    """Return the plan chosen by the database for `query`.
+
+    :param query:
+        A :class:`sqlalchemy.orm.Query` instance, typically after
+        ``apply_filters``, ``apply_sort`` and ``apply_pagination`` have been
+        applied to it.
+
+    :returns:
+        A :class:`QueryPlan`, where ``full_scans`` lists the tables that
+        are read in full and ``indexes`` the indexes used.
+
+    Basic usage::
+
+        plan = explain(apply_filters(query, filter_spec))
+        >>> plan.full_scans
+        ['foo']
+        >>> plan.indexes
+        []
+    """
+    session = query.session
+    dialect_name = session.get_bind().dialect.name
+
+    result = session.execute(Explain(query.statement))
+    columns = [column[0] for column in result.cursor.description]
+    return parse_plan(dialect_name, result.fetchall(), columns)
+
+
+class PlanSampler(SlowStatementRecorder):
+    """Capture the plan of slow ``SELECT`` statements.
+
+    Once attached to an engine, every ``SELECT`` or ``WITH`` statement
+    (after any leading comments) that takes longer than `threshold` seconds
+    is explained again, with the same parameters, for a `sample_rate`
+    fraction of the slow statements. `callback` is called with a
+    :class:`SlowQuery`.
+
+    Only the statements, parameters and durations are captured while the
+    queries run. ``EXPLAIN`` runs from a background thread, on a connection
+    of the engine pool rather than the connection of the statement, so the
+    transactions of the application are never affected; plans are captured
+    in the order the statements complete. Statements are dropped, and
+    counted in ``dropped``, if more than `buffer_size` are waiting.
+
+    Basic usage::
+
+        sampler = PlanSampler(report_plan, threshold=0.5, sample_rate=0.1)
+        sampler.attach(engine)
+        # ...
+        sampler.detach()
+    """
+
+    thread_name = 'sqlalchemy-filters-explain'
+
+    def __init__(self, callback, threshold=0.5, sample_rate=1.0,
+                 buffer_size=100):
+        super(PlanSampler, self).__init__(threshold, buffer_size)
+        self.callback = callback
+        self.sample_rate = sample_rate
+
+    def _capture(self, statement, parameters, context, executemany,
+                 duration):
+        if (
+            executemany or
+            not _QUERY_RE.match(statement) or
+            random.random() >= self.sample_rate
+        ):
+            return None
+        return SlowQuery(statement, parameters, duration, None)
+
+    def _handle(self, slow_query):
+        dialect_name = self.engine.dialect.name
+        prefix = EXPLAIN_PREFIXES.get(dialect_name, DEFAULT_EXPLAIN_PREFIX)
+
+        try:
+            connection = self.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(
+                    prefix + slow_query.statement, slow_query.parameters
+                )
+                columns = [column[0] for column in cursor.description]
+                plan = parse_plan(dialect_name, cursor.fetchall(), columns)
+                cursor.close()
+            finally:
+                # rolled back when returned to the pool
+                connection.close()
+        except Exception:
+            logger.exception('Could not explain slow statement.')
+            return
+
+        try:
+            self.callback(slow_query._replace(plan=plan))
+        except Exception:
+            logger.exception('Could not handle slow statement plan.')
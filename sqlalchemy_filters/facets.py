@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from sqlalchemy import func, literal, null, tuple_
+
+from .exceptions import BadFacetFormat
+from .filters import apply_filters, build_filters
+from .instrumentation import instrumented
+from .models import Field, auto_join, get_default_model, get_model_from_spec
+from .specs import _is_iterable_filter, get_boolean_function
+
+
+GROUPING_SETS_DIALECTS = {'postgresql', 'oracle', 'mssql'}
+"""
+Dialects whose databases support ``GROUP BY GROUPING SETS`` and the
+``grouping`` function.
+"""
+
+
+FACET_INDEX_LABEL = 'facet_index'
+
+
+FacetCounts = namedtuple('FacetCounts', ['model', 'field', 'counts'])
+"""
+The counts of a facet: `counts` is a list of ``(value, count)`` tuples,
+sorted by descending count.
+"""
+
+
+class Facet(object):
+
+    def __init__(self, facet_spec):
+        self.facet_spec = facet_spec
+
+        try:
+            self.field_name = facet_spec['field']
+        except KeyError:
+            raise BadFacetFormat('`field` is a mandatory attribute.')
+        except TypeError:
+            raise BadFacetFormat(
+                'Facet spec `{}` should be a dictionary.'.format(facet_spec)
+            )
+
+        self.model_name = facet_spec.get('model')
+        self.exclude_own_filter = facet_spec.get('exclude_own_filter', False)
+
+    def get_named_models(self):
+        if self.model_name is not None:
+            return {self.model_name}
+        return set()
+
+    def is_own_filter(self, filter_spec, default_model_name):
+        """ Whether every filter in `filter_spec` is on the facet field. """
+        model_name = self.model_name or default_model_name
+        return all(
+            (model or default_model_name, field) == (
+                model_name, self.field_name
+            )
+            for model, field in _get_filter_fields(filter_spec)
+        )
+
+    def format_for_sqlalchemy(self, query, default_model):
+        model = get_model_from_spec(self.facet_spec, query, default_model)
+        return Field(model, self.field_name).get_sqlalchemy_field()
+
+
+def _get_filter_fields(filter_spec):
+    if _is_iterable_filter(filter_spec):
+        for item in filter_spec:
+            yield from _get_filter_fields(item)
+        return
+
+    boolean_function = get_boolean_function(filter_spec)
+    if boolean_function is not None:
+        yield from _get_filter_fields(filter_spec[boolean_function.key])
+    else:
+        yield filter_spec.get('model'), filter_spec['field']
+
+
+def _get_top_level_filters(filter_spec):
+    if _is_iterable_filter(filter_spec):
+        return list(filter_spec)
+    if isinstance(filter_spec, dict) and 'and' in filter_spec:
+        return list(filter_spec['and'])
+    return [filter_spec]
+
+
+def get_facet_columns(query, facets, default_model):
+    """ Return the distinct columns of `facets`, and the index of the
+    column of each facet among them, so that the facets on the same field
+    are counted once.
+    """
+    keys = []
+    columns = []
+    indexes = []
+    for facet in facets:
+        model = get_model_from_spec(facet.facet_spec, query, default_model)
+        key = (model, facet.field_name)
+        if key not in keys:
+            keys.append(key)
+            columns.append(facet.format_for_sqlalchemy(query, default_model))
+        indexes.append(keys.index(key))
+    return columns, indexes
+
+
+def get_grouping_sets_query(query, columns):
+    """ Return the query that counts the values of all the `columns` with
+    ``GROUPING SETS``: each row has the values of the columns, the result
+    of ``grouping`` for each one of them, and the count.
+    """
+    return query.order_by(None).with_entities(
+        *(columns + [func.grouping(column) for column in columns] +
+          [func.count()])
+    ).group_by(
+        func.grouping_sets(*[tuple_(column) for column in columns])
+    )
+
+
+def get_union_query(query, columns):
+    """ Return the query that counts the values of all the `columns` with
+    a ``UNION ALL`` of a ``GROUP BY`` per column: each row has the index of
+    its column, in a ``facet_index`` column, the values of the columns
+    (``NULL`` but for its own, so that each one keeps its type) and the
+    count.
+    """
+    query = query.order_by(None)
+    queries = [
+        query.with_entities(
+            literal(index).label(FACET_INDEX_LABEL),
+            *[
+                (column if other_index == index else null()).label(
+                    'value_{}'.format(other_index)
+                )
+                for other_index in range(len(columns))
+            ],
+            func.count().label('count')
+        ).group_by(column)
+        for index, column in enumerate(columns)
+    ]
+    return queries[0].union_all(*queries[1:])
+
+
+def _count_grouping_sets(query, columns):
+    counts = [[] for _ in columns]
+    for row in get_grouping_sets_query(query, columns):
+        values = row[:len(columns)]
+        groupings = row[len(columns):-1]
+        # the columns are distinct, so only one of them is grouped by
+        index = list(groupings).index(0)
+        counts[index].append((values[index], row[-1]))
+    return counts
+
+
+def _count_union(query, columns):
+    counts = [[] for _ in columns]
+    for row in get_union_query(query, columns):
+        index = row[0]
+        counts[index].append((row[1 + index], row[-1]))
+    return counts
+
+
+@instrumented('apply_facets')
+def apply_facets(query, facet_spec, filter_spec=None, use_exists=False):
+    """Count the results of a query for each value of the facet fields.
+
+    :param query:
+        A :class:`sqlalchemy.orm.Query` instance.
+
+    :param facet_spec:
+        A list of dictionaries with the `field` (and `model`, optional if
+        the query refers to a single model) of each facet. If
+        `exclude_own_filter` is `True`, the top level filters on the facet
+        field are not applied to its counts, so that all the values of the
+        facet are counted, as in multiple choice facets.
+
+        Example::
+
+            facet_spec = [
+                {'model': 'Foo', 'field': 'name', 'exclude_own_filter': True},
+                {'model': 'Bar', 'field': 'count'},
+            ]
+
+    :param filter_spec:
+        The filters of the query, as accepted by ``apply_filters``. It is
+        only needed if a facet excludes its own filter: otherwise, `query`
+        may be filtered already.
+
+    :param use_exists:
+        As in ``apply_filters``.
+
+    :returns:
+        A list of :class:`FacetCounts`, one per facet, in order.
+
+    Facets that share the same filters are counted with a single
+    ``GROUPING SETS`` statement where it's supported, and with a single
+    ``UNION ALL`` of a ``GROUP BY`` per facet otherwise.
+    """
+    if isinstance(facet_spec, dict):
+        facet_spec = [facet_spec]
+    facets = [Facet(item) for item in facet_spec]
+
+    if filter_spec is not None:
+        build_filters(filter_spec)  # validates the spec
+
+    default_model = get_default_model(query)
+    default_model_name = getattr(default_model, '__name__', None)
+    top_level_filters = _get_top_level_filters(
+        [] if filter_spec is None else filter_spec
+    )
+
+    # facets are grouped by the filters that apply to them
+    groups = {}
+    for position, facet in enumerate(facets):
+        filters = tuple(
+            index for index, item in enumerate(top_level_filters)
+            if not (
+                facet.exclude_own_filter and
+                facet.is_own_filter(item, default_model_name)
+            )
+        )
+        groups.setdefault(filters, []).append(position)
+
+    use_grouping_sets = (
+        query.session.get_bind().dialect.name in GROUPING_SETS_DIALECTS
+    )
+
+    counts = [None] * len(facets)
+    for filters, positions in groups.items():
+        group_facets = [facets[position] for position in positions]
+
+        group_query = query
+        if filters:
+            group_query = apply_filters(
+                query, [top_level_filters[index] for index in filters],
+                use_exists=use_exists,
+            )
+        for facet in group_facets:
+            group_query = auto_join(group_query, *facet.get_named_models())
+
+        columns, indexes = get_facet_columns(
+            group_query, group_facets, default_model
+        )
+        count = _count_grouping_sets if use_grouping_sets else _count_union
+        column_counts = count(group_query, columns)
+        for position, index in zip(positions, indexes):
+            counts[position] = sorted(
+                column_counts[index], key=lambda item: item[1], reverse=True
+            )
+
+    return [
+        FacetCounts(
+            facet.model_name or default_model_name, facet.field_name,
+            facet_counts,
+        )
+        for facet, facet_counts in zip(facets, counts)
+    ]
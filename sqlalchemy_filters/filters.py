@@ -1,27 +1,23 @@
 # -*- coding: utf-8 -*-
-from collections import namedtuple
-from collections.abc import Iterable
 from inspect import signature
 from itertools import chain
 
-from six import string_types
-from sqlalchemy import and_, or_, not_, func
+from sqlalchemy import and_, or_, func
 
 from .exceptions import BadFilterFormat
-from .models import Field, auto_join, get_model_from_spec, get_default_model
-
-
-BooleanFunction = namedtuple(
-    'BooleanFunction', ('key', 'sqlalchemy_fn', 'only_one_arg')
+from .instrumentation import count, instrumented, stage, tag_spec
+from .limits import check_filter_spec
+from .models import (
+    Field, auto_join, get_default_model, get_model_from_spec,
+    get_query_models, get_relationship_path
+)
+from .dates import between, in_month, on_date, within_last
+from .jsonpath import JSONPath, json_contains, json_has_key
+from .search import fts_match, fts_search
+from .specs import (  # noqa: F401
+    BOOLEAN_FUNCTIONS, BooleanFunction, _is_iterable_filter,
+    check_boolean_function_args, get_boolean_function
 )
-BOOLEAN_FUNCTIONS = [
-    BooleanFunction('or', or_, False),
-    BooleanFunction('and', and_, False),
-    BooleanFunction('not', not_, True),
-]
-"""
-Sqlalchemy boolean functions that can be parsed from the filter definition.
-"""
 
 
 class Operator(object):
@@ -48,6 +44,14 @@ class Operator(object):
         'not_in': lambda f, a: ~f.in_(a),
         'any': lambda f, a: f.any(a),
         'not_any': lambda f, a: func.not_(f.any(a)),
+        'match': lambda f, a: fts_match(f, a),
+        'search': lambda f, a: fts_search(f, a),
+        'json_contains': lambda f, a: json_contains(f, a),
+        'json_has_key': lambda f, a: json_has_key(f, a),
+        'between': lambda f, a: between(f, a),
+        'on_date': lambda f, a: on_date(f, a),
+        'in_month': lambda f, a: in_month(f, a),
+        'within_last': lambda f, a: within_last(f, a),
     }
 
     def __init__(self, operator=None):
@@ -88,12 +92,13 @@ class Filter(object):
         return set()
 
     def format_for_sqlalchemy(self, query, default_model):
-        filter_spec = self.filter_spec
+        model = get_model_from_spec(self.filter_spec, query, default_model)
+        return self.format_for_model(model)
+
+    def format_for_model(self, model):
         operator = self.operator
         value = self.value
 
-        model = get_model_from_spec(filter_spec, query, default_model)
-
         function = operator.function
         arity = operator.arity
 
@@ -105,6 +110,8 @@ class Filter(object):
             return function(sqlalchemy_field)
 
         if arity == 2:
+            if isinstance(sqlalchemy_field, JSONPath):
+                sqlalchemy_field = sqlalchemy_field.for_value(value)
             return function(sqlalchemy_field, value)
 
 
@@ -120,20 +127,59 @@ class BooleanFilter(object):
             models.update(filter.get_named_models())
         return models
 
-    def format_for_sqlalchemy(self, query, default_model):
-        return self.function(*[
-            filter.format_for_sqlalchemy(query, default_model)
-            for filter in self.filters
-        ])
+    def format_for_sqlalchemy(self, query, default_model, exists_paths=None):
+        return self.function(*format_filters(
+            self.filters, query, default_model, self.function, exists_paths
+        ))
+
 
+def format_filters(filters, query, default_model, function=and_,
+                   exists_paths=None):
+    """ Format sibling `filters`, which will be combined with `function`.
 
-def _is_iterable_filter(filter_spec):
-    """ `filter_spec` may be a list of nested filter specs, or a dict.
+    Filters on the models in `exists_paths` (a dictionary of model names
+    and relationship paths, see
+    :func:`~sqlalchemy_filters.models.get_relationship_path`) are grouped
+    by model into a single correlated ``EXISTS`` subquery, so that sibling
+    predicates apply to the same related row as they would with a join.
     """
-    return (
-        isinstance(filter_spec, Iterable) and
-        not isinstance(filter_spec, (string_types, dict))
-    )
+    exists_paths = exists_paths or {}
+    group_function = or_ if function is or_ else and_
+
+    clauses = []
+    related_filters = {}
+    for filter in filters:
+        model_name = (
+            filter.filter_spec.get('model')
+            if isinstance(filter, Filter) else None
+        )
+        if model_name in exists_paths:
+            related_filters.setdefault(model_name, []).append(filter)
+        elif isinstance(filter, BooleanFilter):
+            clauses.append(
+                filter.format_for_sqlalchemy(query, default_model, exists_paths)
+            )
+        else:
+            clauses.append(filter.format_for_sqlalchemy(query, default_model))
+
+    for model_name, model_filters in related_filters.items():
+        path = exists_paths[model_name]
+        model = path[-1].mapper.class_
+        clauses.append(_exists(path, group_function(*[
+            filter.format_for_model(model) for filter in model_filters
+        ])))
+
+    return clauses
+
+
+def _exists(path, clause):
+    for relationship in reversed(path):
+        attribute = getattr(relationship.parent.class_, relationship.key)
+        if relationship.uselist:
+            clause = attribute.any(clause)
+        else:
+            clause = attribute.has(clause)
+    return clause
 
 
 def build_filters(filter_spec):
@@ -146,35 +192,19 @@ def build_filters(filter_spec):
 
     if isinstance(filter_spec, dict):
         # Check if filter spec defines a boolean function.
-        for boolean_function in BOOLEAN_FUNCTIONS:
-            if boolean_function.key in filter_spec:
-                # The filter spec is for a boolean-function
-                # Get the function argument definitions and validate
-                fn_args = filter_spec[boolean_function.key]
-
-                if not _is_iterable_filter(fn_args):
-                    raise BadFilterFormat(
-                        '`{}` value must be an iterable across the function '
-                        'arguments'.format(boolean_function.key)
-                    )
-                if boolean_function.only_one_arg and len(fn_args) != 1:
-                    raise BadFilterFormat(
-                        '`{}` must have one argument'.format(
-                            boolean_function.key
-                        )
-                    )
-                if not boolean_function.only_one_arg and len(fn_args) < 1:
-                    raise BadFilterFormat(
-                        '`{}` must have one or more arguments'.format(
-                            boolean_function.key
-                        )
-                    )
-                return [
-                    BooleanFilter(
-                        boolean_function.sqlalchemy_fn, *build_filters(fn_args)
-                    )
-                ]
+        boolean_function = get_boolean_function(filter_spec)
+        if boolean_function is not None:
+            # The filter spec is for a boolean-function
+            # Get the function argument definitions and validate
+            fn_args = filter_spec[boolean_function.key]
+            check_boolean_function_args(boolean_function, fn_args)
+            return [
+                BooleanFilter(
+                    boolean_function.sqlalchemy_fn, *build_filters(fn_args)
+                )
+            ]
 
+    count('filters')
     return [Filter(filter_spec)]
 
 
@@ -185,7 +215,34 @@ def get_named_models(filters):
     return models
 
 
-def apply_filters(query, filter_spec, do_auto_join=True):
+def join_filter_models(query, filters, do_auto_join=True, use_exists=False):
+    """ Join the models named in `filters` that are not part of `query`.
+
+    :returns:
+        The joined query, and a dictionary with the relationship paths of
+        the models that are filtered with ``EXISTS`` instead, when
+        `use_exists` is `True`.
+    """
+    filter_models = get_named_models(filters)
+
+    exists_paths = {}
+    if use_exists:
+        query_models = get_query_models(query)
+        for model_name in filter_models - set(query_models):
+            path = get_relationship_path(query_models.values(), model_name)
+            if path:
+                exists_paths[model_name] = path
+        filter_models -= set(exists_paths)
+
+    if do_auto_join:
+        query = auto_join(query, *filter_models)
+
+    return query, exists_paths
+
+
+@instrumented('apply_filters')
+def apply_filters(query, filter_spec, do_auto_join=True, use_exists=False,
+                  limits=None):
     """Apply filters to a SQLAlchemy query.
 
     :param query:
@@ -216,24 +273,44 @@ def apply_filters(query, filter_spec, do_auto_join=True):
                 ]
             }
 
+    :param do_auto_join:
+        Whether to join the models named in the filters that are not
+        already part of the query.
+
+    :param use_exists:
+        If `True`, filters on models that are not part of the query, but
+        can be reached through relationships, are applied as correlated
+        ``EXISTS`` subqueries instead of joins, so the query returns the
+        same rows without duplicates.
+
+    :param limits:
+        A :class:`~sqlalchemy_filters.limits.Limits` instance. Specs that
+        exceed it raise :class:`~sqlalchemy_filters.exceptions.SpecTooComplex`
+        before the query is modified.
+
     :returns:
         The :class:`sqlalchemy.orm.Query` instance after all the filters
         have been applied.
     """
-    filters = build_filters(filter_spec)
+    if limits is not None:
+        check_filter_spec(filter_spec, limits)
 
-    default_model = get_default_model(query)
+    with stage('parse'):
+        filters = build_filters(filter_spec)
 
-    filter_models = get_named_models(filters)
-    if do_auto_join:
-        query = auto_join(query, *filter_models)
+    with stage('resolve'):
+        default_model = get_default_model(query)
+
+    query, exists_paths = join_filter_models(
+        query, filters, do_auto_join, use_exists
+    )
 
-    sqlalchemy_filters = [
-        filter.format_for_sqlalchemy(query, default_model)
-        for filter in filters
-    ]
+    with stage('build'):
+        sqlalchemy_filters = format_filters(
+            filters, query, default_model, exists_paths=exists_paths
+        )
 
     if sqlalchemy_filters:
         query = query.filter(*sqlalchemy_filters)
 
-    return query
+    return tag_spec(query, 'filter_spec', filter_spec)
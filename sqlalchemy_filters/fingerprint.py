@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+from inspect import signature
+
+from .exceptions import BadFilterFormat
+from .filters import Operator
+from .loads import build_load
+from .specs import (
+    Sort, _is_iterable_filter, check_boolean_function_args,
+    get_boolean_function, normalize_load_spec
+)
+
+
+OPERATOR_ALIASES = {
+    'eq': '==',
+    'ne': '!=',
+    'gt': '>',
+    'lt': '<',
+    'ge': '>=',
+    'le': '<=',
+}
+"""
+Operators with several names, mapped to the name used in fingerprints.
+"""
+
+IGNORED_VALUE = '?'
+
+_ARITY = {
+    operator: len(signature(function).parameters)
+    for operator, function in Operator.OPERATORS.items()
+}
+
+_SET_OPERATORS = ('in', 'not_in')
+
+
+def _dumps(value):
+    return json.dumps(
+        value, sort_keys=True, separators=(',', ':'), default=repr
+    )
+
+
+def _canonical_filter(filter_spec, ignore_values):
+    if not isinstance(filter_spec, dict):
+        raise BadFilterFormat(
+            'Filter spec `{}` should be a dictionary.'.format(filter_spec)
+        )
+    if 'field' not in filter_spec:
+        raise BadFilterFormat('`field` is a mandatory filter attribute.')
+
+    operator = filter_spec.get('op') or '=='
+    if operator not in _ARITY:
+        raise BadFilterFormat('Operator `{}` not valid.'.format(operator))
+    operator = OPERATOR_ALIASES.get(operator, operator)
+
+    canonical = [
+        operator, filter_spec.get('model'), filter_spec['field']
+    ]
+    if _ARITY[operator] == 2:
+        if 'value' not in filter_spec:
+            raise BadFilterFormat('`value` must be provided.')
+        value = filter_spec['value']
+        if ignore_values:
+            canonical.append(IGNORED_VALUE)
+        elif operator in _SET_OPERATORS:
+            if not _is_iterable_filter(value):
+                raise BadFilterFormat(
+                    'Value of operator `{}` must be an iterable.'.format(
+                        operator
+                    )
+                )
+            canonical.append(sorted({_dumps(item) for item in value}))
+        else:
+            canonical.append(_dumps(value))
+    return canonical
+
+
+def _canonical_filters(filter_spec, ignore_values):
+    """ Return the canonical form of `filter_spec` and its key. """
+    if _is_iterable_filter(filter_spec):
+        filter_spec = list(filter_spec)
+        if not filter_spec:
+            return ['and', []], '["and",[]]'
+        filter_spec = {'and': filter_spec}
+
+    boolean_function = None
+    if isinstance(filter_spec, dict):
+        boolean_function = get_boolean_function(filter_spec)
+
+    if boolean_function is None:
+        canonical = _canonical_filter(filter_spec, ignore_values)
+        return canonical, _dumps(canonical)
+
+    key = boolean_function.key
+    fn_args = filter_spec[key]
+    check_boolean_function_args(boolean_function, fn_args)
+
+    if key == 'not':
+        canonical, _ = _canonical_filters(fn_args[0], ignore_values)
+        canonical = ['not', canonical]
+        return canonical, _dumps(canonical)
+
+    # `and` and `or` are associative and commutative: nested functions of
+    # the same kind are flattened, and the arguments sorted and deduplicated
+    arguments = {}
+    pending = list(fn_args)
+    while pending:
+        canonical, dumped = _canonical_filters(pending.pop(), ignore_values)
+        if canonical[0] == key:
+            for argument in canonical[1]:
+                arguments[_dumps(argument)] = argument
+        else:
+            arguments[dumped] = canonical
+
+    if len(arguments) == 1:
+        (dumped, canonical), = arguments.items()
+        return canonical, dumped
+
+    canonical = [key, [arguments[dumped] for dumped in sorted(arguments)]]
+    return canonical, _dumps(canonical)
+
+
+def _canonical_sorts(sort_spec, ignore_values):
+    if isinstance(sort_spec, dict):
+        sort_spec = [sort_spec]
+
+    canonical = []
+    for sort_item in sort_spec:
+        sort = Sort(sort_item)  # raises BadSortFormat
+        rank = sort.rank
+        if ignore_values and rank is not None:
+            rank = IGNORED_VALUE
+        canonical.append([
+            sort_item.get('model'), sort.field_name, sort.direction,
+            bool(sort.nullsfirst), bool(sort.nullslast), rank,
+            sort.aggregate,
+        ])
+    return canonical
+
+
+def _canonical_loads(load_spec):
+    fields = {}
+    for load in normalize_load_spec(load_spec):
+        build_load(load)  # raises BadLoadFormat
+        if 'relationship' in load:
+            key = (load.get('model'), load['relationship'], load['strategy'])
+        else:
+            key = (load.get('model'),)
+        fields.setdefault(key, set()).update(load.get('fields') or [])
+    return sorted(
+        [list(key) + [sorted(key_fields)] for key, key_fields in fields.items()],
+        key=_dumps
+    )
+
+
+def canonicalize(
+    filter_spec=None, sort_spec=None, load_spec=None, ignore_values=False
+):
+    """Return the canonical form of the given specs.
+
+    Logically identical specs have the same canonical form: operator
+    aliases are replaced (e.g. ``eq`` by ``==``), a missing operator is
+    ``==``, a list of filters is an ``and``, nested ``and`` and ``or``
+    functions are flattened and their arguments sorted, as well as the
+    values of ``in`` and ``not_in`` and the fields to load. The order of
+    the sorts is kept, as it changes the results.
+
+    :param ignore_values:
+        If `True`, the filter values and the search text of ``rank`` sorts
+        are replaced by ``?``, so that specs with the same structure have
+        the same canonical form.
+
+    :returns:
+        A list with the canonical filters, sorts and loads, which can be
+        serialized to JSON.
+    """
+    canonical = [None, None, None]
+    if filter_spec is not None:
+        canonical[0], _ = _canonical_filters(filter_spec, ignore_values)
+    if sort_spec is not None:
+        canonical[1] = _canonical_sorts(sort_spec, ignore_values)
+    if load_spec is not None:
+        canonical[2] = _canonical_loads(load_spec)
+    return canonical
+
+
+def fingerprint(
+    filter_spec=None, sort_spec=None, load_spec=None, ignore_values=False
+):
+    """Return a fingerprint of the given specs.
+
+    The fingerprint is a 32 characters hexadecimal digest of the
+    :func:`canonicalize` form of the specs, which is the same for specs that
+    are logically identical.
+
+    Basic usage::
+
+        >>> fingerprint([{'field': 'id', 'op': 'eq', 'value': 1}])
+        'eaa2d28a90904736fd1882b337ee4356'
+        >>> fingerprint({'field': 'id', 'value': 2}, ignore_values=True)
+        '305bc9d400c6c80b3c125887d45d0d60'
+    """
+    canonical = canonicalize(filter_spec, sort_spec, load_spec, ignore_values)
+    return hashlib.blake2b(
+        _dumps(canonical).encode('utf-8'), digest_size=16
+    ).hexdigest()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import functools
+import logging
+import time
+from collections import Counter, namedtuple
+from contextvars import ContextVar
+
+
+logger = logging.getLogger(__name__)
+
+
+Measurement = namedtuple(
+    'Measurement', ['name', 'duration', 'stages', 'counters']
+)
+"""
+The `duration` (in seconds) of a call to `name` (e.g. ``apply_filters``),
+the time spent in each of its `stages` and its `counters`.
+
+Stages are ``parse`` (building the specs), ``resolve`` (finding the models
+of the query), ``join`` (``auto_join`` and its trial compiles), ``build``
+(the SQLAlchemy expressions), ``compile`` and ``execute``. Counters are
+``filters``, ``sorts``, ``loads``, ``joins_attempted``, ``joins``,
+``cache_hits`` and ``cache_misses``.
+"""
+
+
+SPECS_OPTION = 'sqlalchemy_filters_specs'
+"""
+The execution option the specs of a query are stored in while specs are
+tagged, i.e. while a :class:`~sqlalchemy_filters.slowlog.SlowSpecLog` is
+attached.
+"""
+
+
+_sinks = []
+
+_spec_taggers = []
+
+_current = ContextVar('sqlalchemy_filters_measurement', default=None)
+
+
+def add_sink(sink):
+    """ Call `sink` with a :class:`Measurement` after each instrumented
+    call. Instrumentation is disabled while there are no sinks.
+    """
+    _sinks.append(sink)
+
+
+def remove_sink(sink):
+    _sinks.remove(sink)
+
+
+def start_tagging_specs(owner):
+    """ Store the specs of the queries built by the ``apply_*`` functions
+    in their :data:`SPECS_OPTION` execution option, until
+    :func:`stop_tagging_specs` is called with the same `owner`.
+    """
+    _spec_taggers.append(owner)
+
+
+def stop_tagging_specs(owner):
+    _spec_taggers.remove(owner)
+
+
+def tag_spec(query, name, spec):
+    """ Store `spec` in the execution options of `query`, under `name`
+    (e.g. ``'filter_spec'``), while specs are tagged.
+    """
+    if not _spec_taggers:
+        return query
+    specs = dict(query.get_execution_options().get(SPECS_OPTION, {}))
+    specs[name] = spec
+    return query.execution_options(**{SPECS_OPTION: specs})
+
+
+class _Recorder(object):
+
+    __slots__ = ('stages', 'counters')
+
+    def __init__(self):
+        self.stages = Counter()
+        self.counters = Counter()
+
+
+class _Stage(object):
+
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.stages[self.name] += time.perf_counter() - self.start
+
+
+class _NoStage(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """ Return a context manager that adds the time spent within it to the
+    stage `name` of the current instrumented call, if any.
+    """
+    recorder = _current.get()
+    if recorder is None:
+        return _NO_STAGE
+    return _Stage(recorder, name)
+
+
+def count(name, value=1):
+    """ Add `value` to the counter `name` of the current instrumented call,
+    if any.
+    """
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.counters[name] += value
+
+
+def instrumented(name):
+    """ Decorate a function to measure its calls, as `name`, while there
+    are sinks. Calls within other instrumented calls are measured on their
+    own.
+    """
+    def decorator(function):
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return function(*args, **kwargs)
+
+            recorder = _Recorder()
+            token = _current.set(recorder)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                _current.reset(token)
+                _emit(Measurement(
+                    name, duration, dict(recorder.stages),
+                    dict(recorder.counters)
+                ))
+
+        return wrapper
+
+    return decorator
+
+
+def _emit(measurement):
+    for sink in list(_sinks):
+        try:
+            sink(measurement)
+        except Exception:
+            logger.exception('Instrumentation sink failed.')
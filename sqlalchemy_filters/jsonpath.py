@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+import json
+import numbers
+import re
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.types import Boolean, Numeric, String
+
+from .exceptions import BadFilterFormat
+
+try:
+    from sqlalchemy.types import JSON
+except ImportError:  # pragma: no cover
+    JSON = None
+
+
+_KEY_RE = re.compile(r'^\w+$')
+
+
+def is_json(column):
+    """ Whether `column` has a JSON type. """
+    return JSON is not None and isinstance(getattr(column, 'type', None), JSON)
+
+
+def parse_json_path(path):
+    """ Split a dotted path (e.g. ``'sizes.0.width'``) into its keys, with
+    array indexes as integers, or return `None` if it's not valid.
+    """
+    keys = []
+    for key in path.split('.'):
+        if not _KEY_RE.match(key):
+            return None
+        keys.append(int(key) if key.isdigit() else key)
+    return tuple(keys)
+
+
+def check_json_key(key):
+    """ Raise :class:`BadFilterFormat` if `key` is not a valid top level
+    key of a JSON object, as used by ``json_has_key``.
+    """
+    if not isinstance(key, str) or not _KEY_RE.match(key):
+        raise BadFilterFormat('JSON key `{}` not valid.'.format(key))
+
+
+def get_value_type(value):
+    """ The type a JSON value is compared as: the type of the first item
+    for lists (e.g. for ``in``), and text by default.
+    """
+    if isinstance(value, (list, tuple, set)):
+        value = next((item for item in value if item is not None), None)
+    if isinstance(value, bool):
+        return Boolean()
+    if isinstance(value, numbers.Number):
+        return Numeric()
+    return String()
+
+
+class JSONPath(ColumnElement):
+    """ The value at `path` (a tuple of keys and array indexes) of a JSON
+    `column`, compared as `type_`.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, column, path, type_=None):
+        self.column = column
+        self.path = tuple(path)
+        self.type = type_ if type_ is not None else String()
+
+    @property
+    def _from_objects(self):
+        return self.column._from_objects
+
+    def get_children(self, **kwargs):
+        return [self.column]
+
+    def for_value(self, value):
+        """ Return this path, compared as the type of `value`. """
+        return JSONPath(self.column, self.path, get_value_type(value))
+
+
+def _split_document(document):
+    if isinstance(document, JSONPath):
+        return document.column, document.path
+
+    column = getattr(document, 'expression', document)
+    if not is_json(column):
+        raise BadFilterFormat(
+            'JSON operators can only be applied to JSON fields.'
+        )
+    return column, ()
+
+
+class _JSONPredicate(ColumnElement):
+
+    inherit_cache = False
+    type = Boolean()
+    _is_implicitly_boolean = True
+
+    def __init__(self, document, value):
+        self.column, self.path = _split_document(document)
+        self.value = value
+
+    @property
+    def _from_objects(self):
+        return self.column._from_objects
+
+    def get_children(self, **kwargs):
+        return [self.column]
+
+
+class JSONContains(_JSONPredicate):
+    """ Whether the JSON document contains `value`. """
+
+    inherit_cache = False
+
+
+class JSONHasKey(_JSONPredicate):
+    """ Whether the JSON object has the top level key `value`. """
+
+    inherit_cache = False
+
+    def __init__(self, document, key):
+        check_json_key(key)
+        super(JSONHasKey, self).__init__(document, key)
+
+
+def json_contains(document, value):
+    return JSONContains(document, value)
+
+
+def json_has_key(document, key):
+    return JSONHasKey(document, key)
+
+
+def _literal(compiler, value):
+    return compiler.render_literal_value(value, String())
+
+
+def _json_path_literal(compiler, path):
+    """ The ``$.key[0]`` path used by SQLite and MySQL. """
+    return _literal(compiler, '$' + ''.join(
+        '[{}]'.format(key) if isinstance(key, int) else '.{}'.format(key)
+        for key in path
+    ))
+
+
+def _postgresql_path(compiler, column, path, as_text, **kw):
+    column = compiler.process(column, **kw)
+    if not path:
+        return column
+    if len(path) == 1:
+        key = path[0]
+        return '({} {} {})'.format(
+            column, '->>' if as_text else '->',
+            key if isinstance(key, int) else _literal(compiler, key)
+        )
+    return '({} {} {})'.format(
+        column, '#>>' if as_text else '#>',
+        _literal(compiler, '{{{}}}'.format(','.join(map(str, path))))
+    )
+
+
+def _postgresql_jsonb(compiler, column, path, **kw):
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    document = _postgresql_path(compiler, column, path, False, **kw)
+    if isinstance(column.type, JSONB):
+        return document
+    return 'CAST({} AS JSONB)'.format(document)
+
+
+@compiles(JSONPath)
+@compiles(JSONContains)
+@compiles(JSONHasKey)
+def _compile_default(element, compiler, **kw):
+    raise CompileError(
+        'JSON paths are not supported by the {} dialect.'.format(
+            compiler.dialect.name
+        )
+    )
+
+
+@compiles(JSONPath, 'sqlite')
+def _compile_path_sqlite(element, compiler, **kw):
+    return 'json_extract({}, {})'.format(
+        compiler.process(element.column, **kw),
+        _json_path_literal(compiler, element.path),
+    )
+
+
+@compiles(JSONPath, 'mysql')
+def _compile_path_mysql(element, compiler, **kw):
+    sql = 'JSON_EXTRACT({}, {})'.format(
+        compiler.process(element.column, **kw),
+        _json_path_literal(compiler, element.path),
+    )
+    if isinstance(element.type, String):
+        sql = 'JSON_UNQUOTE({})'.format(sql)
+    return sql
+
+
+@compiles(JSONPath, 'postgresql')
+def _compile_path_postgresql(element, compiler, **kw):
+    sql = _postgresql_path(
+        compiler, element.column, element.path, True, **kw
+    )
+    if isinstance(element.type, Boolean):
+        return 'CAST({} AS BOOLEAN)'.format(sql)
+    if isinstance(element.type, Numeric):
+        return 'CAST({} AS NUMERIC)'.format(sql)
+    return sql
+
+
+@compiles(JSONContains, 'postgresql')
+def _compile_contains_postgresql(element, compiler, **kw):
+    return '{} @> CAST({} AS JSONB)'.format(
+        _postgresql_jsonb(compiler, element.column, element.path, **kw),
+        compiler.process(bindparam(None, json.dumps(element.value)), **kw),
+    )
+
+
+@compiles(JSONContains, 'mysql')
+def _compile_contains_mysql(element, compiler, **kw):
+    return 'JSON_CONTAINS({}, {}, {})'.format(
+        compiler.process(element.column, **kw),
+        compiler.process(bindparam(None, json.dumps(element.value)), **kw),
+        _json_path_literal(compiler, element.path),
+    )
+
+
+@compiles(JSONContains, 'sqlite')
+def _compile_contains_sqlite(element, compiler, **kw):
+    # SQLite has no containment operator: objects are expanded into a
+    # comparison per key, and arrays into an `EXISTS` per item
+    column = compiler.process(element.column, **kw)
+
+    def contains(path, value):
+        if isinstance(value, dict):
+            if not all(_KEY_RE.match(str(key)) for key in value):
+                raise CompileError('JSON keys `{}` not valid.'.format(
+                    ', '.join(map(str, value))
+                ))
+            return [
+                clause for key, item in value.items()
+                for clause in contains(path + (key,), item)
+            ]
+        if isinstance(value, list):
+            if any(isinstance(item, (dict, list)) for item in value):
+                raise CompileError(
+                    'Nested JSON arrays and objects in arrays are not '
+                    'supported by the sqlite dialect.'
+                )
+            return [
+                'EXISTS (SELECT 1 FROM json_each({}, {}) '
+                'WHERE json_each.value = {})'.format(
+                    column, _json_path_literal(compiler, path),
+                    compiler.process(bindparam(None, item), **kw),
+                )
+                for item in value
+            ]
+        return ['json_extract({}, {}) = {}'.format(
+            column, _json_path_literal(compiler, path),
+            compiler.process(bindparam(None, value), **kw),
+        )]
+
+    clauses = contains(element.path, element.value)
+    if not clauses:
+        return '1 = 1'
+    return '({})'.format(' AND '.join(clauses))
+
+
+@compiles(JSONHasKey, 'postgresql')
+def _compile_has_key_postgresql(element, compiler, **kw):
+    return '{} ? {}'.format(
+        _postgresql_jsonb(compiler, element.column, element.path, **kw),
+        _literal(compiler, element.value),
+    )
+
+
+@compiles(JSONHasKey, 'mysql')
+def _compile_has_key_mysql(element, compiler, **kw):
+    return "JSON_CONTAINS_PATH({}, 'one', {})".format(
+        compiler.process(element.column, **kw),
+        _json_path_literal(compiler, element.path + (element.value,)),
+    )
+
+
+@compiles(JSONHasKey, 'sqlite')
+def _compile_has_key_sqlite(element, compiler, **kw):
+    return 'json_type({}, {}) IS NOT NULL'.format(
+        compiler.process(element.column, **kw),
+        _json_path_literal(compiler, element.path + (element.value,)),
+    )
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from six import string_types
+
+from .exceptions import SpecTooComplex
+from .specs import (
+    _is_iterable_filter, get_boolean_function, normalize_load_spec
+)
+
+
+Limits = namedtuple(
+    'Limits',
+    [
+        'max_depth', 'max_predicates', 'max_models', 'max_list_size',
+        'max_sort_keys', 'max_load_fields',
+    ],
+    defaults=(None,) * 6,
+)
+"""
+The complexity allowed in the specs of untrusted clients. Limits left as
+`None` are not enforced.
+
+`max_depth` is the nesting of the boolean functions and lists of a filter
+spec, `max_predicates` the number of its filters, `max_models` the number
+of models named by a spec, each of which may be joined to the query, and
+`max_list_size` the size of a filter value: the number of items of a list
+(e.g. of ``in``) or dictionary (e.g. of ``json_contains``), nested ones
+included, or the length of a string.
+`max_sort_keys` and `max_load_fields` limit the number of sort items and
+of fields in a load spec.
+"""
+
+
+def _check_models(models, limit, spec_name):
+    if limit is not None and len(models) > limit:
+        raise SpecTooComplex(
+            '{} spec names more than {} models.'.format(spec_name, limit)
+        )
+
+
+def _check_depth(depth, limit):
+    if limit is not None and depth >= limit:
+        raise SpecTooComplex(
+            'Filter spec is nested more than {} levels deep.'.format(limit)
+        )
+
+
+def _exceeds_size(value, limit):
+    """ Whether `value` has more than `limit` items, counting the items of
+    nested lists and dictionaries, or characters. The walk stops as soon
+    as the limit is exceeded.
+    """
+    if isinstance(value, string_types):
+        return len(value) > limit
+
+    size = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            items = list(value.values())
+        elif isinstance(value, (list, tuple, set)):
+            items = list(value)
+        else:
+            continue
+        size += len(items)
+        if size > limit:
+            return True
+        stack.extend(items)
+    return False
+
+
+def check_filter_spec(filter_spec, limits):
+    """ Raise :class:`SpecTooComplex` if `filter_spec` exceeds `limits`.
+
+    The spec is walked without recursion, and the walk stops as soon as a
+    limit is exceeded. Lists nested in the spec are an implicit ``and``,
+    and count as a level of nesting. Malformed specs are left to
+    ``apply_filters``.
+    """
+    predicates = 0
+    models = set()
+    if _is_iterable_filter(filter_spec):
+        stack = [(item, 0) for item in filter_spec]
+    else:
+        stack = [(filter_spec, 0)]
+    while stack:
+        spec, depth = stack.pop()
+
+        if _is_iterable_filter(spec):
+            _check_depth(depth, limits.max_depth)
+            stack.extend((item, depth + 1) for item in spec)
+            continue
+        if not isinstance(spec, dict):
+            continue
+
+        boolean_function = get_boolean_function(spec)
+        if boolean_function is not None:
+            _check_depth(depth, limits.max_depth)
+            arguments = spec[boolean_function.key]
+            if _is_iterable_filter(arguments):
+                stack.extend((item, depth + 1) for item in arguments)
+            continue
+
+        predicates += 1
+        if (
+            limits.max_predicates is not None and
+            predicates > limits.max_predicates
+        ):
+            raise SpecTooComplex(
+                'Filter spec has more than {} filters.'.format(
+                    limits.max_predicates
+                )
+            )
+
+        if 'model' in spec:
+            models.add(spec['model'])
+            _check_models(models, limits.max_models, 'Filter')
+
+        value = spec.get('value')
+        if (
+            limits.max_list_size is not None and
+            _exceeds_size(value, limits.max_list_size)
+        ):
+            raise SpecTooComplex(
+                'Value of filter `{}` has more than {} {}.'.format(
+                    spec.get('field'), limits.max_list_size,
+                    'characters' if isinstance(value, string_types)
+                    else 'items'
+                )
+            )
+
+
+def check_sort_spec(sort_spec, limits):
+    """ Raise :class:`SpecTooComplex` if `sort_spec` exceeds `limits`. """
+    if isinstance(sort_spec, dict):
+        sort_spec = [sort_spec]
+    if not isinstance(sort_spec, (list, tuple)):
+        return
+
+    if limits.max_sort_keys is not None and (
+        len(sort_spec) > limits.max_sort_keys
+    ):
+        raise SpecTooComplex(
+            'Sort spec has more than {} items.'.format(limits.max_sort_keys)
+        )
+
+    _check_models(
+        {item['model'] for item in sort_spec
+         if isinstance(item, dict) and 'model' in item},
+        limits.max_models, 'Sort'
+    )
+
+
+def check_load_spec(load_spec, limits):
+    """ Raise :class:`SpecTooComplex` if `load_spec` exceeds `limits`. """
+    load_spec = normalize_load_spec(load_spec)
+    if not isinstance(load_spec, (list, tuple)):
+        return
+    load_spec = [item for item in load_spec if isinstance(item, dict)]
+
+    fields = sum(
+        len(item['fields']) for item in load_spec
+        if isinstance(item.get('fields'), (list, tuple))
+    )
+    if limits.max_load_fields is not None and (
+        fields > limits.max_load_fields
+    ):
+        raise SpecTooComplex(
+            'Load spec has more than {} fields.'.format(
+                limits.max_load_fields
+            )
+        )
+
+    _check_models(
+        {item['model'] for item in load_spec if 'model' in item},
+        limits.max_models, 'Load'
+    )
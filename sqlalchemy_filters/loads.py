@@ -1,7 +1,110 @@
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy.inspection import inspect
 from sqlalchemy.orm import Load
+from sqlalchemy.types import LargeBinary, PickleType, String, Text
 
 from .exceptions import BadLoadFormat
-from .models import Field, auto_join, get_model_from_spec, get_default_model
+from .instrumentation import count, instrumented, stage, tag_spec
+from .limits import check_load_spec
+from .models import (
+    Field, auto_join, get_default_model, get_model_from_spec,
+    get_relationship, sqlalchemy_version_lt
+)
+from .specs import normalize_load_spec
+
+try:
+    from sqlalchemy.types import ARRAY, JSON
+except ImportError:  # pragma: no cover
+    # both added in SQLAlchemy 1.1
+    ARRAY = JSON = None
+
+
+LOADING_STRATEGIES = {
+    'selectin': 'selectinload',
+    'joined': 'joinedload',
+    'subquery': 'subqueryload',
+    'raise': 'raiseload',
+}
+"""
+The strategies a relationship can be loaded with, and the matching
+:class:`sqlalchemy.orm.Load` methods.
+"""
+
+STRATEGY_MIN_VERSIONS = {
+    'selectin': '1.2',
+    'raise': '1.1',
+}
+"""
+The SQLAlchemy versions that added the loaders of some strategies.
+"""
+
+HEAVY_TYPES = tuple(
+    type_ for type_ in (Text, LargeBinary, PickleType, ARRAY, JSON)
+    if type_ is not None
+)
+"""
+Column types deferred by ``apply_loads(..., defer_heavy=True)``, which may
+hold documents of any size.
+"""
+
+HEAVY_LENGTH = 1000
+"""
+Strings longer than this are deferred as well.
+"""
+
+DeferredColumn = namedtuple('DeferredColumn', ['model', 'field', 'reason'])
+
+
+def split_field_path(model, field_name):
+    """ Split a dotted `field_name` (e.g. ``'bar.graults.name'``) into the
+    chain of relationships it follows from `model` and the name of the
+    field of the last related model.
+
+    :returns:
+        A list of :class:`sqlalchemy.orm.RelationshipProperty`, empty for
+        fields of `model`, and the field name.
+    """
+    *relationship_names, field_name = field_name.split('.')
+
+    path = []
+    for relationship_name in relationship_names:
+        relationship = get_relationship(model, relationship_name)
+        path.append(relationship)
+        model = relationship.mapper.class_
+    return path, field_name
+
+
+def load_only_paths(load, model, field_names):
+    """ Return the options that load only `field_names` from `load`, a
+    :class:`sqlalchemy.orm.Load` of `model`.
+
+    Dotted field names restrict the columns of related models, along a
+    chain of ``defaultload`` options that keep the strategy of each
+    relationship. There is an option per relationship path.
+    """
+    paths = OrderedDict()
+    for field_name in field_names:
+        path, name = split_field_path(model, field_name)
+        paths.setdefault(tuple(path), []).append(name)
+
+    if not paths:
+        # without any field, every column but the primary key is deferred
+        paths[()] = []
+
+    options = []
+    for path, names in paths.items():
+        path_load = load
+        path_model = model
+        for relationship in path:
+            path_load = path_load.defaultload(
+                getattr(path_model, relationship.key)
+            )
+            path_model = relationship.mapper.class_
+        options.append(path_load.load_only(*[
+            Field(path_model, name).get_sqlalchemy_field() for name in names
+        ]))
+    return options
 
 
 class LoadOnly(object):
@@ -26,17 +129,172 @@ class LoadOnly(object):
         return set()
 
     def format_for_sqlalchemy(self, query, default_model):
-        load_spec = self.load_spec
-        field_names = self.field_names
+        """ Return the :class:`sqlalchemy.orm.Load` option of the spec.
+
+        Fields of several relationship paths need an option per path:
+        use :meth:`get_options` for them.
+        """
+        options = self.get_options(query, default_model)
+        if len(options) > 1:
+            raise BadLoadFormat(
+                'Load spec `{}` needs an option per relationship path: use '
+                '`get_options`.'.format(self.load_spec)
+            )
+        return options[0]
+
+    def get_options(self, query, default_model):
+        """ Return the list of :class:`sqlalchemy.orm.Load` options of the
+        spec, one per relationship path of its fields.
+        """
+        model = get_model_from_spec(self.load_spec, query, default_model)
+        return load_only_paths(Load(model), model, self.field_names)
+
 
-        model = get_model_from_spec(load_spec, query, default_model)
-        fields = [Field(model, field_name) for field_name in field_names]
+class LoadRelationship(object):
 
-        return Load(model).load_only(
-            *[field.get_sqlalchemy_field() for field in fields]
+    def __init__(self, load_spec):
+        self.load_spec = load_spec
+
+        try:
+            relationship_name = load_spec['relationship']
+            strategy = load_spec['strategy']
+        except KeyError:
+            raise BadLoadFormat(
+                '`relationship` and `strategy` are mandatory attributes.'
+            )
+
+        if strategy not in LOADING_STRATEGIES:
+            raise BadLoadFormat('Strategy `{}` not valid.'.format(strategy))
+
+        field_names = load_spec.get('fields')
+        if field_names and strategy == 'raise':
+            raise BadLoadFormat(
+                'Fields cannot be loaded with the `raise` strategy.'
+            )
+
+        min_version = STRATEGY_MIN_VERSIONS.get(strategy)
+        if min_version is not None and sqlalchemy_version_lt(min_version):
+            raise BadLoadFormat(
+                'Strategy `{}` requires SQLAlchemy {} or later.'.format(
+                    strategy, min_version
+                )
+            )
+
+        self.relationship_name = relationship_name
+        self.strategy = strategy
+        self.field_names = field_names or []
+
+    def get_named_models(self):
+        if "model" in self.load_spec:
+            return {self.load_spec['model']}
+        return set()
+
+    def get_options(self, query, default_model):
+        model = get_model_from_spec(self.load_spec, query, default_model)
+        relationship = get_relationship(model, self.relationship_name)
+        load = getattr(Load(model), LOADING_STRATEGIES[self.strategy])(
+            getattr(model, self.relationship_name)
+        )
+        if not self.field_names:
+            return [load]
+        return load_only_paths(
+            load, relationship.mapper.class_, self.field_names
         )
 
 
+def get_heavy_columns(model, max_length=HEAVY_LENGTH):
+    """ Return a :class:`DeferredColumn` for every heavy column of `model`.
+
+    Columns are heavy if their type is one of :data:`HEAVY_TYPES`, or a
+    string longer than `max_length`, and their `reason` is the type. The
+    ``heavy`` key of the column `info` overrides it either way, e.g.
+    ``Column(String(100), info={'heavy': True})``, with ``'info'`` as the
+    `reason`. Primary keys are never heavy.
+    """
+    columns = []
+    for attribute in inspect(model).column_attrs:
+        column = attribute.columns[0]
+        if getattr(column, 'primary_key', False):
+            continue
+
+        heavy = getattr(column, 'info', {}).get('heavy')
+        if heavy is not None:
+            reason = 'info'
+        else:
+            type_ = getattr(column, 'type', None)
+            heavy = isinstance(type_, HEAVY_TYPES) or (
+                isinstance(type_, String) and type_.length is not None and
+                type_.length > max_length
+            )
+            reason = repr(type_)
+
+        if heavy:
+            columns.append(
+                DeferredColumn(model.__name__, attribute.key, reason)
+            )
+    return columns
+
+
+def _get_queried_models(query):
+    return [
+        description['entity'] for description in query.column_descriptions
+        if description['entity'] is not None and
+        description['type'] is description['entity']
+    ]
+
+
+def get_heavy_deferrals(query, loads, default_model, max_length):
+    """ Return the options that defer the heavy columns of the models that
+    `loads` don't restrict, and the deferred columns.
+
+    These are the queried models without a :class:`LoadOnly`, and the
+    models loaded through a :class:`LoadRelationship` without `fields`.
+    """
+    restricted = {
+        get_model_from_spec(load.load_spec, query, default_model)
+        for load in loads if isinstance(load, LoadOnly)
+    }
+
+    options = []
+    deferred = []
+    for model in _get_queried_models(query):
+        if model in restricted:
+            continue
+        columns = get_heavy_columns(model, max_length)
+        options.extend(
+            Load(model).defer(getattr(model, column.field))
+            for column in columns
+        )
+        deferred.extend(columns)
+
+    for load in loads:
+        if not isinstance(load, LoadRelationship) or load.field_names or (
+            load.strategy == 'raise'
+        ):
+            continue
+        model = get_model_from_spec(load.load_spec, query, default_model)
+        target = get_relationship(model, load.relationship_name).mapper.class_
+        columns = get_heavy_columns(target, max_length)
+        options.extend(
+            getattr(Load(model), LOADING_STRATEGIES[load.strategy])(
+                getattr(model, load.relationship_name)
+            ).defer(getattr(target, column.field))
+            for column in columns
+        )
+        deferred.extend(columns)
+
+    return options, deferred
+
+
+def build_load(load_spec):
+    """ Return the :class:`LoadRelationship` of a load spec that names a
+    `relationship`, and the :class:`LoadOnly` of any other.
+    """
+    if isinstance(load_spec, dict) and 'relationship' in load_spec:
+        return LoadRelationship(load_spec)
+    return LoadOnly(load_spec)
+
+
 def get_named_models(loads):
     models = set()
     for load in loads:
@@ -44,7 +302,32 @@ def get_named_models(loads):
     return models
 
 
-def apply_loads(query, load_spec):
+def _build_loads(query, load_spec):
+    with stage('parse'):
+        if load_spec is None:
+            load_spec = []
+        else:
+            load_spec = normalize_load_spec(load_spec)
+
+        loads = [build_load(item) for item in load_spec]
+    count('loads', len(loads))
+
+    with stage('resolve'):
+        default_model = get_default_model(query)
+
+    load_models = get_named_models(loads)
+    query = auto_join(query, *load_models)
+    return query, loads, default_model
+
+
+def _get_max_length(defer_heavy):
+    if defer_heavy is True:
+        return HEAVY_LENGTH
+    return defer_heavy
+
+
+@instrumented('apply_loads')
+def apply_loads(query, load_spec=None, defer_heavy=False, limits=None):
     """Apply load restrictions to a :class:`sqlalchemy.orm.Query` instance.
 
     :param load_spec:
@@ -64,30 +347,73 @@ def apply_loads(query, load_spec):
 
             load_spec = ['id', 'name']
 
+        Fields of related models are named by dotted relationship paths,
+        and they are loaded only when the relationships are::
+
+            load_spec = [
+                {'model': 'Foo', 'fields': ['id', 'name', 'bar.name']},
+            ]
+
+        Relationships are loaded with a `strategy` (``selectin``,
+        ``joined``, ``subquery`` or ``raise``) and, optionally, only the
+        `fields` of the related model::
+
+            load_spec = [
+                {'model': 'Bar', 'fields': ['id', 'name']},
+                {
+                    'model': 'Bar', 'relationship': 'foos',
+                    'strategy': 'selectin', 'fields': ['id', 'count'],
+                },
+            ]
+
+    :param defer_heavy:
+        Whether to defer the heavy columns (see :func:`get_heavy_columns`)
+        of the models the load spec doesn't restrict. An integer sets the
+        length above which strings are heavy, instead of
+        :data:`HEAVY_LENGTH`. Use :func:`get_deferred_columns` to see
+        which columns are deferred.
+
+    :param limits:
+        A :class:`~sqlalchemy_filters.limits.Limits` instance. Specs that
+        exceed it raise :class:`~sqlalchemy_filters.exceptions.SpecTooComplex`
+        before the query is modified.
+
     :returns:
         The :class:`sqlalchemy.orm.Query` instance after the load restrictions
         have been applied.
     """
-    if (
-        isinstance(load_spec, list) and
-        all(map(lambda item: isinstance(item, str), load_spec))
-    ):
-        load_spec = {'fields': load_spec}
+    if limits is not None and load_spec is not None:
+        check_load_spec(load_spec, limits)
 
-    if isinstance(load_spec, dict):
-        load_spec = [load_spec]
+    query, loads, default_model = _build_loads(query, load_spec)
 
-    loads = [LoadOnly(item) for item in load_spec]
-
-    default_model = get_default_model(query)
-
-    load_models = get_named_models(loads)
-    query = auto_join(query, *load_models)
-
-    sqlalchemy_loads = [
-        load.format_for_sqlalchemy(query, default_model) for load in loads
-    ]
+    with stage('build'):
+        sqlalchemy_loads = [
+            option for load in loads
+            for option in load.get_options(query, default_model)
+        ]
+        if defer_heavy:
+            options, _ = get_heavy_deferrals(
+                query, loads, default_model, _get_max_length(defer_heavy)
+            )
+            sqlalchemy_loads.extend(options)
     if sqlalchemy_loads:
         query = query.options(*sqlalchemy_loads)
 
+    if load_spec is not None:
+        query = tag_spec(query, 'load_spec', load_spec)
     return query
+
+
+def get_deferred_columns(query, load_spec=None, defer_heavy=True):
+    """ Report the heavy columns ``apply_loads`` would defer.
+
+    :returns:
+        A list of :class:`DeferredColumn`, with the name of the model, the
+        field and the `reason` the column is heavy.
+    """
+    query, loads, default_model = _build_loads(query, load_spec)
+    _, deferred = get_heavy_deferrals(
+        query, loads, default_model, _get_max_length(defer_heavy)
+    )
+    return deferred
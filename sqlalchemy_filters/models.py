@@ -1,11 +1,23 @@
 from sqlalchemy import __version__ as sqlalchemy_version
 from sqlalchemy.exc import InvalidRequestError
-from sqlalchemy.orm import mapperlib
+from sqlalchemy.orm import configure_mappers, mapperlib
 from sqlalchemy.inspection import inspect
+from sqlalchemy.sql.expression import ClauseElement
 from sqlalchemy.util import symbol
+import gc
 import types
 
-from .exceptions import BadQuery, FieldNotFound, BadSpec
+from .exceptions import BadModel, BadQuery, FieldNotFound, BadSpec
+from .instrumentation import count, stage
+from .jsonpath import JSONPath, is_json, parse_json_path
+
+
+# lookups of the models given to `prepare`, which are not recomputed
+_prepared_models = set()
+_field_names = {}
+_models_by_name = {}
+_models_by_table = {}
+_relationship_paths = {}
 
 
 def sqlalchemy_version_lt(version):
@@ -22,6 +34,9 @@ class Field(object):
 
     def get_sqlalchemy_field(self):
         if self.field_name not in self._get_valid_field_names():
+            json_path = get_json_path(self.model, self.field_name)
+            if json_path is not None:
+                return json_path
             raise FieldNotFound(
                 'Model {} has no column `{}`.'.format(
                     self.model, self.field_name
@@ -37,17 +52,61 @@ class Field(object):
         return sqlalchemy_field
 
     def _get_valid_field_names(self):
-        inspect_mapper = inspect(self.model)
-        columns = inspect_mapper.columns
-        orm_descriptors = inspect_mapper.all_orm_descriptors
-
-        column_names = columns.keys()
-        hybrid_names = [
-            key for key, item in orm_descriptors.items()
-            if _is_hybrid_property(item) or _is_hybrid_method(item)
-        ]
+        return get_model_field_names(self.model)
+
+
+def get_json_path(model, field_name):
+    """ Return the :class:`~sqlalchemy_filters.jsonpath.JSONPath` named by
+    `field_name` (e.g. ``'attrs.color'``), or `None` if it does not name a
+    path in a JSON column of `model`.
+    """
+    column_name, _, path = field_name.partition('.')
+    columns = inspect(model).columns
+    if not path or column_name not in columns:
+        return None
+
+    keys = parse_json_path(path)
+    if keys is None or not is_json(columns[column_name]):
+        return None
+    return JSONPath(getattr(model, column_name).expression, keys)
+
+
+def get_relationship(model, relationship_name):
+    """ Return the :class:`sqlalchemy.orm.RelationshipProperty` of `model`
+    named `relationship_name`.
+    """
+    relationship = inspect(model).relationships.get(relationship_name)
+    if relationship is None:
+        raise FieldNotFound(
+            'Model {} has no relationship `{}`.'.format(
+                model, relationship_name
+            )
+        )
+    return relationship
+
+
+def get_model_field_names(model):
+    """ Return the names of the columns and hybrid attributes of `model`
+    that can be used in a spec.
+    """
+    try:
+        return _field_names[model]
+    except KeyError:
+        return _get_model_field_names(model)
 
-        return set(column_names) | set(hybrid_names)
+
+def _get_model_field_names(model):
+    inspect_mapper = inspect(model)
+    columns = inspect_mapper.columns
+    orm_descriptors = inspect_mapper.all_orm_descriptors
+
+    column_names = columns.keys()
+    hybrid_names = [
+        key for key, item in orm_descriptors.items()
+        if _is_hybrid_property(item) or _is_hybrid_method(item)
+    ]
+
+    return frozenset(column_names) | frozenset(hybrid_names)
 
 
 def _is_hybrid_property(orm_descriptor):
@@ -60,7 +119,12 @@ def _is_hybrid_method(orm_descriptor):
 
 def get_model_from_table(table):  # pragma: no_cover_sqlalchemy_lt_1_4
     """Resolve model class from table object"""
+    if table in _models_by_table:
+        return _models_by_table[table]
+    return _get_model_from_table(table)
+
 
+def _get_model_from_table(table):  # pragma: no_cover_sqlalchemy_lt_1_4
     for registry in mapperlib._all_registries():
         for mapper in registry.mappers:
             if table in mapper.tables:
@@ -77,7 +141,11 @@ def get_query_models(query):
     :returns:
         A dictionary with all the models included in the query.
     """
-    models = [col_desc['entity'] for col_desc in query.column_descriptions]
+    models = [
+        col_desc['entity'] for col_desc in query.column_descriptions
+        # columns such as `func.count()` belong to no model
+        if col_desc['entity'] is not None
+    ]
 
     # account joined entities
     if sqlalchemy_version_lt('1.4'):  # pragma: no_cover_sqlalchemy_gte_1_4
@@ -165,11 +233,73 @@ def get_model_from_spec(spec, query, default_model=None):
 def get_model_class_by_name(registry, name):
     """ Return the model class matching `name` in the given `registry`.
     """
+    cached = _models_by_name.get((id(registry), name))
+    if cached is not None and cached[0] is registry:
+        return cached[1]
+
     for cls in registry.values():
         if getattr(cls, '__name__', None) == name:
             return cls
 
 
+def get_model_registry(model):
+    """ Return the class registry shared by `model` and the other models
+    declared with the same base.
+    """
+    if sqlalchemy_version_lt('1.4'):  # pragma: no_cover_sqlalchemy_gte_1_4
+        return model._decl_class_registry
+    else:  # pragma: no_cover_sqlalchemy_lt_1_4
+        return model.registry._class_registry
+
+
+def get_relationship_path(models, model_name):
+    """ Find the shortest chain of relationships from any of `models` to the
+    model named `model_name`.
+
+    :returns:
+        A list of :class:`sqlalchemy.orm.RelationshipProperty`, the first
+        one defined on a model from `models`, or `None` if the model can't
+        be reached.
+    """
+    models = tuple(models)
+    key = (models, model_name)
+    if key in _relationship_paths:
+        path = _relationship_paths[key]
+        return None if path is None else list(path)
+
+    path = _get_relationship_paths(models, model_name)
+    if _prepared_models.issuperset(models):
+        _relationship_paths[key] = None if path is None else tuple(path)
+    return path
+
+
+def _get_relationship_paths(models, model_name=None):
+    """ Search the relationships from `models` breadth first, and return
+    the path to the first model named `model_name` found, or the paths to
+    every model found, by name, if `model_name` is `None`.
+    """
+    visited = set(models)
+    paths = [(model, []) for model in models]
+    found = {}
+
+    while paths:
+        next_paths = []
+        for model, path in paths:
+            for relationship in inspect(model).relationships:
+                target = relationship.mapper.class_
+                if target in visited:
+                    continue
+                if model_name is None:
+                    found.setdefault(target.__name__, path + [relationship])
+                elif target.__name__ == model_name:
+                    return path + [relationship]
+                visited.add(target)
+                next_paths.append((target, path + [relationship]))
+        paths = next_paths
+
+    return None if model_name is not None else found
+
+
 def get_default_model(query):
     """ Return the singular model from `query`, or `None` if `query` contains
     multiple models.
@@ -186,18 +316,20 @@ def auto_join(query, *model_names):
     """ Automatically join models to `query` if they're not already present
     and the join can be done implicitly.
     """
+    with stage('join'):
+        return _auto_join(query, model_names)
+
+
+def _auto_join(query, model_names):
     # every model has access to the registry, so we can use any from the query
     query_models = get_query_models(query).values()
     last_model = list(query_models)[-1]
-    model_registry = (
-        last_model._decl_class_registry
-        if sqlalchemy_version_lt('1.4')
-        else last_model.registry._class_registry
-    )
+    model_registry = get_model_registry(last_model)
 
     for name in model_names:
         model = get_model_class_by_name(model_registry, name)
         if model and (model not in get_query_models(query).values()):
+            count('joins_attempted')
             try:
                 if sqlalchemy_version_lt('1.4'):  # pragma: no_cover_sqlalchemy_gte_1_4
                     query = query.join(model)
@@ -208,6 +340,107 @@ def auto_join(query, *model_names):
                     tmp = query.join(model)
                     tmp._compile_state()
                     query = tmp
+                count('joins')
             except InvalidRequestError:
                 pass  # can't be autojoined
     return query
+
+
+def _get_models(models):
+    """ Return the models of `models`: a registry, a declarative base or an
+    iterable of models.
+    """
+    if hasattr(models, 'mappers'):  # pragma: no_cover_sqlalchemy_lt_1_4
+        return [mapper.class_ for mapper in models.mappers]
+    if isinstance(models, type):
+        return [
+            cls for cls in get_model_registry(models).values()
+            if isinstance(cls, type) and hasattr(cls, '__mapper__')
+        ]
+    return list(models)
+
+
+def _check_hybrids(model, field_names):
+    """ Evaluate the hybrid attributes of `model` as SQL expressions, as
+    specs will, and raise :class:`BadModel` if any of them fails.
+    """
+    for field_name in sorted(field_names - set(inspect(model).columns.keys())):
+        try:
+            expression = Field(model, field_name).get_sqlalchemy_field()
+        except Exception as error:
+            raise BadModel(
+                'Hybrid attribute `{}.{}` could not be evaluated as a SQL '
+                'expression: {!r}'.format(model.__name__, field_name, error)
+            )
+        if hasattr(expression, '__clause_element__'):
+            try:
+                expression = expression.__clause_element__()
+            except InvalidRequestError as error:
+                # SQLAlchemy 1.4 only coerces the value of a hybrid
+                # property (e.g. a constant) when it is used
+                expression = error
+        if not isinstance(expression, ClauseElement):
+            raise BadModel(
+                'Hybrid attribute `{}.{}` is not a SQL expression: '
+                '{!r}'.format(model.__name__, field_name, expression)
+            )
+
+
+def prepare(models, freeze=False):
+    """Build the lookups of `models` ahead of the first query.
+
+    The mappers are configured, and the field names, the model names and
+    tables, and the relationship paths between `models` are computed once
+    and reused by every spec. Hybrid attributes are evaluated, so that
+    misconfigured ones fail at startup rather than in the first request.
+
+    Call it before forking worker processes, so that they share the
+    lookups copy-on-write. Models declared after `prepare` are looked up
+    as usual.
+
+    :param models:
+        A :class:`sqlalchemy.orm.registry`, a declarative base or an
+        iterable of models.
+
+    :param freeze:
+        Whether to call :func:`gc.freeze` afterwards, so that the garbage
+        collector of the children doesn't touch (and copy) the objects of
+        the parent process.
+
+    :returns:
+        The list of prepared models.
+
+    :raise BadModel:
+        If a hybrid attribute can't be evaluated as a SQL expression.
+    """
+    configure_mappers()
+    models = _get_models(models)
+
+    for model in models:
+        field_names = _get_model_field_names(model)
+        _check_hybrids(model, field_names)
+        _field_names[model] = field_names
+
+        registry = get_model_registry(model)
+        _models_by_name[(id(registry), model.__name__)] = (
+            registry, get_model_class_by_name(registry, model.__name__)
+        )
+
+        if not sqlalchemy_version_lt('1.4'):  # pragma: no_cover_sqlalchemy_lt_1_4
+            for table in inspect(model).tables:
+                _models_by_table[table] = _get_model_from_table(table)
+
+    _prepared_models.update(models)
+    model_names = {model.__name__ for model in _prepared_models}
+    for model in models:
+        paths = _get_relationship_paths([model])
+        for model_name in model_names:
+            path = paths.get(model_name)
+            _relationship_paths[((model,), model_name)] = (
+                None if path is None else tuple(path)
+            )
+
+    if freeze:
+        gc.freeze()
+
+    return models
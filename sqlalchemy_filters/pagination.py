@@ -3,8 +3,10 @@ import math
 from collections import namedtuple
 
 from sqlalchemy_filters.exceptions import InvalidPage
+from sqlalchemy_filters.instrumentation import instrumented, stage
 
 
+@instrumented('apply_pagination')
 def apply_pagination(query, page_number=None, page_size=None):
     """Apply pagination to a SQLAlchemy query object.
 
@@ -39,7 +41,8 @@ def apply_pagination(query, page_number=None, page_size=None):
         22
         >>> page_size, page_number, num_pages, total_results = pagination
     """
-    total_results = query.count()
+    with stage('execute'):
+        total_results = query.count()
     query = _limit(query, page_size)
 
     # Page size defaults to total results
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import time
+
+from sqlalchemy import event
+
+
+_STOP = object()
+
+
+class SlowStatementRecorder(object):
+    """Time the statements executed by an engine, and handle the ones that
+    take longer than `threshold` seconds from a background thread.
+
+    Subclasses implement ``_capture(statement, parameters, context,
+    executemany, duration)``, which runs while the queries run and returns
+    what they need of a slow statement, or `None` to ignore it, and
+    ``_handle(capture)``, which is called from the background thread in the
+    order the statements complete. Captures are dropped, and counted in
+    ``dropped``, if more than `buffer_size` are waiting.
+    """
+
+    thread_name = 'sqlalchemy-filters-recorder'
+
+    def __init__(self, threshold, buffer_size):
+        self.threshold = threshold
+        self.dropped = 0
+        self.engine = None
+        self._queue = queue.Queue(maxsize=buffer_size)
+        self._thread = None
+        # the start of a statement is stored on its execution context, per
+        # recorder, so that it's never left behind on its connection
+        self._start_attribute = '_sqlalchemy_filters_start_{}'.format(
+            id(self)
+        )
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        self.engine = engine
+        self._thread = threading.Thread(
+            target=self._process, name=self.thread_name, daemon=True
+        )
+        self._thread.start()
+
+    def detach(self):
+        """ Stop capturing, and wait for the pending captures to be
+        handled.
+        """
+        event.remove(
+            self.engine, 'before_cursor_execute', self._before_execute
+        )
+        event.remove(self.engine, 'after_cursor_execute', self._after_execute)
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self.engine = None
+
+    def flush(self):
+        """ Wait for the pending captures to be handled. """
+        self._queue.join()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context,
+                        executemany):
+        if context is not None:
+            setattr(context, self._start_attribute, time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context,
+                       executemany):
+        # statements started before the recorder was attached have no start
+        start = getattr(context, self._start_attribute, None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        if duration < self.threshold:
+            return
+
+        capture = self._capture(
+            statement, parameters, context, executemany, duration
+        )
+        if capture is None:
+            return
+
+        try:
+            self._queue.put_nowait(capture)
+        except queue.Full:
+            self.dropped += 1
+
+    def _process(self):
+        while True:
+            capture = self._queue.get()
+            try:
+                if capture is _STOP:
+                    return
+                self._handle(capture)
+            finally:
+                self._queue.task_done()
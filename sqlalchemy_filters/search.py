@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import re
+
+from six import string_types
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.inspection import inspect
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.types import Boolean, Float
+
+from .exceptions import BadFilterFormat, BadSpec
+
+
+FTS_INDEXES = {}
+"""
+Full-text indexes declared with :func:`register_fts_index`, by
+``(model, field_name)``.
+"""
+
+_CONFIG_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+
+
+class FullTextIndex(object):
+    """ Maps model fields to a full-text index.
+
+    On SQLite, `name` is the FTS5 table, created with the model table as
+    external content and its primary key as ``content_rowid``. On
+    PostgreSQL, `config` is the text search configuration used both in the
+    ``to_tsvector`` expression index and in the generated queries. On
+    MySQL, a ``FULLTEXT`` index on the columns is expected.
+    """
+
+    def __init__(self, model, fields, name=None, config='english'):
+        if not _CONFIG_RE.match(config):
+            raise BadSpec(
+                'Text search configuration `{}` not valid.'.format(config)
+            )
+
+        if isinstance(fields, dict):
+            columns = dict(fields)
+        else:
+            columns = {field: field for field in fields}
+
+        self.model = model
+        self.columns = columns
+        self.name = name or '{}_fts'.format(model.__tablename__)
+        self.config = config
+
+    @property
+    def fields(self):
+        return list(self.columns)
+
+
+def register_fts_index(model, fields, name=None, config='english'):
+    """ Declare the full-text index that serves `fields` of `model`.
+
+    :param fields:
+        A list of field names, or a dictionary mapping field names to the
+        column names of the FTS5 table when they differ.
+
+    :returns:
+        The registered :class:`FullTextIndex`.
+    """
+    index = FullTextIndex(model, fields, name=name, config=config)
+    for field_name in index.columns:
+        FTS_INDEXES[(model, field_name)] = index
+    return index
+
+
+def unregister_fts_index(index):
+    for field_name in index.columns:
+        FTS_INDEXES.pop((index.model, field_name), None)
+
+
+def get_fts_index(model, field_name):
+    try:
+        return FTS_INDEXES[(model, field_name)]
+    except KeyError:
+        raise BadSpec(
+            'Field `{}` of model {} has no full-text index.'.format(
+                field_name, model
+            )
+        )
+
+
+class _FullTextElement(ColumnElement):
+
+    def __init__(self, field, terms, plain):
+        # hybrid attributes can't be backed by a full-text index
+        self.model = getattr(field, 'class_', None)
+        self.field_name = getattr(field, 'key', None)
+        self.index = get_fts_index(self.model, self.field_name)
+        self.field = field
+        self.terms = terms
+        self.plain = plain
+
+    @property
+    def column(self):
+        return self.field.expression
+
+    def fts5_query(self):
+        if not self.plain:
+            return self.terms
+        # quoted tokens are matched as plain strings, not FTS5 syntax
+        return ' '.join(
+            '"{}"'.format(token.replace('"', '""'))
+            for token in self.terms.split()
+        )
+
+    def tsvector(self):
+        return func.to_tsvector(self.regconfig(), self.column)
+
+    def tsquery(self):
+        function = func.plainto_tsquery if self.plain else func.to_tsquery
+        return function(self.regconfig(), literal(self.terms))
+
+    def regconfig(self):
+        return literal_column("'{}'".format(self.index.config))
+
+    def primary_key(self):
+        return inspect(self.model).primary_key[0]
+
+
+class FullTextMatch(_FullTextElement):
+    """ Boolean full-text predicate on a field with a declared index. """
+
+    inherit_cache = False
+    type = Boolean()
+    _is_implicitly_boolean = True
+
+
+class FullTextRank(_FullTextElement):
+    """ Relevance of a field for a plain-text search: higher is better. """
+
+    inherit_cache = False
+    type = Float()
+
+
+def _fts5_subquery(compiler, element, select_expression, **kw):
+    index = element.index
+    return (
+        '(SELECT {select} FROM {table} '
+        'WHERE {table}.{column} MATCH {terms}{correlation})'
+    ).format(
+        select=select_expression,
+        table=compiler.preparer.quote(index.name),
+        column=compiler.preparer.quote(index.columns[element.field_name]),
+        terms=compiler.process(literal(element.fts5_query()), **kw),
+        correlation=(
+            ' AND {}.rowid = {}'.format(
+                compiler.preparer.quote(index.name),
+                compiler.process(element.primary_key(), **kw)
+            )
+            if select_expression != 'rowid' else ''
+        ),
+    )
+
+
+@compiles(FullTextMatch)
+@compiles(FullTextRank)
+def _compile_default(element, compiler, **kw):
+    raise CompileError(
+        'Full-text search is not supported by the {} dialect.'.format(
+            compiler.dialect.name
+        )
+    )
+
+
+@compiles(FullTextMatch, 'sqlite')
+def _compile_match_sqlite(element, compiler, **kw):
+    return '{} IN {}'.format(
+        compiler.process(element.primary_key(), **kw),
+        _fts5_subquery(compiler, element, 'rowid', **kw),
+    )
+
+
+@compiles(FullTextRank, 'sqlite')
+def _compile_rank_sqlite(element, compiler, **kw):
+    # bm25 is lower for better matches
+    return 'coalesce({}, 0)'.format(_fts5_subquery(
+        compiler, element,
+        '-bm25({})'.format(compiler.preparer.quote(element.index.name)),
+        **kw
+    ))
+
+
+@compiles(FullTextMatch, 'postgresql')
+def _compile_match_postgresql(element, compiler, **kw):
+    return '{} @@ {}'.format(
+        compiler.process(element.tsvector(), **kw),
+        compiler.process(element.tsquery(), **kw),
+    )
+
+
+@compiles(FullTextRank, 'postgresql')
+def _compile_rank_postgresql(element, compiler, **kw):
+    return compiler.process(
+        func.ts_rank(element.tsvector(), element.tsquery()), **kw
+    )
+
+
+@compiles(FullTextMatch, 'mysql')
+def _compile_match_mysql(element, compiler, **kw):
+    return 'MATCH ({}) AGAINST ({}{})'.format(
+        compiler.process(element.column, **kw),
+        compiler.process(literal(element.terms), **kw),
+        '' if element.plain else ' IN BOOLEAN MODE',
+    )
+
+
+@compiles(FullTextRank, 'mysql')
+def _compile_rank_mysql(element, compiler, **kw):
+    return _compile_match_mysql(element, compiler, **kw)
+
+
+def _check_terms(terms, operator):
+    if not isinstance(terms, string_types):
+        raise BadFilterFormat(
+            'Value `{}` of operator `{}` must be a string.'.format(
+                terms, operator
+            )
+        )
+
+
+def fts_match(field, terms):
+    """ Match `field` against `terms` using the full-text query syntax of
+    the database (FTS5 queries, ``to_tsquery`` or boolean mode).
+
+    `terms` are passed to the database as they are: malformed queries fail
+    when the query runs, and FTS5 queries may filter other columns of the
+    FTS5 table. Only use it with trusted input, and :func:`fts_search`
+    (the ``search`` operator) with the input of clients.
+    """
+    _check_terms(terms, 'match')
+    return FullTextMatch(field, terms, plain=False)
+
+
+def fts_search(field, terms):
+    """ Match `field` against plain-text `terms`, with no query syntax. """
+    _check_terms(terms, 'search')
+    return FullTextMatch(field, terms, plain=True)
+
+
+def fts_rank(field, terms):
+    return FullTextRank(field, terms, plain=True)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import namedtuple
+
+from .fingerprint import fingerprint
+from .instrumentation import (  # noqa: F401
+    SPECS_OPTION, start_tagging_specs, stop_tagging_specs
+)
+from .recorder import SlowStatementRecorder
+
+
+logger = logging.getLogger(__name__)
+
+
+SlowSpec = namedtuple(
+    'SlowSpec',
+    ['specs', 'fingerprint', 'statement', 'parameters', 'duration']
+)
+"""
+A slow query: the original `specs` it was built with (a dictionary of
+``filter_spec``, ``sort_spec`` and ``load_spec``), their `fingerprint`
+(ignoring the values), the `statement` as executed, its bound `parameters`
+and the `duration` of its execution, in seconds.
+"""
+
+
+def _log_record(record):
+    logger.warning(
+        'Slow query (%.3fs) built from specs %r (fingerprint %s): %s %r',
+        record.duration, record.specs, record.fingerprint, record.statement,
+        record.parameters, extra={'slow_spec': record}
+    )
+
+
+class SlowSpecLog(SlowStatementRecorder):
+    """Record the queries built by the ``apply_*`` functions that take
+    longer than `threshold` seconds, with the specs they were built from.
+
+    Only the statements, parameters and durations are captured while the
+    queries run. Fingerprints, the `redact` hook and the `handler` are
+    called from a background thread, which processes the records in the
+    order they are captured. Records are dropped, and counted in
+    ``dropped``, if more than `buffer_size` are waiting.
+
+    :param handler:
+        Called with each :class:`SlowSpec`. Defaults to a warning of the
+        ``sqlalchemy_filters.slowlog`` logger, with the record in its
+        ``slow_spec`` attribute.
+
+    :param redact:
+        Called with each :class:`SlowSpec`, and returns the record to
+        handle, e.g. ``record._replace(parameters=None)``.
+
+    Basic usage::
+
+        slow_log = SlowSpecLog(threshold=0.5)
+        slow_log.attach(engine)
+        # ...
+        slow_log.detach()
+    """
+
+    thread_name = 'sqlalchemy-filters-slowlog'
+
+    def __init__(self, handler=None, threshold=0.5, redact=None,
+                 buffer_size=1000):
+        super(SlowSpecLog, self).__init__(threshold, buffer_size)
+        self.handler = _log_record if handler is None else handler
+        self.redact = redact
+
+    def attach(self, engine):
+        super(SlowSpecLog, self).attach(engine)
+        start_tagging_specs(self)
+
+    def detach(self):
+        """ Stop capturing, and wait for the pending records to be
+        handled.
+        """
+        stop_tagging_specs(self)
+        super(SlowSpecLog, self).detach()
+
+    def _capture(self, statement, parameters, context, executemany,
+                 duration):
+        specs = context.execution_options.get(SPECS_OPTION)
+        if not specs:
+            return None
+        return SlowSpec(specs, None, statement, parameters, duration)
+
+    def _handle(self, record):
+        try:
+            record = record._replace(
+                fingerprint=fingerprint(ignore_values=True, **record.specs)
+            )
+            if self.redact is not None:
+                record = self.redact(record)
+            self.handler(record)
+        except Exception:
+            logger.exception('Could not handle slow query record.')
@@ -1,73 +1,45 @@
 # -*- coding: utf-8 -*-
+from .aggregates import JOINED_AGGREGATE_DIALECTS, joined_aggregate
+from .analysis import check_sort
+from .instrumentation import count, instrumented, stage, tag_spec
+from .limits import check_sort_spec
+from .models import auto_join, get_model_from_spec, get_default_model
+from .specs import (  # noqa: F401
+    SORT_ASCENDING, SORT_DESCENDING, Sort, get_primary_key_names,
+    get_sort_models as get_named_models, get_tiebreaker_sorts
+)
+
+
+def join_aggregates(query, sorts, default_model):
+    """ Join the pre-aggregated subqueries of the aggregate `sorts`, on the
+    dialects of
+    :data:`~sqlalchemy_filters.aggregates.JOINED_AGGREGATE_DIALECTS`.
 
-from .exceptions import BadSortFormat
-from .models import Field, auto_join, get_model_from_spec, get_default_model
-
-SORT_ASCENDING = 'asc'
-SORT_DESCENDING = 'desc'
-
-
-class Sort(object):
-
-    def __init__(self, sort_spec):
-        self.sort_spec = sort_spec
-
-        try:
-            field_name = sort_spec['field']
-            direction = sort_spec['direction']
-        except KeyError:
-            raise BadSortFormat(
-                '`field` and `direction` are mandatory attributes.'
-            )
-        except TypeError:
-            raise BadSortFormat(
-                'Sort spec `{}` should be a dictionary.'.format(sort_spec)
-            )
-
-        if direction not in [SORT_ASCENDING, SORT_DESCENDING]:
-            raise BadSortFormat('Direction `{}` not valid.'.format(direction))
-
-        self.field_name = field_name
-        self.direction = direction
-        self.nullsfirst = sort_spec.get('nullsfirst')
-        self.nullslast = sort_spec.get('nullslast')
-
-    def get_named_models(self):
-        if "model" in self.sort_spec:
-            return {self.sort_spec['model']}
-        return set()
-
-    def format_for_sqlalchemy(self, query, default_model):
-        sort_spec = self.sort_spec
-        direction = self.direction
-        field_name = self.field_name
-
-        model = get_model_from_spec(sort_spec, query, default_model)
-
-        field = Field(model, field_name)
-        sqlalchemy_field = field.get_sqlalchemy_field()
-
-        if direction == SORT_ASCENDING:
-            sort_fnc = sqlalchemy_field.asc
-        elif direction == SORT_DESCENDING:
-            sort_fnc = sqlalchemy_field.desc
-
-        if self.nullsfirst:
-            return sort_fnc().nullsfirst()
-        elif self.nullslast:
-            return sort_fnc().nullslast()
-        else:
-            return sort_fnc()
+    :returns:
+        The joined query, and a dictionary with the aggregated column of
+        each joined sort. The rest are sorted by correlated subqueries.
+    """
+    aggregates = {}
 
+    session = query.session
+    if (
+        session is None or
+        session.get_bind().dialect.name not in JOINED_AGGREGATE_DIALECTS
+    ):
+        return query, aggregates
 
-def get_named_models(sorts):
-    models = set()
     for sort in sorts:
-        models.update(sort.get_named_models())
-    return models
+        if sort.aggregate is not None:
+            model = get_model_from_spec(sort.sort_spec, query, default_model)
+            query, aggregates[sort] = joined_aggregate(
+                query, model, sort.field_name, sort.aggregate
+            )
+    return query, aggregates
 
 
-def apply_sort(query, sort_spec):
+@instrumented('apply_sort')
+def apply_sort(query, sort_spec, tiebreaker=False, strict=None,
+               max_rows=None, limits=None):
     """Apply sorting to a :class:`sqlalchemy.orm.Query` instance.
 
     :param sort_spec:
@@ -93,9 +65,50 @@ def apply_sort(query, sort_spec):
                 },
             ]
 
+        A sort by full-text relevance is requested with the `rank` key,
+        whose value is the searched text, on a field with a full-text
+        index (see :func:`sqlalchemy_filters.search.register_fts_index`)::
+
+            sort_spec = [
+                {'field': 'name', 'direction': 'desc', 'rank': 'red apple'},
+            ]
+
+        Parent rows are sorted by an aggregate of their related rows with
+        the `aggregate` key (``count``, ``max``, ``min`` or ``sum``), on a
+        relationship or on a field of the related model::
+
+            sort_spec = [
+                {'field': 'foos', 'aggregate': 'count', 'direction': 'desc'},
+                {'field': 'foos.count', 'aggregate': 'max', 'direction': 'asc'},
+            ]
+
         If the query being modified refers to a single model, the `model` key
         may be omitted from the sort spec.
 
+    :param tiebreaker:
+        If `True`, the primary key of the queried model (the first one if
+        the query refers to many) is appended to the sort, so that rows
+        that are equal in the sorted fields have a stable order across
+        pages. A list of field names of a unique constraint may be given
+        instead of the primary key. Fields that are sorted by already are
+        not repeated, and the rest follow the direction of the last sort.
+
+    :param strict:
+        ``None`` (default) to sort as requested. ``'log'`` or ``'raise'``
+        to check first that the sort can be served by reading an index in
+        order, and log a warning or raise
+        :class:`~sqlalchemy_filters.exceptions.UnindexedSpec` otherwise.
+        See :func:`sqlalchemy_filters.analysis.check_sort`.
+
+    :param max_rows:
+        In strict mode, the sorts that can't use an index are allowed if
+        the queried table has up to `max_rows` estimated rows.
+
+    :param limits:
+        A :class:`~sqlalchemy_filters.limits.Limits` instance. Specs that
+        exceed it raise :class:`~sqlalchemy_filters.exceptions.SpecTooComplex`
+        before the query is modified.
+
     :returns:
         The :class:`sqlalchemy.orm.Query` instance after the provided
         sorting has been applied.
@@ -103,18 +116,33 @@ def apply_sort(query, sort_spec):
     if isinstance(sort_spec, dict):
         sort_spec = [sort_spec]
 
-    sorts = [Sort(item) for item in sort_spec]
+    if limits is not None:
+        check_sort_spec(sort_spec, limits)
+
+    if strict is not None:
+        check_sort(query, sort_spec, tiebreaker, strict, max_rows)
+
+    with stage('parse'):
+        sorts = [Sort(item) for item in sort_spec]
+        if tiebreaker:
+            sorts += get_tiebreaker_sorts(query, sorts, tiebreaker)
+    count('sorts', len(sorts))
 
-    default_model = get_default_model(query)
+    with stage('resolve'):
+        default_model = get_default_model(query)
 
     sort_models = get_named_models(sorts)
     query = auto_join(query, *sort_models)
+    with stage('join'):
+        query, aggregates = join_aggregates(query, sorts, default_model)
 
-    sqlalchemy_sorts = [
-        sort.format_for_sqlalchemy(query, default_model) for sort in sorts
-    ]
+    with stage('build'):
+        sqlalchemy_sorts = [
+            sort.format_for_sqlalchemy(query, default_model, aggregates)
+            for sort in sorts
+        ]
 
     if sqlalchemy_sorts:
         query = query.order_by(*sqlalchemy_sorts)
 
-    return query
+    return tag_spec(query, 'sort_spec', sort_spec)
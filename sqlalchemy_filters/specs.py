@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+from collections.abc import Iterable
+
+from six import string_types
+from sqlalchemy import and_, or_, not_
+from sqlalchemy.inspection import inspect
+
+from .aggregates import AGGREGATES, correlated_aggregate
+from .exceptions import BadFilterFormat, BadSortFormat
+from .models import Field, get_default_model, get_model_from_spec
+from .search import fts_rank
+
+
+BooleanFunction = namedtuple(
+    'BooleanFunction', ('key', 'sqlalchemy_fn', 'only_one_arg')
+)
+BOOLEAN_FUNCTIONS = [
+    BooleanFunction('or', or_, False),
+    BooleanFunction('and', and_, False),
+    BooleanFunction('not', not_, True),
+]
+"""
+Sqlalchemy boolean functions that can be parsed from the filter definition.
+"""
+
+
+def _is_iterable_filter(filter_spec):
+    """ `filter_spec` may be a list of nested filter specs, or a dict.
+    """
+    return (
+        isinstance(filter_spec, Iterable) and
+        not isinstance(filter_spec, (string_types, dict))
+    )
+
+
+def get_boolean_function(filter_spec):
+    """ Return the :class:`BooleanFunction` defined by `filter_spec`, or
+    `None` if it is a plain filter.
+    """
+    for boolean_function in BOOLEAN_FUNCTIONS:
+        if boolean_function.key in filter_spec:
+            return boolean_function
+
+
+def check_boolean_function_args(boolean_function, fn_args):
+    if not _is_iterable_filter(fn_args):
+        raise BadFilterFormat(
+            '`{}` value must be an iterable across the function '
+            'arguments'.format(boolean_function.key)
+        )
+    if boolean_function.only_one_arg and len(fn_args) != 1:
+        raise BadFilterFormat(
+            '`{}` must have one argument'.format(boolean_function.key)
+        )
+    if not boolean_function.only_one_arg and len(fn_args) < 1:
+        raise BadFilterFormat(
+            '`{}` must have one or more arguments'.format(
+                boolean_function.key
+            )
+        )
+
+
+def normalize_load_spec(load_spec):
+    """ Return `load_spec` as a list of dictionaries, expanding the single
+    dictionary and the list of field names shorthand forms.
+    """
+    if (
+        isinstance(load_spec, list) and
+        all(map(lambda item: isinstance(item, str), load_spec))
+    ):
+        load_spec = {'fields': load_spec}
+
+    if isinstance(load_spec, dict):
+        load_spec = [load_spec]
+
+    return load_spec
+
+
+SORT_ASCENDING = 'asc'
+SORT_DESCENDING = 'desc'
+
+
+class Sort(object):
+
+    def __init__(self, sort_spec):
+        self.sort_spec = sort_spec
+
+        try:
+            field_name = sort_spec['field']
+            direction = sort_spec['direction']
+        except KeyError:
+            raise BadSortFormat(
+                '`field` and `direction` are mandatory attributes.'
+            )
+        except TypeError:
+            raise BadSortFormat(
+                'Sort spec `{}` should be a dictionary.'.format(sort_spec)
+            )
+
+        if direction not in [SORT_ASCENDING, SORT_DESCENDING]:
+            raise BadSortFormat('Direction `{}` not valid.'.format(direction))
+
+        self.field_name = field_name
+        self.direction = direction
+        self.nullsfirst = sort_spec.get('nullsfirst')
+        self.nullslast = sort_spec.get('nullslast')
+        self.rank = sort_spec.get('rank')
+        self.aggregate = sort_spec.get('aggregate')
+
+        if self.aggregate is not None and self.aggregate not in AGGREGATES:
+            raise BadSortFormat(
+                'Aggregate `{}` not valid.'.format(self.aggregate)
+            )
+
+    def get_named_models(self):
+        if "model" in self.sort_spec:
+            return {self.sort_spec['model']}
+        return set()
+
+    def format_for_sqlalchemy(self, query, default_model, aggregates=None):
+        sort_spec = self.sort_spec
+        direction = self.direction
+        field_name = self.field_name
+
+        model = get_model_from_spec(sort_spec, query, default_model)
+
+        if aggregates and self in aggregates:
+            sqlalchemy_field = aggregates[self]
+        elif self.aggregate is not None:
+            sqlalchemy_field = correlated_aggregate(
+                model, field_name, self.aggregate
+            )
+        else:
+            field = Field(model, field_name)
+            sqlalchemy_field = field.get_sqlalchemy_field()
+
+        if self.rank is not None:
+            sqlalchemy_field = fts_rank(sqlalchemy_field, self.rank)
+
+        if direction == SORT_ASCENDING:
+            sort_fnc = sqlalchemy_field.asc
+        elif direction == SORT_DESCENDING:
+            sort_fnc = sqlalchemy_field.desc
+
+        if self.nullsfirst:
+            return sort_fnc().nullsfirst()
+        elif self.nullslast:
+            return sort_fnc().nullslast()
+        else:
+            return sort_fnc()
+
+
+def get_sort_models(sorts):
+    models = set()
+    for sort in sorts:
+        models.update(sort.get_named_models())
+    return models
+
+
+def get_primary_key_names(model):
+    """ Return the names of the attributes of the primary key of `model`. """
+    mapper = inspect(model)
+    return [
+        mapper.get_property_by_column(column).key
+        for column in mapper.primary_key
+    ]
+
+
+def get_tiebreaker_sorts(query, sorts, tiebreaker):
+    """ Return the sorts to append to `sorts` so that the order is
+    deterministic: the `tiebreaker` fields (the primary key if it's `True`)
+    of the default model, or of the first entity if the query has many,
+    that are not sorted by already.
+
+    They follow the direction of the last sort, so that an index over the
+    sorted fields and the tiebreaker can be scanned in a single direction.
+    """
+    default_model = get_default_model(query)
+    model = default_model
+    if model is None:
+        model = query.column_descriptions[0]['entity']
+    if model is None:
+        raise BadSortFormat('The query has no model to break ties by.')
+
+    if tiebreaker is True:
+        field_names = get_primary_key_names(model)
+    elif isinstance(tiebreaker, str):
+        field_names = [tiebreaker]
+    else:
+        field_names = list(tiebreaker)
+
+    sorted_fields = {
+        (sort.sort_spec.get('model', getattr(default_model, '__name__', None)),
+         sort.field_name)
+        for sort in sorts if sort.rank is None and sort.aggregate is None
+    }
+    direction = sorts[-1].direction if sorts else SORT_ASCENDING
+
+    return [
+        Sort({
+            'model': model.__name__, 'field': field_name,
+            'direction': direction,
+        })
+        for field_name in field_names
+        if (model.__name__, field_name) not in sorted_fields
+    ]
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import re
+from collections import Counter, namedtuple
+
+from sqlalchemy import event
+
+from .exceptions import TooManyStatements
+from .models import sqlalchemy_version_lt
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_PLACEHOLDER_LIST_RE = re.compile(
+    r'\(\s*{0}(?:\s*,\s*{0})+\s*\)'.format(_PLACEHOLDER)
+)
+
+
+StatementShape = namedtuple('StatementShape', ['statement', 'count'])
+"""
+A statement, with the lists of placeholders (e.g. of ``IN``) collapsed, and
+the number of times it was executed.
+"""
+
+LazyLoadBurst = namedtuple('LazyLoadBurst', ['relationship', 'count'])
+"""
+A relationship (e.g. ``'Foo.bar'``) lazy loaded `count` times, once per
+row, which a load spec should load with a strategy instead.
+"""
+
+
+def get_statement_shape(statement):
+    """ Return `statement` with its whitespace normalized and its lists of
+    placeholders collapsed into ``(...)``, so that the statements that
+    only differ in their parameters have the same shape.
+    """
+    statement = _WHITESPACE_RE.sub(' ', statement).strip()
+    return _PLACEHOLDER_LIST_RE.sub('(...)', statement)
+
+
+def _counts_lazy_loads():
+    return not sqlalchemy_version_lt('1.4')
+
+
+def _check_counts_lazy_loads():
+    if not _counts_lazy_loads():
+        raise ValueError(
+            'Counting lazy loads requires SQLAlchemy 1.4 or later.'
+        )
+
+
+class StatementCounter(object):
+    """Count the statements executed within a block of code, to catch the
+    lazy loads a load spec missed.
+
+    The statements of the engine `session` is bound to are counted with
+    engine events, and the lazy loads of `session` with session events.
+    Exceeding `max_statements` statements, or `max_lazy_loads` lazy loads
+    of any relationship, raises :class:`TooManyStatements` from the
+    statement that crossed the limit.
+
+    Lazy loads are only counted with SQLAlchemy 1.4 and later, which have
+    the ``do_orm_execute`` session event: with older versions, `bursts` and
+    `max_lazy_loads` raise ``ValueError``.
+
+    Basic usage::
+
+        with StatementCounter(session, max_lazy_loads=1) as counter:
+            foos = apply_loads(query, load_spec).all()
+            serialize(foos)
+
+        counter.count  # 2
+        counter.bursts  # [LazyLoadBurst(relationship='Foo.bar', count=10)]
+    """
+
+    def __init__(self, session, max_statements=None, max_lazy_loads=None,
+                 burst_size=2):
+        if max_lazy_loads is not None:
+            _check_counts_lazy_loads()
+        self.session = session
+        self.max_statements = max_statements
+        self.max_lazy_loads = max_lazy_loads
+        self.burst_size = burst_size
+        self.engine = None
+        self.statements = []
+        self.lazy_loads = Counter()
+
+    def attach(self):
+        self.engine = self.session.get_bind()
+        event.listen(
+            self.engine, 'before_cursor_execute', self._before_execute
+        )
+        if not _counts_lazy_loads():  # pragma: no_cover_sqlalchemy_gte_1_4
+            return
+        try:  # pragma: no_cover_sqlalchemy_lt_1_4
+            event.listen(
+                self.session, 'do_orm_execute', self._do_orm_execute
+            )
+        except Exception:
+            event.remove(
+                self.engine, 'before_cursor_execute', self._before_execute
+            )
+            self.engine = None
+            raise
+
+    def detach(self):
+        event.remove(
+            self.engine, 'before_cursor_execute', self._before_execute
+        )
+        if _counts_lazy_loads():  # pragma: no_cover_sqlalchemy_lt_1_4
+            event.remove(
+                self.session, 'do_orm_execute', self._do_orm_execute
+            )
+        self.engine = None
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.detach()
+
+    @property
+    def count(self):
+        """ The number of statements executed. """
+        return len(self.statements)
+
+    @property
+    def shapes(self):
+        """ A :class:`StatementShape` per shape of the statements executed,
+        the most repeated first.
+        """
+        return [
+            StatementShape(statement, count) for statement, count in
+            Counter(map(get_statement_shape, self.statements)).most_common()
+        ]
+
+    @property
+    def repeated(self):
+        """ The shapes executed more than once. """
+        return [shape for shape in self.shapes if shape.count > 1]
+
+    @property
+    def bursts(self):
+        """ A :class:`LazyLoadBurst` per relationship lazy loaded at least
+        `burst_size` times, the most loaded first.
+        """
+        _check_counts_lazy_loads()
+        return [
+            LazyLoadBurst(relationship, count)
+            for relationship, count in self.lazy_loads.most_common()
+            if count >= self.burst_size
+        ]
+
+    def _before_execute(self, conn, cursor, statement, parameters, context,
+                        executemany):
+        self.statements.append(statement)
+        if (
+            self.max_statements is not None and
+            self.count > self.max_statements
+        ):
+            raise TooManyStatements(
+                '{} statements executed, more than {}. Last statement: '
+                '{}'.format(
+                    self.count, self.max_statements,
+                    get_statement_shape(statement)
+                )
+            )
+
+    def _do_orm_execute(self, orm_execute_state):  # pragma: no_cover_sqlalchemy_lt_1_4
+        if (
+            orm_execute_state.lazy_loaded_from is None or
+            not orm_execute_state.is_relationship_load
+        ):
+            return
+
+        relationship = str(orm_execute_state.loader_strategy_path.prop)
+        self.lazy_loads[relationship] += 1
+        count = self.lazy_loads[relationship]
+        if self.max_lazy_loads is not None and count > self.max_lazy_loads:
+            raise TooManyStatements(
+                'Relationship `{}` lazy loaded {} times, more than {}. Load '
+                'it with a strategy in the load spec.'.format(
+                    relationship, count, self.max_lazy_loads
+                )
+            )
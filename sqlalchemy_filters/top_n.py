@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from .exceptions import BadGroupFormat, BadQuery, InvalidPage
+from .instrumentation import instrumented
+from .models import Field, auto_join, get_model_from_spec
+from .sorting import join_aggregates
+from .specs import Sort, get_sort_models, get_tiebreaker_sorts
+
+
+ROW_NUMBER_LABEL = 'row_number'
+
+
+class Group(object):
+
+    def __init__(self, group_spec):
+        self.group_spec = group_spec
+
+        try:
+            self.field_name = group_spec['field']
+        except KeyError:
+            raise BadGroupFormat('`field` is a mandatory attribute.')
+        except TypeError:
+            raise BadGroupFormat(
+                'Group spec `{}` should be a dictionary.'.format(group_spec)
+            )
+
+    def get_named_models(self):
+        if 'model' in self.group_spec:
+            return {self.group_spec['model']}
+        return set()
+
+    def format_for_sqlalchemy(self, query, default_model):
+        model = get_model_from_spec(self.group_spec, query, default_model)
+        return Field(model, self.field_name).get_sqlalchemy_field()
+
+
+def _get_queried_model(query):
+    descriptions = query.column_descriptions
+    if len(descriptions) != 1 or descriptions[0]['entity'] is None or (
+        descriptions[0]['type'] is not descriptions[0]['entity']
+    ):
+        raise BadQuery('Top-N queries need a query of a single model.')
+    return descriptions[0]['entity']
+
+
+@instrumented('apply_top_n')
+def apply_top_n(query, group_spec, sort_spec, n, tiebreaker=False):
+    """Keep the first `n` rows of each group of a query.
+
+    The query, with its filters and joins, is wrapped in a subquery that
+    numbers the rows of each group with ``ROW_NUMBER() OVER (PARTITION BY
+    ... ORDER BY ...)``, so all the groups are fetched with a single
+    statement. Window functions need SQLite 3.25+, PostgreSQL or MySQL 8.
+
+    :param query:
+        A :class:`sqlalchemy.orm.Query` instance that selects a single
+        model, typically after ``apply_filters``.
+
+    :param group_spec:
+        A list of dictionaries with the `field` (and `model`, optional for
+        the fields of the queried model) of each field the rows are grouped
+        by.
+
+    :param sort_spec:
+        The order of the rows within each group, as accepted by
+        ``apply_sort``. The `model` key is optional for the fields of the
+        queried model.
+
+    :param n:
+        The number of rows to keep per group.
+
+    :param tiebreaker:
+        As in ``apply_sort``, so that the rows kept are deterministic.
+
+    :returns:
+        A :class:`sqlalchemy.orm.Query` instance of the queried model,
+        ordered by group and by position within each group.
+
+    Basic usage::
+
+        # the latest 3 Foo of each Bar
+        query = apply_top_n(
+            session.query(Foo),
+            [{'field': 'bar_id'}],
+            [{'field': 'id', 'direction': 'desc'}],
+            3,
+        )
+    """
+    if isinstance(group_spec, dict):
+        group_spec = [group_spec]
+    if isinstance(sort_spec, dict):
+        sort_spec = [sort_spec]
+
+    if n < 1:
+        raise InvalidPage('Top-N size should be positive: {}'.format(n))
+
+    model = _get_queried_model(query)
+    groups = [Group(item) for item in group_spec]
+    sorts = [Sort(item) for item in sort_spec]
+    if tiebreaker:
+        sorts += get_tiebreaker_sorts(query, sorts, tiebreaker)
+
+    # specs without a model refer to the queried one, even if the query
+    # joins others
+    default_model = model
+    group_models = set()
+    for group in groups:
+        group_models.update(group.get_named_models())
+    query = auto_join(query, *(group_models | get_sort_models(sorts)))
+    query, aggregates = join_aggregates(query, sorts, default_model)
+
+    partition = [
+        group.format_for_sqlalchemy(query, default_model) for group in groups
+    ]
+    order = [
+        sort.format_for_sqlalchemy(query, default_model, aggregates)
+        for sort in sorts
+    ]
+
+    row_number = func.row_number().over(
+        partition_by=partition or None, order_by=order or None
+    )
+    subquery = query.order_by(None).add_columns(*(
+        [row_number.label(ROW_NUMBER_LABEL)] +
+        [
+            column.label('group_{}'.format(position))
+            for position, column in enumerate(partition)
+        ]
+    )).subquery()
+
+    entity = aliased(model, subquery)
+    row_number_column = subquery.c[ROW_NUMBER_LABEL]
+    return query.session.query(entity).filter(
+        row_number_column <= n
+    ).order_by(*(
+        [
+            subquery.c['group_{}'.format(position)]
+            for position in range(len(partition))
+        ] + [row_number_column]
+    ))
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from .aggregates import get_aggregate_function
+from .dates import DATE_OPERATORS, get_bounds
+from .exceptions import (
+    BadFilterFormat, BadLoadFormat, BadSortFormat, BadSpec, FieldNotFound,
+    InvalidSpec
+)
+from .filters import Filter
+from .jsonpath import check_json_key
+from .loads import LoadRelationship, build_load, split_field_path
+from .models import get_json_path, get_model_field_names, get_relationship
+from .specs import (
+    Sort, _is_iterable_filter, check_boolean_function_args,
+    get_boolean_function, normalize_load_spec
+)
+
+
+SpecError = namedtuple('SpecError', ['path', 'exception', 'message'])
+"""
+A single problem found in a spec: `path` locates the offending element
+(e.g. ``filters[0].or[1]``), `exception` is the exception class that the
+``apply_*`` functions would raise for it.
+"""
+
+
+def _validate_value(operator, value):
+    """ Parse the value of the operators that need one, as the ``apply_*``
+    functions would.
+    """
+    if operator in DATE_OPERATORS:
+        get_bounds(operator, value)
+    elif operator == 'json_has_key':
+        check_json_key(value)
+
+
+class SpecValidator(object):
+    """Validate filter, sort and load specs without a query or a session.
+
+    The models and their field names are resolved once, when the validator
+    is created, so it can be kept around and used to check every incoming
+    request. Unlike the ``apply_*`` functions, validation does not stop at
+    the first problem: all the errors in the specs are reported.
+
+    :param models:
+        An iterable with the model classes that specs may refer to.
+
+    :param default_model:
+        The model (class or name) that specs without a `model` key apply
+        to. It may be omitted if there is only one model.
+    """
+
+    def __init__(self, models, default_model=None):
+        self.models = {model.__name__: model for model in models}
+        self.field_names = {
+            name: frozenset(get_model_field_names(model))
+            for name, model in self.models.items()
+        }
+
+        if default_model is None and len(self.models) == 1:
+            default_model, = self.models
+        self.default_model = getattr(default_model, '__name__', default_model)
+
+    def validate(self, filter_spec=None, sort_spec=None, load_spec=None):
+        """ Return the list of :class:`SpecError` found in the given specs,
+        which is empty if they are all valid.
+        """
+        errors = []
+
+        if filter_spec is not None:
+            self._validate_filters(filter_spec, 'filters', errors)
+        if sort_spec is not None:
+            self._validate_sorts(sort_spec, errors)
+        if load_spec is not None:
+            self._validate_loads(load_spec, errors)
+
+        return errors
+
+    def validate_many(self, specs):
+        """ Validate a batch of specs.
+
+        :param specs:
+            An iterable of dictionaries with the optional keys
+            ``filter_spec``, ``sort_spec`` and ``load_spec``.
+
+        :returns:
+            A list with the errors of each item in `specs`, in order.
+        """
+        return [self.validate(**spec) for spec in specs]
+
+    def check(self, filter_spec=None, sort_spec=None, load_spec=None):
+        """ Like :meth:`validate`, but raise
+        :class:`~sqlalchemy_filters.exceptions.InvalidSpec` if any error is
+        found.
+        """
+        errors = self.validate(filter_spec, sort_spec, load_spec)
+        if errors:
+            raise InvalidSpec(
+                '; '.join(
+                    '{}: {}'.format(error.path, error.message)
+                    for error in errors
+                ),
+                errors,
+            )
+
+    def _validate_filters(self, filter_spec, path, errors):
+        if _is_iterable_filter(filter_spec):
+            for position, item in enumerate(filter_spec):
+                self._validate_filters(
+                    item, '{}[{}]'.format(path, position), errors
+                )
+            return
+
+        if isinstance(filter_spec, dict):
+            boolean_function = get_boolean_function(filter_spec)
+            if boolean_function is not None:
+                fn_args = filter_spec[boolean_function.key]
+                path = '{}.{}'.format(path, boolean_function.key)
+                try:
+                    check_boolean_function_args(boolean_function, fn_args)
+                except BadFilterFormat as exc:
+                    errors.append(SpecError(path, BadFilterFormat, str(exc)))
+                else:
+                    self._validate_filters(fn_args, path, errors)
+                return
+
+        try:
+            filter = Filter(filter_spec)
+            _validate_value(filter.operator.operator, filter.value)
+        except BadFilterFormat as exc:
+            errors.append(SpecError(path, BadFilterFormat, str(exc)))
+        else:
+            self._validate_field(
+                filter_spec, filter_spec['field'], path, errors
+            )
+
+    def _validate_sorts(self, sort_spec, errors):
+        if isinstance(sort_spec, dict):
+            sort_spec = [sort_spec]
+
+        for position, item in enumerate(sort_spec):
+            path = 'sort[{}]'.format(position)
+            try:
+                sort = Sort(item)
+            except BadSortFormat as exc:
+                errors.append(SpecError(path, BadSortFormat, str(exc)))
+            else:
+                if sort.aggregate is not None:
+                    self._validate_aggregate(sort, path, errors)
+                else:
+                    self._validate_field(item, item['field'], path, errors)
+
+    def _validate_loads(self, load_spec, errors):
+        for position, item in enumerate(normalize_load_spec(load_spec)):
+            path = 'loads[{}]'.format(position)
+            try:
+                load = build_load(item)
+            except BadLoadFormat as exc:
+                errors.append(SpecError(path, BadLoadFormat, str(exc)))
+                continue
+
+            if isinstance(load, LoadRelationship):
+                self._validate_relationship(load, path, errors)
+                continue
+
+            for field_position, field_name in enumerate(item['fields']):
+                field_path = '{}.fields[{}]'.format(path, field_position)
+                if '.' not in field_name:
+                    self._validate_field(item, field_name, field_path, errors)
+                    continue
+
+                model = self._get_model(item, field_path, errors)
+                if model is not None:
+                    self._validate_load_field(
+                        model, field_name, field_path, errors
+                    )
+
+    def _validate_relationship(self, load, path, errors):
+        model = self._get_model(load.load_spec, path, errors)
+        if model is None:
+            return
+
+        try:
+            relationship = get_relationship(model, load.relationship_name)
+        except FieldNotFound as exc:
+            errors.append(SpecError(path, FieldNotFound, str(exc)))
+            return
+
+        for field_position, field_name in enumerate(load.field_names):
+            self._validate_load_field(
+                relationship.mapper.class_, field_name,
+                '{}.fields[{}]'.format(path, field_position), errors
+            )
+
+    def _validate_load_field(self, model, field_name, path, errors):
+        try:
+            relationships, field_name = split_field_path(model, field_name)
+        except FieldNotFound as exc:
+            errors.append(SpecError(path, FieldNotFound, str(exc)))
+            return
+
+        if relationships:
+            model = relationships[-1].mapper.class_
+        if field_name not in get_model_field_names(model):
+            errors.append(SpecError(
+                path, FieldNotFound,
+                'Model {} has no column `{}`.'.format(model, field_name)
+            ))
+
+    def _validate_aggregate(self, sort, path, errors):
+        model = self._get_model(sort.sort_spec, path, errors)
+        if model is None:
+            return
+
+        try:
+            get_aggregate_function(model, sort.field_name, sort.aggregate)
+        except (BadSortFormat, FieldNotFound) as exc:
+            errors.append(SpecError(path, type(exc), str(exc)))
+
+    def _get_model(self, spec, path, errors):
+        model_name = spec.get('model', self.default_model)
+
+        if model_name is None:
+            errors.append(SpecError(
+                path, BadSpec, 'Ambiguous spec. Please specify a model.'
+            ))
+        elif model_name not in self.models:
+            errors.append(SpecError(
+                path, BadSpec,
+                'The query does not contain model `{}`.'.format(model_name)
+            ))
+        else:
+            return self.models[model_name]
+
+    def _validate_field(self, spec, field_name, path, errors):
+        model = self._get_model(spec, path, errors)
+
+        if model is not None and (
+            field_name not in self.field_names[model.__name__] and
+            get_json_path(model, field_name) is None
+        ):
+            errors.append(SpecError(
+                path, FieldNotFound,
+                'Model {} has no column `{}`.'.format(model, field_name)
+            ))
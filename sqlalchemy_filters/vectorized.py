@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+import operator
+
+from sqlalchemy import and_, not_, or_
+
+from .dates import DATE_OPERATORS, get_bounds
+from .evaluation import (
+    _any, _in_date_range, _json_contains, _json_has_key, _like_regex, _search
+)
+from .exceptions import BadFilterFormat, FieldNotFound
+from .filters import BooleanFilter, build_filters
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Predicates return a pair of boolean masks: the rows for which the filter
+# is true and the rows for which it is false. Rows in neither mask are
+# unknown (e.g. `NULL` values), following the three-valued logic of SQL.
+def _null_mask(column):
+    data = np.ma.getdata(column)
+    mask = np.ma.getmaskarray(column)
+    kind = data.dtype.kind
+    if kind == 'f':
+        mask = mask | np.isnan(data)
+    elif kind in 'mM':
+        mask = mask | np.isnat(data)
+    elif kind == 'O':
+        mask = mask | np.equal(data, None).astype(bool)
+    return mask
+
+
+def _on_values(function):
+    """ Apply `function` to the array of values that are not `NULL`. """
+    def evaluate(column, argument):
+        data = np.ma.getdata(column)
+        true = np.zeros(len(data), dtype=bool)
+        if argument is None:
+            return true, true.copy()
+
+        if data.dtype.kind in 'mM':
+            # accept `datetime` objects and ISO strings
+            argument = np.asarray(argument, dtype=data.dtype)
+
+        valid = ~_null_mask(column)
+        if valid.any():
+            true[valid] = function(data[valid], argument)
+        return true, valid & ~true
+    return evaluate
+
+
+def _elementwise(function):
+    """ Apply `function`, which may return `None`, to each value. """
+    def evaluate(column, argument):
+        data = np.ma.getdata(column)
+        null = _null_mask(column)
+        results = [
+            None if is_null else function(value, argument)
+            for value, is_null in zip(data, null)
+        ]
+        true = np.fromiter(
+            (result is True for result in results), dtype=bool,
+            count=len(results),
+        )
+        false = np.fromiter(
+            (result is False for result in results), dtype=bool,
+            count=len(results),
+        )
+        return true, false
+    return evaluate
+
+
+def _strings(values, lower=False):
+    if values.dtype.kind not in 'US':
+        values = values.astype(str)
+    return np.char.lower(values) if lower else values
+
+
+def _like(lower=False):
+    def like(values, pattern):
+        values = _strings(values, lower)
+        if lower:
+            pattern = pattern.lower()
+
+        text = pattern.strip('%')
+        if '_' not in pattern and '%' not in text:
+            starts = pattern.startswith('%')
+            ends = pattern.endswith('%') and len(pattern) > 1
+            if starts and ends:
+                return np.char.find(values, text) >= 0
+            if starts:
+                return np.char.endswith(values, text)
+            if ends:
+                return np.char.startswith(values, text)
+            return values == text
+
+        regex = _like_regex(pattern)
+        return np.fromiter(
+            (regex.match(value) is not None for value in values),
+            dtype=bool, count=len(values),
+        )
+    return _on_values(like)
+
+
+def _is_null(column):
+    null = _null_mask(column)
+    return null, ~null
+
+
+def _is_not_null(column):
+    null = _null_mask(column)
+    return ~null, null
+
+
+_isin = _on_values(lambda data, values: np.isin(data, values))
+
+
+def _in(column, values):
+    values = list(values)
+    if not values:
+        return (
+            np.zeros(len(column), dtype=bool),
+            np.ones(len(column), dtype=bool),
+        )
+
+    arguments = [value for value in values if value is not None]
+    true, false = _isin(column, arguments)
+    if len(arguments) < len(values):
+        false[:] = False
+    return true, false
+
+
+def _negate(function):
+    def evaluate(*args):
+        true, false = function(*args)
+        return false, true
+    return evaluate
+
+
+def _date_range(column, bounds):
+    data = np.ma.getdata(column)
+    if data.dtype.kind != 'M':
+        return _elementwise(_in_date_range)(column, bounds)
+
+    # days compare with the bounds of `Date` columns, other units as UTC
+    unit, _ = np.datetime_data(data.dtype)
+    start, end = bounds.date if unit == 'D' else bounds.naive
+    true = np.zeros(len(data), dtype=bool)
+    valid = ~_null_mask(column)
+    values = data[valid]
+    true[valid] = (
+        (values >= np.datetime64(start)) & (values < np.datetime64(end))
+    )
+    return true, valid & ~true
+
+
+_ilike = _like(lower=True)
+
+OPERATORS = {
+    'is_null': _is_null,
+    'is_not_null': _is_not_null,
+    '==': _on_values(operator.eq),
+    'eq': _on_values(operator.eq),
+    '!=': _on_values(operator.ne),
+    'ne': _on_values(operator.ne),
+    '>': _on_values(operator.gt),
+    'gt': _on_values(operator.gt),
+    '<': _on_values(operator.lt),
+    'lt': _on_values(operator.lt),
+    '>=': _on_values(operator.ge),
+    'ge': _on_values(operator.ge),
+    '<=': _on_values(operator.le),
+    'le': _on_values(operator.le),
+    'like': _like(),
+    'ilike': _ilike,
+    'not_ilike': _negate(_ilike),
+    'in': _in,
+    'not_in': _negate(_in),
+    'any': _elementwise(_any),
+    'not_any': _negate(_elementwise(_any)),
+    'search': _elementwise(_search),
+    'json_contains': _elementwise(_json_contains),
+    'json_has_key': _elementwise(_json_has_key),
+    'between': _date_range,
+    'on_date': _date_range,
+    'in_month': _date_range,
+    'within_last': _date_range,
+}
+"""
+NumPy counterparts of :attr:`sqlalchemy_filters.filters.Operator.OPERATORS`.
+
+Each operator takes a column array and the filter value, and returns the
+masks of the rows where the filter is true and false. ``any``, ``not_any``,
+``search`` and the JSON operators are evaluated element by element, as
+well as ``like`` patterns that are not a plain prefix, suffix or substring,
+and the date operators on object arrays. ``datetime64`` arrays of days are
+compared as ``Date`` columns, other units as UTC ``DateTime`` columns.
+"""
+
+
+def _and(predicates):
+    def evaluate(columns):
+        true, false = predicates[0](columns)
+        for predicate in predicates[1:]:
+            other_true, other_false = predicate(columns)
+            true, false = true & other_true, false | other_false
+        return true, false
+    return evaluate
+
+
+def _or(predicates):
+    def evaluate(columns):
+        true, false = predicates[0](columns)
+        for predicate in predicates[1:]:
+            other_true, other_false = predicate(columns)
+            true, false = true | other_true, false & other_false
+        return true, false
+    return evaluate
+
+
+def _not(predicates):
+    predicate, = predicates
+    return _negate(predicate)
+
+
+BOOLEAN_FUNCTIONS = {and_: _and, or_: _or, not_: _not}
+
+
+def _get_column(columns, field_name):
+    try:
+        return columns[field_name]
+    except KeyError:
+        raise FieldNotFound('Column `{}` not found.'.format(field_name))
+
+
+def _compile_filter(filter):
+    field_name = filter.filter_spec['field']
+    op = filter.operator.operator
+
+    try:
+        function = OPERATORS[op]
+    except KeyError:
+        raise BadFilterFormat(
+            'Operator `{}` cannot be evaluated with NumPy.'.format(op)
+        )
+
+    if filter.operator.arity == 1:
+        return lambda columns: function(_get_column(columns, field_name))
+
+    value = filter.value
+    if value is None and op in ('==', 'eq', '!=', 'ne'):
+        # SQLAlchemy renders these comparisons as `IS NULL`/`IS NOT NULL`
+        function = _is_null if op in ('==', 'eq') else _is_not_null
+        return lambda columns: function(_get_column(columns, field_name))
+
+    if op in DATE_OPERATORS:
+        value = get_bounds(op, value)
+    return lambda columns: function(_get_column(columns, field_name), value)
+
+
+def _compile(filters):
+    predicates = []
+    for filter in filters:
+        if isinstance(filter, BooleanFilter):
+            predicates.append(
+                BOOLEAN_FUNCTIONS[filter.function](_compile(filter.filters))
+            )
+        else:
+            predicates.append(_compile_filter(filter))
+    return predicates
+
+
+def _count_rows(columns):
+    for column in columns.values():
+        return len(column)
+    return 0
+
+
+def compile_mask(filter_spec):
+    """Compile `filter_spec` into NumPy mask operations over columnar data.
+
+    :param filter_spec:
+        A filter spec, as accepted by ``apply_filters``. The `model` keys
+        are ignored.
+
+    :returns:
+        A function that takes a dictionary of column names to arrays of the
+        same length, and returns a boolean array with the rows that match
+        the filters. ``NULL`` values are ``None`` in object arrays, ``NaN``
+        or ``NaT`` values, or masked values of :mod:`numpy.ma` arrays. As
+        in SQL, rows for which a filter is unknown don't match.
+    """
+    if np is None:
+        raise ImportError('NumPy is required to compile filters to masks.')
+
+    predicates = _compile(build_filters(filter_spec))
+    if not predicates:
+        return lambda columns: np.ones(_count_rows(columns), dtype=bool)
+
+    evaluate = _and(predicates)
+    return lambda columns: evaluate(columns)[0]
+
+
+def apply_filters_to_columns(columns, filter_spec):
+    """ Return a copy of `columns` with the rows that match `filter_spec`.
+    """
+    mask = compile_mask(filter_spec)(columns)
+    return {name: column[mask] for name, column in columns.items()}
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy_utils import create_database, drop_database, database_exists
 
@@ -152,6 +152,21 @@ def session(connection, is_postgresql):
     db_session.close()
 
 
+@pytest.fixture
+def statements(session):
+    statements = []
+    engine = session.get_bind().engine
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    yield statements
+
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
 def create_db(uri):
     """Drop the database at ``uri`` and create a brand new one. """
     destroy_database(uri)
@@ -0,0 +1,593 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+
+import pytest
+from sqlalchemy import (
+    Column, Index, Integer, MetaData, String, Table, UniqueConstraint, func,
+    or_, text
+)
+from sqlalchemy.orm import Query
+
+from sqlalchemy_filters import apply_sort
+from sqlalchemy_filters.analysis import (
+    CASE_INSENSITIVE, EXPRESSION, LEADING_WILDCARD, MULTIPLE_TABLES,
+    UNINDEXED, UNORDERED, check_sort, estimate_rows, get_table_indexes,
+    is_indexed, lint_spec, plan_sort
+)
+from sqlalchemy_filters.exceptions import (
+    BadFilterFormat, FieldNotFound, UnindexedSpec
+)
+from sqlalchemy_filters.models import sqlalchemy_version_lt
+from test import error_value
+from test.models import Bar, Foo, Garply, Qux
+
+
+class TestTableIndexes(object):
+
+    def test_primary_key_and_indexes(self):
+        indexes = get_table_indexes(Qux.__table__)
+
+        assert [
+            [(column.name, direction) for column, direction in index.columns]
+            for index in indexes
+        ] == [
+            [('id', 'asc')],
+            [('created_at', 'asc'), ('name', 'asc')],
+        ]
+        assert [index.unique for index in indexes] == [True, False]
+        assert [index.nulls for index in indexes] == [(None,), (None, None)]
+
+    def test_nulls_placement(self):
+        table = Table(
+            'nulls', MetaData(),
+            Column('id', Integer, primary_key=True),
+            Column('count', Integer),
+        )
+        Index(
+            'ix_nulls_count', table.c.count.desc().nullslast(),
+            table.c.id.nullsfirst(),
+        )
+
+        index = get_table_indexes(table)[1]
+
+        assert [
+            (column.name, direction) for column, direction in index.columns
+        ] == [('count', 'desc'), ('id', 'asc')]
+        assert index.nulls == ('last', 'first')
+
+    def test_unique_constraints_and_expressions(self):
+        table = Table(
+            'expressions', MetaData(),
+            Column('id', Integer, primary_key=True),
+            Column('count', Integer),
+            Column('name', String),
+            UniqueConstraint('count', name='uq_expressions_count'),
+        )
+        Index('ix_expressions', table.c.count, func.lower(table.c.name))
+
+        indexes = get_table_indexes(table)
+
+        assert [
+            (index.name, [column.name for column, _ in index.columns])
+            for index in indexes
+        ] == [
+            (None, ['id']),
+            # the columns after an expression can't be used
+            ('ix_expressions', ['count']),
+            ('uq_expressions_count', ['count']),
+        ]
+        assert indexes[2].unique
+
+    def test_is_indexed(self):
+        assert is_indexed(Foo.__table__.c.id)
+        assert is_indexed(Foo.__table__.c.bar_id)
+        assert is_indexed(Qux.__table__.c.created_at)
+        assert not is_indexed(Foo.__table__.c.name)
+        # not the leading column of the composite index
+        assert not is_indexed(Qux.__table__.c.name)
+
+
+class TestLintSpec(object):
+
+    def test_no_specs(self, session):
+        report = lint_spec(session.query(Bar))
+
+        assert report.ok
+        assert report.as_metrics() == {
+            'predicates': 0, 'sorts': 0, 'issues': 0
+        }
+
+    def test_indexed_filters_and_sorts(self, session):
+        query = session.query(Foo)
+        filter_spec = {
+            'or': [
+                {'field': 'id', 'op': '==', 'value': 1},
+                {'field': 'bar_id', 'op': 'in', 'value': [1, 2]},
+            ]
+        }
+        sort_spec = [{'field': 'id', 'direction': 'asc'}]
+
+        report = lint_spec(query, filter_spec, sort_spec)
+
+        assert report.ok
+        assert (report.predicates, report.sorts) == (2, 1)
+
+    def test_unindexed_filter(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'name', 'op': '==', 'value': 'name_1'}]
+
+        report = lint_spec(query, filter_spec)
+
+        assert report.issues == [(
+            UNINDEXED, 'Foo', 'name', '==',
+            '`Foo.name` is not the leading column of any index.'
+        )]
+
+    def test_unindexed_sort(self, session):
+        query = session.query(Qux)
+        sort_spec = {'field': 'name', 'direction': 'desc'}
+
+        report = lint_spec(query, sort_spec=sort_spec)
+
+        assert [
+            (issue.code, issue.field, issue.op) for issue in report.issues
+        ] == [(UNINDEXED, 'name', None)]
+
+    @pytest.mark.parametrize('op', ['like', 'ilike', 'not_ilike'])
+    def test_leading_wildcard(self, session, op):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'id', 'op': op, 'value': '%1'}]
+
+        report = lint_spec(query, filter_spec)
+
+        assert LEADING_WILDCARD in [issue.code for issue in report.issues]
+
+    def test_trailing_wildcard(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'id', 'op': 'like', 'value': '1%'}]
+
+        report = lint_spec(query, filter_spec)
+
+        assert report.ok
+
+    def test_case_insensitive(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'id', 'op': 'ilike', 'value': '1%'}]
+
+        report = lint_spec(query, filter_spec)
+
+        assert [issue.code for issue in report.issues] == [CASE_INSENSITIVE]
+
+    def test_hybrid_attribute(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'count_square', 'op': '>=', 'value': 25}]
+
+        report = lint_spec(query, filter_spec)
+
+        assert [issue.code for issue in report.issues] == [EXPRESSION]
+
+    def test_aggregate(self, session):
+        query = session.query(Bar)
+        sort_spec = [
+            {'field': 'foos', 'aggregate': 'count', 'direction': 'asc'},
+        ]
+
+        report = lint_spec(query, sort_spec=sort_spec)
+
+        assert [issue.code for issue in report.issues] == [EXPRESSION]
+        assert report.issues[0].message == (
+            '`Bar.foos` is sorted by its `count` and cannot use an index.'
+        )
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+    )
+    def test_json_path(self, session):
+        query = session.query(Garply)
+        filter_spec = [{'field': 'attrs.color', 'op': '==', 'value': 'red'}]
+
+        report = lint_spec(query, filter_spec)
+
+        assert [issue.code for issue in report.issues] == [EXPRESSION]
+        assert report.issues[0].message == (
+            '`Garply.attrs.color` is a JSON path and needs a matching '
+            'expression index.'
+        )
+
+    def test_related_model_is_resolved_with_auto_join(self, session):
+        query = session.query(Foo)
+        filter_spec = [
+            {'model': 'Bar', 'field': 'count', 'op': '>', 'value': 5},
+        ]
+
+        report = lint_spec(query, filter_spec)
+
+        assert [
+            (issue.model, issue.field) for issue in report.issues
+        ] == [('Bar', 'count')]
+
+    def test_metrics(self, session):
+        query = session.query(Foo)
+        filter_spec = [
+            {'field': 'name', 'op': 'ilike', 'value': '%a%'},
+            {'field': 'count', 'op': '==', 'value': 5},
+        ]
+
+        report = lint_spec(query, filter_spec)
+
+        assert report.as_metrics() == {
+            'predicates': 2,
+            'sorts': 0,
+            'issues': 4,
+            'issues.unindexed': 2,
+            'issues.leading_wildcard': 1,
+            'issues.case_insensitive': 1,
+        }
+
+    def test_invalid_field(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'invalid_field', 'op': '==', 'value': 1}]
+
+        with pytest.raises(FieldNotFound):
+            lint_spec(query, filter_spec)
+
+    def test_invalid_filter_spec(self, session):
+        query = session.query(Foo)
+
+        with pytest.raises(BadFilterFormat):
+            lint_spec(query, [{'field': 'id', 'op': 'op_not_valid'}])
+
+
+class TestLintSpecStrict(object):
+
+    def test_invalid_strict_mode(self, session):
+        with pytest.raises(ValueError) as err:
+            lint_spec(session.query(Foo), strict='invalid')
+
+        assert 'Strict mode `invalid` not valid.' == error_value(err)
+
+    def test_raise(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'name', 'op': '==', 'value': 'name_1'}]
+
+        with pytest.raises(UnindexedSpec) as err:
+            lint_spec(query, filter_spec, strict='raise')
+
+        expected_error = '`Foo.name` is not the leading column of any index.'
+        assert expected_error == error_value(err)
+
+    def test_raise_does_not_raise_without_issues(self, session):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'id', 'op': '==', 'value': 1}]
+
+        report = lint_spec(query, filter_spec, strict='raise')
+
+        assert report.ok
+
+    def test_log(self, session, caplog):
+        query = session.query(Foo)
+        filter_spec = [{'field': 'name', 'op': '==', 'value': 'name_1'}]
+
+        with caplog.at_level(logging.WARNING):
+            report = lint_spec(query, filter_spec, strict='log')
+
+        assert len(report.issues) == 1
+        assert [record.getMessage() for record in caplog.records] == [
+            '`Foo.name` is not the leading column of any index.'
+        ]
+
+
+class TestPlanSort(object):
+
+    @pytest.mark.parametrize('sort_spec, backward', [
+        ([{'field': 'id', 'direction': 'asc'}], False),
+        ([{'field': 'id', 'direction': 'desc'}], True),
+        (
+            [
+                {'field': 'created_at', 'direction': 'asc'},
+                {'field': 'name', 'direction': 'asc'},
+            ],
+            False,
+        ),
+        (
+            [
+                {'field': 'created_at', 'direction': 'desc'},
+                {'field': 'name', 'direction': 'desc'},
+            ],
+            True,
+        ),
+        ([{'field': 'created_at', 'direction': 'desc'}], True),
+        # the primary key is unique, so the rest of the keys don't matter
+        (
+            [
+                {'field': 'id', 'direction': 'asc'},
+                {'field': 'name', 'direction': 'desc'},
+            ],
+            False,
+        ),
+    ])
+    def test_index_ordered(self, sort_spec, backward):
+        plan = plan_sort(Query(Qux), sort_spec)
+
+        assert plan.index_ordered
+        assert plan.backward == backward
+        assert plan.issues == []
+
+    def test_index(self):
+        plan = plan_sort(
+            Query(Qux), [{'field': 'created_at', 'direction': 'asc'}]
+        )
+
+        assert plan.index.name == 'ix_qux_created_at_name'
+
+    def test_mixed_directions(self):
+        sort_spec = [
+            {'field': 'created_at', 'direction': 'asc'},
+            {'field': 'name', 'direction': 'desc'},
+        ]
+
+        plan = plan_sort(Query(Qux), sort_spec)
+
+        assert not plan.index_ordered
+        assert plan.index is None
+        assert [issue.code for issue in plan.issues] == [UNORDERED]
+        assert plan.issues[0].message == (
+            'No index on `qux` matches ORDER BY created_at ASC, name DESC.'
+        )
+
+    def test_single_dictionary(self):
+        plan = plan_sort(Query(Qux), {'field': 'id', 'direction': 'asc'})
+
+        assert plan.index_ordered
+
+    def test_not_a_prefix(self):
+        plan = plan_sort(Query(Qux), [{'field': 'name', 'direction': 'asc'}])
+
+        assert [issue.code for issue in plan.issues] == [UNORDERED]
+
+    def test_nulls_placement(self):
+        # without a session, NULL values are assumed to sort first in
+        # ascending order, as in SQLite and MySQL
+        ordered = plan_sort(Query(Qux), [
+            {'field': 'created_at', 'direction': 'asc', 'nullsfirst': True},
+        ])
+        backward = plan_sort(Query(Qux), [
+            {'field': 'created_at', 'direction': 'desc', 'nullslast': True},
+        ])
+        unordered = plan_sort(Query(Qux), [
+            {'field': 'created_at', 'direction': 'asc', 'nullslast': True},
+        ])
+
+        assert ordered.index_ordered
+        assert backward.index_ordered and backward.backward
+        assert not unordered.index_ordered
+        assert unordered.issues[0].message == (
+            'No index on `qux` matches ORDER BY created_at ASC NULLS LAST.'
+        )
+
+    def test_nulls_placement_of_not_nullable_column(self):
+        plan = plan_sort(Query(Qux), [
+            {'field': 'id', 'direction': 'asc', 'nullslast': True},
+        ])
+
+        assert plan.index_ordered
+
+    def test_nulls_placement_of_dialect(self, session, is_postgresql):
+        sort_spec = [
+            {'field': 'created_at', 'direction': 'asc', 'nullslast': True},
+        ]
+
+        plan = plan_sort(session.query(Qux), sort_spec)
+
+        assert plan.index_ordered == is_postgresql
+
+    def test_tiebreaker(self):
+        sort_spec = [{'field': 'bar_id', 'direction': 'asc'}]
+
+        plan = plan_sort(Query(Foo), sort_spec)
+        tiebreaker_plan = plan_sort(Query(Foo), sort_spec, tiebreaker=True)
+
+        assert plan.index_ordered
+        assert [issue.message for issue in tiebreaker_plan.issues] == [
+            'No index on `foo` matches ORDER BY bar_id ASC, id ASC.'
+        ]
+
+    def test_multiple_tables(self):
+        sort_spec = [
+            {'model': 'Foo', 'field': 'id', 'direction': 'asc'},
+            {'model': 'Bar', 'field': 'id', 'direction': 'asc'},
+        ]
+
+        plan = plan_sort(Query(Foo).join(Bar), sort_spec)
+
+        assert [issue.code for issue in plan.issues] == [MULTIPLE_TABLES]
+        assert plan.issues[0].message == (
+            'Sort keys on tables `foo`, `bar` cannot be served by a single '
+            'index.'
+        )
+
+    def test_hybrid_attribute(self):
+        plan = plan_sort(
+            Query(Foo), [{'field': 'count_square', 'direction': 'asc'}]
+        )
+
+        assert [issue.code for issue in plan.issues] == [EXPRESSION]
+
+    def test_aggregate(self):
+        plan = plan_sort(Query(Bar), [
+            {'field': 'foos', 'aggregate': 'count', 'direction': 'asc'},
+        ])
+
+        assert [issue.code for issue in plan.issues] == [EXPRESSION]
+        assert plan.issues[0].message == (
+            '`Bar.foos` is sorted by its `count` and cannot use an index.'
+        )
+
+    def test_equality_filter_on_leading_column(self):
+        query = Query(Qux).filter(Qux.created_at == datetime.date(2016, 7, 12))
+
+        plan = plan_sort(query, [{'field': 'name', 'direction': 'desc'}])
+
+        assert plan.index_ordered
+        assert plan.index.name == 'ix_qux_created_at_name'
+        assert plan.backward
+
+    def test_equality_filter_on_sort_key(self):
+        query = Query(Qux).filter(
+            Qux.name == 'name_1', Qux.created_at > datetime.date(2016, 7, 12)
+        )
+
+        plan = plan_sort(query, [
+            {'field': 'name', 'direction': 'desc'},
+            {'field': 'created_at', 'direction': 'asc'},
+        ])
+
+        assert plan.index_ordered
+        assert plan.index.name == 'ix_qux_created_at_name'
+
+    @pytest.mark.parametrize('query', [
+        Query(Qux).filter(Qux.created_at > datetime.date(2016, 7, 12)),
+        Query(Qux).filter(or_(
+            Qux.created_at == datetime.date(2016, 7, 12), Qux.id == 1
+        )),
+    ])
+    def test_filter_not_on_a_single_value(self, query):
+        plan = plan_sort(query, [{'field': 'name', 'direction': 'asc'}])
+
+        assert [issue.code for issue in plan.issues] == [UNORDERED]
+
+    def test_empty_sort(self):
+        plan = plan_sort(Query(Foo), [])
+
+        assert plan.index_ordered
+        assert plan.index is None
+
+
+@pytest.fixture
+def multiple_foos_inserted(session):
+    session.add_all([
+        Foo(id=id_, name='name_{}'.format(id_)) for id_ in range(1, 9)
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def analysed(session, is_sqlite):
+    if not is_sqlite:
+        pytest.skip('Estimates depend on the statistics of the database')
+    session.execute(text('ANALYZE'))
+
+    yield
+
+    # statistics are kept by the database across the tests, and in the
+    # memory of the connection until they are reloaded
+    session.execute(text('DROP TABLE sqlite_stat1'))
+    session.execute(text('ANALYZE sqlite_master'))
+    session.commit()
+
+
+class TestStrictSort(object):
+
+    def test_index_ordered(self, session):
+        query = apply_sort(
+            session.query(Foo), [{'field': 'id', 'direction': 'desc'}],
+            strict='raise',
+        )
+
+        assert query.all() == []
+
+    def test_raise(self, session):
+        with pytest.raises(UnindexedSpec) as err:
+            apply_sort(
+                session.query(Foo), [{'field': 'name', 'direction': 'asc'}],
+                strict='raise',
+            )
+
+        assert error_value(err) == (
+            'No index on `foo` matches ORDER BY name ASC.'
+        )
+
+    def test_log(self, session, caplog):
+        with caplog.at_level(logging.WARNING):
+            query = apply_sort(
+                session.query(Foo), [{'field': 'name', 'direction': 'asc'}],
+                strict='log',
+            )
+
+        assert query.all() == []
+        assert caplog.messages == [
+            'No index on `foo` matches ORDER BY name ASC.'
+        ]
+
+    @pytest.mark.usefixtures('multiple_foos_inserted', 'analysed')
+    def test_max_rows(self, session):
+        sort_spec = [{'field': 'name', 'direction': 'asc'}]
+
+        query = apply_sort(
+            session.query(Foo), sort_spec, strict='raise', max_rows=10
+        )
+        assert len(query.all()) == 8
+
+        with pytest.raises(UnindexedSpec) as err:
+            apply_sort(
+                session.query(Foo), sort_spec, strict='raise', max_rows=5
+            )
+
+        assert error_value(err) == (
+            'No index on `foo` matches ORDER BY name ASC. The sort would be '
+            'done over an estimate of 8 rows.'
+        )
+
+    @pytest.mark.usefixtures('multiple_foos_inserted', 'analysed')
+    def test_max_rows_of_query_with_many_models(self, session):
+        query = apply_sort(
+            session.query(Foo).join(Bar),
+            [{'model': 'Foo', 'field': 'name', 'direction': 'asc'}],
+            strict='raise', max_rows=10,
+        )
+
+        assert query.all() == []
+
+    @pytest.mark.usefixtures('multiple_foos_inserted', 'analysed')
+    def test_estimate_rows(self, session):
+        assert estimate_rows(session, Foo.__table__) == 8
+
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    def test_estimate_rows_of_table_not_analysed(self, session, is_sqlite):
+        if not is_sqlite:
+            pytest.skip('Estimates depend on the statistics of the database')
+
+        assert estimate_rows(session, Foo.__table__) is None
+
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    def test_max_rows_of_table_not_analysed(self, session, is_sqlite):
+        if not is_sqlite:
+            pytest.skip('Estimates depend on the statistics of the database')
+
+        with pytest.raises(UnindexedSpec) as err:
+            apply_sort(
+                session.query(Foo), [{'field': 'name', 'direction': 'asc'}],
+                strict='raise', max_rows=10,
+            )
+
+        assert error_value(err) == (
+            'No index on `foo` matches ORDER BY name ASC.'
+        )
+
+    def test_max_rows_without_session(self):
+        with pytest.raises(UnindexedSpec) as err:
+            check_sort(
+                Query(Foo), [{'field': 'name', 'direction': 'asc'}],
+                max_rows=10,
+            )
+
+        assert error_value(err) == (
+            'No index on `foo` matches ORDER BY name ASC.'
+        )
+
+    def test_invalid_strict_mode(self, session):
+        with pytest.raises(ValueError) as err:
+            apply_sort(session.query(Foo), [], strict='warn')
+
+        assert error_value(err) == 'Strict mode `warn` not valid.'
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy import func
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.batch import (
+    apply_filters_batch, count_filters_batch, union_filters
+)
+from sqlalchemy_filters.exceptions import BadQuery
+from test import error_value
+from test.models import Bar, Foo, Grault
+
+
+FILTER_SPECS = [
+    [],
+    {'field': 'name', 'value': 'name_1'},
+    {'or': [
+        {'field': 'count', 'op': '>', 'value': 90},
+        {'field': 'count', 'op': 'is_null'},
+    ]},
+    {'model': 'Bar', 'field': 'count', 'op': '<', 'value': 10},
+    {'field': 'name', 'value': 'name_missing'},
+]
+
+
+@pytest.fixture
+def data_inserted(session):
+    bar_1 = Bar(id=1, name='name_1', count=5)
+    bar_2 = Bar(id=2, name='name_2', count=10)
+    session.add_all([
+        bar_1, bar_2,
+        Grault(id=1, name='name_1', bars=[bar_1, bar_2]),
+        Grault(id=2, name='name_2', bars=[bar_1]),
+        Foo(id=1, bar_id=1, name='name_1', count=50),
+        Foo(id=2, bar_id=2, name='name_2', count=100),
+        Foo(id=3, bar_id=1, name='name_1', count=None),
+    ])
+    session.commit()
+
+
+def expected_results(session, filter_specs, **kwargs):
+    return [
+        sorted(foo.id for foo in apply_filters(
+            session.query(Foo), filter_spec, **kwargs
+        ))
+        for filter_spec in filter_specs
+    ]
+
+
+class TestApplyFiltersBatch(object):
+
+    def test_results_per_spec(self, session, data_inserted, statements):
+        expected = expected_results(session, FILTER_SPECS)
+        del statements[:]
+
+        results = apply_filters_batch(session.query(Foo), FILTER_SPECS)
+
+        assert [sorted(foo.id for foo in foos) for foos in results] == (
+            expected
+        )
+        assert len(statements) == 1
+
+    def test_column_queries(self, session, data_inserted):
+        results = apply_filters_batch(
+            session.query(Foo.id, Foo.name),
+            [{'field': 'id', 'value': 1}, {'field': 'id', 'value': 2}],
+        )
+
+        assert results == [[(1, 'name_1')], [(2, 'name_2')]]
+
+    def test_use_exists(self, session, data_inserted):
+        filter_specs = [
+            {'model': 'Grault', 'field': 'name', 'value': 'name_1'},
+            {'model': 'Grault', 'field': 'name', 'value': 'name_2'},
+        ]
+
+        results = apply_filters_batch(
+            session.query(Bar), filter_specs, use_exists=True
+        )
+
+        assert [[bar.id for bar in bars] for bars in results] == [
+            [1, 2], [1]
+        ]
+
+    def test_union_query(self, session, data_inserted):
+        query = union_filters(
+            session.query(Foo),
+            [{'field': 'id', 'value': 1}, {'field': 'id', 'value': 2}],
+        )
+
+        assert [(foo.id, index) for foo, index in query] == [(1, 0), (2, 1)]
+
+    def test_no_specs(self, session):
+        assert union_filters(session.query(Foo), []) is None
+        assert apply_filters_batch(session.query(Foo), []) == []
+
+
+class TestCountFiltersBatch(object):
+
+    @pytest.mark.parametrize('use_filter', [True, False])
+    def test_counts_per_spec(
+        self, session, data_inserted, statements, monkeypatch, use_filter
+    ):
+        monkeypatch.setattr(
+            'sqlalchemy_filters.batch._supports_aggregate_filter',
+            lambda dialect: use_filter,
+        )
+        expected = [
+            len(ids) for ids in expected_results(session, FILTER_SPECS)
+        ]
+        del statements[:]
+
+        counts = count_filters_batch(session.query(Foo), FILTER_SPECS)
+
+        assert counts == expected == [3, 2, 2, 2, 0]
+        assert len(statements) == 1
+        assert ('FILTER (WHERE' in statements[0]) is use_filter
+
+    def test_use_exists(self, session, data_inserted):
+        filter_specs = [
+            [],
+            {'model': 'Grault', 'field': 'name', 'value': 'name_1'},
+            {'model': 'Grault', 'field': 'name', 'op': 'like', 'value': 'name%'},
+        ]
+
+        counts = count_filters_batch(
+            session.query(Bar), filter_specs, use_exists=True
+        )
+
+        assert counts == [2, 2, 2]
+
+    def test_filtered_base_query(self, session, data_inserted):
+        query = session.query(Foo).filter(Foo.bar_id == 1)
+
+        counts = count_filters_batch(
+            query, [[], {'field': 'count', 'op': 'is_not_null'}]
+        )
+
+        assert counts == [2, 1]
+
+    def test_joins_do_not_drop_rows(self, session, statements):
+        session.add_all([
+            Bar(id=1, name='name_1', count=5),
+            Foo(id=1, bar_id=1, name='name_1'),
+            Foo(id=2, bar_id=None, name='name_1'),
+        ])
+        session.commit()
+        filter_specs = [
+            {'field': 'name', 'value': 'name_1'},
+            {'model': 'Bar', 'field': 'count', 'op': '<', 'value': 10},
+        ]
+        expected = [
+            apply_filters(session.query(Foo), filter_spec).count()
+            for filter_spec in filter_specs
+        ]
+        del statements[:]
+
+        counts = count_filters_batch(session.query(Foo), filter_specs)
+
+        assert counts == expected == [2, 1]
+        assert len(statements) == 1
+
+    def test_no_specs(self, session):
+        assert count_filters_batch(session.query(Foo), []) == []
+
+    def test_query_without_entity(self, session):
+        query = session.query(func.count('*')).select_from(Foo)
+
+        with pytest.raises(BadQuery) as err:
+            count_filters_batch(query, [{'field': 'name', 'value': 'name_1'}])
+
+        assert error_value(err) == (
+            'Counting filter specs needs a query whose first column is a '
+            'model or one of its attributes.'
+        )
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from sqlalchemy_filters import apply_filters, apply_pagination, apply_sort
+from sqlalchemy_filters.cache import (
+    LRUBackend, ResultCache, get_flushed_tables, get_statement_tables
+)
+from test.models import Bar, Foo, Grault
+
+
+@pytest.fixture
+def data_inserted(session):
+    bar_1 = Bar(id=1, name='name_1', count=5)
+    bar_2 = Bar(id=2, name='name_2', count=10)
+    grault = Grault(id=1, name='name_1', bars=[bar_1])
+    session.add_all([
+        bar_1, bar_2, grault,
+        Foo(id=1, bar_id=1, name='name_1', count=50),
+        Foo(id=2, bar_id=2, name='name_2', count=100),
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def cache(session):
+    cache = ResultCache()
+    cache.attach(session)
+
+    yield cache
+
+    cache.detach(session)
+
+
+def foo_query(session, name='name_1'):
+    query = apply_filters(session.query(Foo), {'field': 'name', 'value': name})
+    return apply_sort(query, {'field': 'id', 'direction': 'asc'})
+
+
+def selects(statements):
+    return [
+        statement for statement in statements
+        if statement.startswith('SELECT')
+    ]
+
+
+class TestLRUBackend(object):
+
+    def test_evicts_least_recently_used(self):
+        backend = LRUBackend(maxsize=2)
+        backend.set('a', b'1')
+        backend.set('b', b'2')
+        backend.get('a')
+        backend.set('c', b'3')
+
+        assert backend.get('a') == b'1'
+        assert backend.get('b') is None
+        assert backend.get('c') == b'3'
+        assert len(backend) == 2
+
+    def test_delete_and_clear(self):
+        backend = LRUBackend()
+        backend.set('a', b'1')
+        backend.set('b', b'2')
+
+        backend.delete('a')
+        backend.delete('missing')
+        assert backend.get('a') is None
+
+        backend.clear()
+        assert len(backend) == 0
+
+
+class TestTables(object):
+
+    def test_statement_tables(self, session):
+        query = apply_filters(
+            session.query(Foo),
+            [{'model': 'Bar', 'field': 'name', 'value': 'name_1'}]
+        )
+
+        assert get_statement_tables(query.statement) == {'foo', 'bar'}
+
+    def test_exists_subquery_tables(self, session):
+        query = apply_filters(
+            session.query(Bar),
+            [{'model': 'Grault', 'field': 'name', 'value': 'name_1'}],
+            use_exists=True,
+        )
+
+        assert get_statement_tables(query.statement) == {
+            'bar', 'bar_grault', 'grault'
+        }
+
+    def test_flushed_tables(self, session, data_inserted):
+        tables = []
+
+        @event.listens_for(session, 'after_flush')
+        def after_flush(session, flush_context):
+            tables.append(get_flushed_tables(session))
+
+        grault = session.query(Grault).get(1)
+        grault.bars.append(session.query(Bar).get(2))
+        session.add(Foo(id=3, bar_id=1, name='name_3'))
+        session.flush()
+
+        assert tables == [{'bar', 'grault', 'bar_grault', 'foo'}]
+
+
+class TestResultCache(object):
+
+    def test_hit(self, session, data_inserted, cache, statements):
+        results = cache.all(foo_query(session))
+        cached_results = cache.all(foo_query(session))
+
+        assert [foo.id for foo in results] == [1]
+        assert cached_results == results
+        assert len(selects(statements)) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_parameters_are_part_of_the_key(
+        self, session, data_inserted, cache, statements
+    ):
+        results = cache.all(foo_query(session, 'name_1'))
+        other_results = cache.all(foo_query(session, 'name_2'))
+
+        assert [foo.id for foo in results] == [1]
+        assert [foo.id for foo in other_results] == [2]
+        assert len(selects(statements)) == 2
+
+    def test_paginated_queries(self, session, data_inserted, cache):
+        query = apply_sort(
+            session.query(Foo), {'field': 'id', 'direction': 'asc'}
+        )
+
+        first_page = cache.all(apply_pagination(query, 1, 1)[0])
+        second_page = cache.all(apply_pagination(query, 2, 1)[0])
+
+        assert [foo.id for foo in first_page] == [1]
+        assert [foo.id for foo in second_page] == [2]
+
+    def test_instances_are_merged_into_other_sessions(
+        self, session, data_inserted, cache, statements
+    ):
+        cache.all(foo_query(session))
+        other_session = type(session)(bind=session.get_bind())
+
+        results = cache.all(foo_query(other_session))
+
+        assert results[0] in other_session
+        assert (results[0].id, results[0].name, results[0].count) == (
+            1, 'name_1', 50
+        )
+        assert len(selects(statements)) == 1
+        other_session.close()
+
+    def test_column_queries(self, session, data_inserted, cache):
+        query = apply_filters(
+            session.query(Foo.id, Foo.name), {'field': 'count', 'value': 50}
+        )
+
+        cache.all(query)
+
+        assert [tuple(row) for row in cache.all(query)] == [(1, 'name_1')]
+
+    def test_commit_invalidates_read_tables(
+        self, session, data_inserted, cache, statements
+    ):
+        foo_query_with_bar = apply_filters(
+            session.query(Foo),
+            {'model': 'Bar', 'field': 'name', 'value': 'name_1'},
+        )
+        grault_query = session.query(Grault)
+        cache.all(foo_query_with_bar)
+        cache.all(grault_query)
+
+        session.query(Bar).get(1).count = 6
+        session.commit()
+        del statements[:]
+
+        assert [foo.id for foo in cache.all(foo_query_with_bar)] == [1]
+        cache.all(grault_query)
+        assert len(selects(statements)) == 1
+
+    def test_association_table_changes_invalidate(
+        self, session, data_inserted, cache
+    ):
+        query = apply_filters(
+            session.query(Bar),
+            {'model': 'Grault', 'field': 'name', 'value': 'name_1'},
+            use_exists=True,
+        )
+        assert [bar.id for bar in cache.all(query)] == [1]
+
+        grault = session.query(Grault).get(1)
+        grault.bars.append(session.query(Bar).get(2))
+        session.commit()
+
+        assert [bar.id for bar in cache.all(query)] == [1, 2]
+
+    def test_uncommitted_rows_are_not_cached(
+        self, session, data_inserted, cache, statements
+    ):
+        query = session.query(Foo.id).order_by(Foo.id)
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2]
+
+        session.add(Foo(id=3, name='name_3'))
+        session.flush()
+        del statements[:]
+
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2, 3]
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2, 3]
+        assert len(selects(statements)) == 2
+        assert cache.hits == 0
+
+        session.rollback()
+        del statements[:]
+
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2]
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2]
+        assert len(selects(statements)) == 1
+
+    def test_pending_changes_bypass_the_cache(
+        self, session, data_inserted, cache
+    ):
+        query = session.query(Foo.id).order_by(Foo.id)
+        cache.all(query)
+
+        session.add(Foo(id=3, name='name_3'))  # flushed by the query
+
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2, 3]
+        session.rollback()
+        assert [foo_id for foo_id, in cache.all(query)] == [1, 2]
+
+    def test_database_is_part_of_the_key(self):
+        cache = ResultCache()
+        queries = [
+            Session(bind=create_engine(url)).query(Foo)
+            for url in ('sqlite://', 'sqlite:///other.db')
+        ]
+
+        assert cache.get_key(queries[0]) != cache.get_key(queries[1])
+
+    def test_results_invalidated_while_read_are_not_stored(
+        self, session, data_inserted, cache, statements
+    ):
+        engine = session.get_bind().engine
+
+        def invalidate(*args):
+            cache.invalidate('foo')
+
+        event.listen(engine, 'before_cursor_execute', invalidate)
+        try:
+            cache.all(foo_query(session))
+        finally:
+            event.remove(engine, 'before_cursor_execute', invalidate)
+        cache.all(foo_query(session))
+
+        assert len(selects(statements)) == 2
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_results_read_after_clear_are_stored(
+        self, session, data_inserted, cache, statements
+    ):
+        cache.clear()
+        cache.all(foo_query(session))
+        cache.all(foo_query(session))
+
+        assert len(selects(statements)) == 1
+
+    def test_invalidate(self, session, data_inserted, cache, statements):
+        cache.all(foo_query(session))
+
+        cache.invalidate('foo')
+        cache.all(foo_query(session))
+
+        assert len(selects(statements)) == 2
+
+    def test_clear(self, session, data_inserted, cache, statements):
+        cache.all(foo_query(session))
+
+        cache.clear()
+        cache.all(foo_query(session))
+
+        assert len(selects(statements)) == 2
+
+    def test_custom_backend(self, session, data_inserted):
+        backend = LRUBackend(maxsize=1)
+        cache = ResultCache(backend)
+
+        cache.all(foo_query(session, 'name_1'))
+        cache.all(foo_query(session, 'name_2'))
+
+        assert len(backend) == 1
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.exceptions import BadFilterFormat
+from test import error_value
+from test.models import Qux
+
+
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture
+def quxs_inserted(session):
+    session.add_all([
+        Qux(
+            id=1, name='name_1', created_at=datetime.date(2016, 6, 30),
+            execution_time=datetime.datetime(2016, 6, 30, 23, 30),
+        ),
+        Qux(
+            id=2, name='name_2', created_at=datetime.date(2016, 7, 1),
+            execution_time=datetime.datetime(2016, 7, 1, 0, 0),
+        ),
+        Qux(
+            id=3, name='name_3', created_at=datetime.date(2016, 7, 31),
+            execution_time=datetime.datetime(2016, 7, 31, 23, 59, 59),
+        ),
+        Qux(
+            id=4, name='name_4', created_at=datetime.date(2016, 8, 1),
+            execution_time=datetime.datetime(2016, 8, 1, 0, 0),
+        ),
+        Qux(id=5, name='name_5', created_at=None, execution_time=None),
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def recent_quxs_inserted(session):
+    now = datetime.datetime.now(UTC).replace(tzinfo=None)
+    session.add_all([
+        Qux(
+            id=1, name='name_1', created_at=now.date(),
+            execution_time=now - datetime.timedelta(hours=1),
+        ),
+        Qux(
+            id=2, name='name_2',
+            created_at=(now - datetime.timedelta(days=3)).date(),
+            execution_time=now - datetime.timedelta(days=3),
+        ),
+        Qux(
+            id=3, name='name_3',
+            created_at=(now - datetime.timedelta(days=10)).date(),
+            execution_time=now - datetime.timedelta(days=10),
+        ),
+        Qux(
+            id=4, name='name_4',
+            created_at=(now + datetime.timedelta(days=2)).date(),
+            execution_time=now + datetime.timedelta(days=2),
+        ),
+    ])
+    session.commit()
+
+
+def filtered_ids(session, filter_spec):
+    query = apply_filters(session.query(Qux), filter_spec)
+    return [qux.id for qux in query.order_by(Qux.id)]
+
+
+class TestSargable:
+
+    @pytest.mark.parametrize('filter_spec', [
+        {'field': 'created_at', 'op': 'on_date', 'value': '2016-07-01'},
+        {'field': 'execution_time', 'op': 'in_month', 'value': '2016-07'},
+        {
+            'field': 'execution_time', 'op': 'between',
+            'value': ['2016-07-01', '2016-07-02T12:00:00'],
+        },
+        {'field': 'execution_time', 'op': 'within_last', 'value': 7},
+    ])
+    def test_column_is_compared_as_is(self, filter_spec):
+        field = filter_spec['field']
+        query = apply_filters(Query(Qux), filter_spec)
+
+        statement = query.statement.compile(dialect=postgresql.dialect())
+        where = statement.string.split('WHERE')[1]
+
+        assert where.strip() == (
+            'qux.{0} >= %({0}_1)s AND qux.{0} < %({0}_2)s'.format(field)
+        )
+
+
+@pytest.mark.usefixtures('quxs_inserted')
+class TestBetween:
+
+    @pytest.mark.parametrize('field', ['created_at', 'execution_time'])
+    def test_half_open(self, session, field):
+        filter_spec = {
+            'field': field, 'op': 'between',
+            'value': [datetime.date(2016, 7, 1), datetime.date(2016, 8, 1)],
+        }
+
+        assert filtered_ids(session, filter_spec) == [2, 3]
+
+    def test_datetimes(self, session):
+        filter_spec = {
+            'field': 'execution_time', 'op': 'between',
+            'value': [
+                datetime.datetime(2016, 6, 30, 23, 30),
+                datetime.datetime(2016, 7, 31, 23, 59, 59),
+            ],
+        }
+
+        assert filtered_ids(session, filter_spec) == [1, 2]
+
+    def test_iso_strings(self, session):
+        filter_spec = {
+            'field': 'execution_time', 'op': 'between',
+            'value': ['2016-06-30T23:00:00Z', '2016-07-01T00:00:01Z'],
+        }
+
+        assert filtered_ids(session, filter_spec) == [1, 2]
+
+    def test_aware_datetimes_are_converted_to_utc(self, session):
+        tzinfo = datetime.timezone(datetime.timedelta(hours=2))
+        filter_spec = {
+            'field': 'execution_time', 'op': 'between',
+            'value': [
+                datetime.datetime(2016, 7, 1, 1, 0, tzinfo=tzinfo),
+                datetime.datetime(2016, 7, 1, 3, 0, tzinfo=tzinfo),
+            ],
+        }
+
+        assert filtered_ids(session, filter_spec) == [1, 2]
+
+    @pytest.mark.parametrize('value', [
+        '2016-07-01', ['2016-07-01'], ['2016-07-01', '2016-07-02', '2016']
+    ])
+    def test_not_a_pair(self, value):
+        filter_spec = {'field': 'created_at', 'op': 'between', 'value': value}
+
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(Query(Qux), filter_spec)
+
+        expected_error = 'Value of operator `between` must be a pair of dates.'
+        assert expected_error == error_value(err)
+
+
+@pytest.mark.usefixtures('quxs_inserted')
+class TestOnDate:
+
+    @pytest.mark.parametrize('field', ['created_at', 'execution_time'])
+    @pytest.mark.parametrize('value', [
+        datetime.date(2016, 7, 1),
+        datetime.datetime(2016, 7, 1, 12, 0),
+        '2016-07-01',
+    ])
+    def test_on_date(self, session, field, value):
+        filter_spec = {'field': field, 'op': 'on_date', 'value': value}
+
+        assert filtered_ids(session, filter_spec) == [2]
+
+    def test_day_of_aware_datetime(self, session):
+        # the 1st of July in UTC-1 is from 01:00 UTC to 01:00 UTC of the 2nd
+        tzinfo = datetime.timezone(datetime.timedelta(hours=-1))
+        filter_spec = {
+            'field': 'execution_time', 'op': 'on_date',
+            'value': datetime.datetime(2016, 7, 1, 12, 0, tzinfo=tzinfo),
+        }
+
+        assert filtered_ids(session, filter_spec) == []
+
+        filter_spec['value'] = '2016-06-30T12:00:00-01:00'
+
+        assert filtered_ids(session, filter_spec) == [1, 2]
+
+
+@pytest.mark.usefixtures('quxs_inserted')
+class TestInMonth:
+
+    @pytest.mark.parametrize('field', ['created_at', 'execution_time'])
+    @pytest.mark.parametrize('value', [
+        '2016-07', '2016-07-15', datetime.date(2016, 7, 15),
+        datetime.datetime(2016, 7, 15, 12, 0),
+    ])
+    def test_in_month(self, session, field, value):
+        filter_spec = {'field': field, 'op': 'in_month', 'value': value}
+
+        assert filtered_ids(session, filter_spec) == [2, 3]
+
+    def test_december(self, session):
+        filter_spec = {
+            'field': 'created_at', 'op': 'in_month', 'value': '2015-12'
+        }
+        query = apply_filters(session.query(Qux), filter_spec)
+
+        assert query.statement.compile().params == {
+            'created_at_1': datetime.date(2015, 12, 1),
+            'created_at_2': datetime.date(2016, 1, 1),
+        }
+
+    def test_not_a_month(self):
+        filter_spec = {
+            'field': 'created_at', 'op': 'in_month', 'value': '2016-13'
+        }
+
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(Query(Qux), filter_spec)
+
+        expected_error = (
+            'Value `2016-13` of operator `in_month` is not a date.'
+        )
+        assert expected_error == error_value(err)
+
+
+@pytest.mark.usefixtures('recent_quxs_inserted')
+class TestWithinLast:
+
+    @pytest.mark.parametrize('field', ['created_at', 'execution_time'])
+    @pytest.mark.parametrize('value', [
+        7, datetime.timedelta(days=7), {'days': 7}, {'weeks': 1},
+    ])
+    def test_within_last(self, session, field, value):
+        filter_spec = {'field': field, 'op': 'within_last', 'value': value}
+
+        assert filtered_ids(session, filter_spec) == [1, 2]
+
+    def test_hours(self, session):
+        filter_spec = {
+            'field': 'execution_time', 'op': 'within_last',
+            'value': {'hours': 2},
+        }
+
+        assert filtered_ids(session, filter_spec) == [1]
+
+    @pytest.mark.parametrize('value', [
+        '7', True, {'fortnights': 1}, 10 ** 10, {'days': 999999999},
+    ])
+    def test_not_a_duration(self, value):
+        filter_spec = {
+            'field': 'created_at', 'op': 'within_last', 'value': value
+        }
+
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(Query(Qux), filter_spec)
+
+        expected_error = (
+            'Value `{}` of operator `within_last` is not a valid '
+            'duration.'.format(value)
+        )
+        assert expected_error == error_value(err)
+
+
+class TestErrors:
+
+    @pytest.mark.parametrize('operator', [
+        'between', 'on_date', 'in_month', 'within_last'
+    ])
+    def test_not_a_date_field(self, operator):
+        filter_spec = {'field': 'name', 'op': operator, 'value': 1}
+
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(Query(Qux), filter_spec)
+
+        expected_error = (
+            'Operator `{}` can only be applied to Date and DateTime '
+            'fields.'.format(operator)
+        )
+        assert expected_error == error_value(err)
+
+    def test_not_a_date(self):
+        filter_spec = {
+            'field': 'created_at', 'op': 'on_date', 'value': 'yesterday'
+        }
+
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(Query(Qux), filter_spec)
+
+        expected_error = 'Value `yesterday` of operator `on_date` is not a date.'
+        assert expected_error == error_value(err)
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.evaluation import (
+    apply_filters_in_memory, compile_predicate
+)
+from sqlalchemy_filters.exceptions import (
+    BadFilterFormat, BadSpec, FieldNotFound
+)
+from sqlalchemy_filters.models import sqlalchemy_version_lt
+from test import error_value
+from test.models import Foo, Garply, Qux
+
+
+ROWS = [
+    {'id': 1, 'name': 'name_1', 'count': 50, 'bar_id': 1},
+    {'id': 2, 'name': 'name_2', 'count': 100, 'bar_id': 2},
+    {'id': 3, 'name': 'name_1', 'count': None, 'bar_id': None},
+    {'id': 4, 'name': 'name_4', 'count': 150, 'bar_id': 4},
+    {'id': 5, 'name': 'other_50%', 'count': 0, 'bar_id': 1},
+]
+
+
+def qux_rows():
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return [
+        {
+            'id': 1, 'name': 'name_1', 'created_at': datetime.date(2016, 6, 30),
+            'execution_time': datetime.datetime(2016, 6, 30, 23, 30),
+        },
+        {
+            'id': 2, 'name': 'name_2', 'created_at': datetime.date(2016, 7, 1),
+            'execution_time': datetime.datetime(2016, 7, 1),
+        },
+        {
+            'id': 3, 'name': 'name_3', 'created_at': datetime.date(2016, 7, 31),
+            'execution_time': datetime.datetime(2016, 7, 31, 23, 59, 59),
+        },
+        {'id': 4, 'name': 'name_4', 'created_at': None, 'execution_time': None},
+        {
+            'id': 5, 'name': 'name_5',
+            'created_at': (now - datetime.timedelta(days=3)).date(),
+            'execution_time': now - datetime.timedelta(days=3),
+        },
+        {
+            'id': 6, 'name': 'name_6',
+            'created_at': (now - datetime.timedelta(hours=1)).date(),
+            'execution_time': now - datetime.timedelta(hours=1),
+        },
+    ]
+
+
+@pytest.fixture
+def foos(session):
+    foos = [Foo(**row) for row in ROWS]
+    session.add_all(foos)
+    session.commit()
+    return foos
+
+
+def ids(rows):
+    return sorted(
+        row['id'] if isinstance(row, dict) else row.id for row in rows
+    )
+
+
+class TestSameResultsAsDatabase(object):
+
+    @pytest.mark.parametrize('filter_spec', [
+        [],
+        {'field': 'name', 'op': 'is_null'},
+        {'field': 'name', 'op': 'is_not_null'},
+        {'field': 'name', 'op': '==', 'value': 'name_1'},
+        {'field': 'count', 'op': 'eq', 'value': None},
+        {'field': 'count', 'op': '!=', 'value': None},
+        {'field': 'count', 'op': '!=', 'value': 50},
+        {'field': 'count', 'op': '>', 'value': 50},
+        {'field': 'count', 'op': 'ge', 'value': 50},
+        {'field': 'count', 'op': '<', 'value': 100},
+        {'field': 'count', 'op': 'le', 'value': 100},
+        {'field': 'name', 'op': 'like', 'value': 'name_%'},
+        {'field': 'name', 'op': 'like', 'value': '%1'},
+        {'field': 'name', 'op': 'like', 'value': 'name__'},
+        {'field': 'name', 'op': 'ilike', 'value': 'NAME_%'},
+        {'field': 'name', 'op': 'not_ilike', 'value': 'NAME_1'},
+        {'field': 'count', 'op': 'in', 'value': [0, 50, 150]},
+        {'field': 'bar_id', 'op': 'in', 'value': [2, None]},
+        {'field': 'count', 'op': 'not_in', 'value': [50]},
+        {'field': 'bar_id', 'op': 'not_in', 'value': [2, None]},
+        {'field': 'count', 'op': 'in', 'value': []},
+        {'field': 'count', 'op': 'not_in', 'value': []},
+        [
+            {'field': 'name', 'value': 'name_1'},
+            {'field': 'count', 'op': '>', 'value': 10},
+        ],
+        {'or': [
+            {'field': 'count', 'op': '>', 'value': 100},
+            {'field': 'name', 'value': 'name_1'},
+        ]},
+        {'or': [
+            {'field': 'count', 'op': '>', 'value': 1000},
+            {'field': 'bar_id', 'op': '==', 'value': 1},
+        ]},
+        {'not': [{'field': 'count', 'op': '>', 'value': 50}]},
+        {'not': [{'or': [
+            {'field': 'count', 'op': '==', 'value': 50},
+            {'field': 'name', 'op': '==', 'value': 'name_2'},
+        ]}]},
+        {'not': [{'and': [
+            {'field': 'count', 'op': '>', 'value': 0},
+            {'field': 'bar_id', 'op': '==', 'value': 1},
+        ]}]},
+        {'and': [
+            {'field': 'name', 'op': 'is_not_null'},
+            {'or': [
+                {'field': 'count', 'op': 'is_null'},
+                {'not': [{'field': 'count', 'op': '<', 'value': 100}]},
+            ]},
+        ]},
+    ])
+    def test_same_results(self, session, foos, filter_spec):
+        expected = ids(apply_filters(session.query(Foo), filter_spec).all())
+
+        assert ids(apply_filters_in_memory(foos, filter_spec, Foo)) == expected
+        assert ids(apply_filters_in_memory(ROWS, filter_spec)) == expected
+
+
+class TestDatesSameResultsAsDatabase(object):
+
+    @pytest.fixture
+    def quxs(self, session):
+        rows = qux_rows()
+        quxs = [Qux(**row) for row in rows]
+        session.add_all(quxs)
+        session.commit()
+        return rows, quxs
+
+    @pytest.mark.parametrize('filter_spec', [
+        {
+            'field': 'created_at', 'op': 'between',
+            'value': ['2016-07-01', '2016-07-31'],
+        },
+        {
+            'field': 'execution_time', 'op': 'between',
+            'value': ['2016-06-30T23:30:00', '2016-07-31T23:59:59'],
+        },
+        {
+            'field': 'execution_time', 'op': 'between',
+            'value': ['2016-07-01T00:30:00+01:00', '2016-08-01'],
+        },
+        {'field': 'created_at', 'op': 'on_date', 'value': '2016-07-01'},
+        {'field': 'execution_time', 'op': 'on_date', 'value': '2016-06-30'},
+        {
+            'field': 'execution_time', 'op': 'on_date',
+            'value': '2016-07-01T12:00:00+02:00',
+        },
+        {'field': 'created_at', 'op': 'in_month', 'value': '2016-07'},
+        {
+            'field': 'execution_time', 'op': 'in_month',
+            'value': datetime.date(2016, 6, 15),
+        },
+        {'field': 'created_at', 'op': 'within_last', 'value': 7},
+        {'field': 'execution_time', 'op': 'within_last', 'value': 7},
+        {
+            'field': 'execution_time', 'op': 'within_last',
+            'value': {'hours': 2},
+        },
+        {'not': [{'field': 'created_at', 'op': 'in_month', 'value': '2016-07'}]},
+    ])
+    def test_same_results(self, session, quxs, filter_spec):
+        rows, quxs = quxs
+        expected = ids(apply_filters(session.query(Qux), filter_spec).all())
+
+        assert ids(apply_filters_in_memory(quxs, filter_spec, Qux)) == expected
+        assert ids(apply_filters_in_memory(rows, filter_spec)) == expected
+
+    def test_aware_datetimes(self):
+        predicate = compile_predicate({
+            'field': 'execution_time', 'op': 'on_date', 'value': '2016-07-01',
+        })
+        paris = datetime.timezone(datetime.timedelta(hours=2))
+
+        assert predicate({
+            'execution_time': datetime.datetime(2016, 7, 1, 1, 0, tzinfo=paris)
+        }) is False
+        assert predicate({
+            'execution_time': datetime.datetime(2016, 7, 1, 3, 0, tzinfo=paris)
+        }) is True
+
+    def test_not_a_date_field(self):
+        with pytest.raises(BadFilterFormat) as err:
+            compile_predicate(
+                {'field': 'name', 'op': 'on_date', 'value': '2016-07-01'},
+                Qux,
+            )
+
+        assert error_value(err) == (
+            'Operator `on_date` can only be applied to Date and DateTime '
+            'fields.'
+        )
+
+    def test_not_a_date_value(self):
+        predicate = compile_predicate(
+            {'field': 'name', 'op': 'on_date', 'value': '2016-07-01'}
+        )
+
+        with pytest.raises(BadFilterFormat) as err:
+            predicate({'name': 'name_1'})
+
+        assert error_value(err) == 'Value `name_1` is not a date.'
+
+
+class TestNullSemantics(object):
+
+    def test_comparison_with_null_does_not_match(self):
+        predicate = compile_predicate({'field': 'count', 'op': '!=', 'value': 1})
+
+        assert predicate({'count': 2}) is True
+        assert predicate({'count': None}) is False
+
+    def test_negated_unknown_is_unknown(self):
+        predicate = compile_predicate(
+            {'not': [{'field': 'count', 'op': '>', 'value': 1}]}
+        )
+
+        assert predicate({'count': 0}) is True
+        assert predicate({'count': None}) is False
+
+    def test_unknown_or_true_is_true(self):
+        predicate = compile_predicate({'or': [
+            {'field': 'count', 'op': '>', 'value': 1},
+            {'field': 'name', 'op': '==', 'value': 'name_1'},
+        ]})
+
+        assert predicate({'count': None, 'name': 'name_1'}) is True
+        assert predicate({'count': None, 'name': 'name_2'}) is False
+
+    def test_not_in_with_null_never_matches(self):
+        predicate = compile_predicate(
+            {'field': 'count', 'op': 'not_in', 'value': [1, None]}
+        )
+
+        assert predicate({'count': 1}) is False
+        assert predicate({'count': 2}) is False
+
+    def test_empty_in_ignores_null(self):
+        in_predicate = compile_predicate(
+            {'field': 'count', 'op': 'in', 'value': []}
+        )
+        not_in_predicate = compile_predicate(
+            {'field': 'count', 'op': 'not_in', 'value': []}
+        )
+
+        assert in_predicate({'count': None}) is False
+        assert not_in_predicate({'count': None}) is True
+
+    def test_missing_dict_key_is_null(self):
+        predicate = compile_predicate({'field': 'count', 'op': 'is_null'})
+
+        assert predicate({}) is True
+
+
+class TestOperators(object):
+
+    def test_like_is_case_sensitive(self):
+        predicate = compile_predicate(
+            {'field': 'name', 'op': 'like', 'value': 'Name%'}
+        )
+
+        assert predicate({'name': 'Name_1'}) is True
+        assert predicate({'name': 'name_1'}) is False
+
+    @pytest.mark.parametrize('dialect, expected', [
+        (None, [True, False, False]),
+        ('postgresql', [True, False, False]),
+        ('sqlite', [True, True, False]),
+        ('mysql', [True, True, True]),
+    ])
+    def test_like_of_dialect(self, dialect, expected):
+        predicate = compile_predicate(
+            {'field': 'name', 'op': 'like', 'value': 'Éclair%'},
+            dialect=dialect,
+        )
+
+        assert [
+            predicate({'name': name})
+            for name in ('Éclair_1', 'ÉCLAIR_1', 'éclair_1')
+        ] == expected
+
+    def test_like_of_database_dialect(self, session, foos):
+        filter_spec = {'field': 'name', 'op': 'like', 'value': 'NAME_%'}
+        dialect = session.get_bind().dialect.name
+        expected = ids(apply_filters(session.query(Foo), filter_spec).all())
+
+        assert ids(
+            apply_filters_in_memory(foos, filter_spec, Foo, dialect)
+        ) == expected
+
+    def test_like_escapes_regex_characters(self):
+        predicate = compile_predicate(
+            {'field': 'name', 'op': 'like', 'value': 'a.b%'}
+        )
+
+        assert predicate({'name': 'a.b.c'}) is True
+        assert predicate({'name': 'axb'}) is False
+
+    def test_like_with_null(self):
+        predicate = compile_predicate(
+            {'field': 'name', 'op': 'ilike', 'value': 'name%'}
+        )
+
+        assert predicate({'name': None}) is False
+
+    def test_in_with_unhashable_values(self):
+        predicate = compile_predicate(
+            {'field': 'tags', 'op': 'in', 'value': [['a'], ['b']]}
+        )
+
+        assert predicate({'tags': ['b']}) is True
+
+    def test_any(self):
+        predicate = compile_predicate(
+            {'field': 'tags', 'op': 'any', 'value': 'a'}
+        )
+
+        assert predicate({'tags': ['a', 'b']}) is True
+        assert predicate({'tags': ['b']}) is False
+        assert predicate({'tags': None}) is False
+
+    def test_search(self):
+        predicate = compile_predicate(
+            {'field': 'name', 'op': 'search', 'value': 'Apple pie'}
+        )
+
+        assert predicate({'name': 'pie with apple'}) is True
+        assert predicate({'name': 'apple crumble'}) is False
+        assert predicate({'name': None}) is False
+
+    def test_match_cannot_be_evaluated(self):
+        with pytest.raises(BadFilterFormat) as err:
+            compile_predicate({'field': 'name', 'op': 'match', 'value': 'a'})
+
+        expected_error = 'Operator `match` cannot be evaluated in Python.'
+        assert expected_error == error_value(err)
+
+
+class TestModelValidation(object):
+
+    def test_invalid_field(self):
+        with pytest.raises(FieldNotFound) as err:
+            compile_predicate({'field': 'invalid_field', 'value': 1}, Foo)
+
+        expected_error = (
+            "Model <class 'test.models.Foo'> has no column `invalid_field`."
+        )
+        assert expected_error == error_value(err)
+
+    def test_other_model(self):
+        with pytest.raises(BadSpec) as err:
+            compile_predicate(
+                {'model': 'Bar', 'field': 'id', 'value': 1}, Foo
+            )
+
+        expected_error = 'The query does not contain model `Bar`.'
+        assert expected_error == error_value(err)
+
+    def test_hybrid_attributes(self):
+        foos = [Foo(id=1, count=5), Foo(id=2, count=10)]
+        filter_spec = [
+            {'field': 'count_square', 'op': '>=', 'value': 25},
+            {'field': 'three_times_count', 'op': '==', 'value': 30},
+        ]
+
+        assert apply_filters_in_memory(foos, filter_spec, Foo) == [foos[1]]
+
+    def test_same_model_name(self):
+        predicate = compile_predicate(
+            {'model': 'Foo', 'field': 'id', 'value': 1}, Foo
+        )
+
+        assert predicate(Foo(id=1)) is True
+
+
+class TestJSONPaths(object):
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+    )
+    def test_json_path(self):
+        garplys = [
+            Garply(id=1, attrs={'color': 'red', 'sizes': [{'width': 5}]}),
+            Garply(id=2, attrs={'color': 'blue'}),
+            Garply(id=3, attrs=None),
+        ]
+
+        red = apply_filters_in_memory(
+            garplys, {'field': 'attrs.color', 'value': 'red'}, Garply
+        )
+        wide = apply_filters_in_memory(
+            garplys,
+            {'field': 'attrs.sizes.0.width', 'op': '>', 'value': 1},
+            Garply,
+        )
+
+        assert [garply.id for garply in red] == [1]
+        assert [garply.id for garply in wide] == [1]
+
+    def test_json_path_of_dictionaries(self):
+        rows = [
+            {'id': 1, 'attrs': {'color': 'red', 'sizes': [{'width': 5}]}},
+            {'id': 2, 'attrs': {'color': 'blue', 'sizes': []}},
+            {'id': 3, 'attrs': None},
+            {'id': 4},
+        ]
+
+        red = apply_filters_in_memory(
+            rows, {'field': 'attrs.color', 'value': 'red'}
+        )
+        wide = apply_filters_in_memory(
+            rows, {'field': 'attrs.sizes.0.width', 'op': '>', 'value': 1}
+        )
+        without_color = apply_filters_in_memory(
+            rows, {'field': 'attrs.color', 'op': 'is_null'}
+        )
+
+        assert ids(red) == [1]
+        assert ids(wide) == [1]
+        assert ids(without_color) == [3, 4]
+
+    def test_invalid_json_path(self):
+        with pytest.raises(BadSpec) as err:
+            compile_predicate({'field': 'attrs.col-or', 'value': 'red'})
+
+        expected_error = 'Field `attrs.col-or` is not a valid JSON path.'
+        assert expected_error == error_value(err)
+
+    def test_json_operators(self):
+        rows = [
+            {'attrs': {'color': 'red', 'tags': ['a', 'b']}},
+            {'attrs': {'tags': ['b']}},
+            {'attrs': None},
+        ]
+
+        contains = compile_predicate(
+            {'field': 'attrs', 'op': 'json_contains', 'value': {'tags': ['a']}}
+        )
+        has_key = compile_predicate(
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 'color'}
+        )
+
+        assert [contains(row) for row in rows] == [True, False, False]
+        assert [has_key(row) for row in rows] == [True, False, False]
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from sqlalchemy_filters import apply_filters, apply_pagination, apply_sort
+from sqlalchemy_filters.explain import (
+    _QUERY_RE, PlanNode, PlanSampler, explain, parse_plan
+)
+from test.models import Foo
+
+
+SQLITE_PLAN_ONLY = "Plan assertions are written for SQLite"
+
+
+class TestParsePlan(object):
+
+    def test_sqlite(self):
+        rows = [
+            (2, 0, 0, 'SCAN foo'),
+            (3, 0, 0, 'SEARCH TABLE bar USING INTEGER PRIMARY KEY (rowid=?)'),
+            (4, 0, 0, 'SEARCH qux USING COVERING INDEX ix_qux (name=?)'),
+            (5, 0, 0, 'USE TEMP B-TREE FOR ORDER BY'),
+            (6, 0, 0, 'SCAN CONSTANT ROW'),
+        ]
+
+        plan = parse_plan('sqlite', rows)
+
+        assert plan.nodes == [
+            PlanNode('SCAN', 'foo', None, True, 'SCAN foo'),
+            PlanNode('SEARCH', 'bar', 'PRIMARY KEY', False, rows[1][3]),
+            PlanNode('SEARCH', 'qux', 'ix_qux', False, rows[2][3]),
+            PlanNode(rows[3][3], None, None, False, rows[3][3]),
+            PlanNode(rows[4][3], None, None, False, rows[4][3]),
+        ]
+        assert plan.full_scans == ['foo']
+        assert plan.indexes == ['PRIMARY KEY', 'ix_qux']
+
+    @pytest.mark.parametrize('as_text', [True, False])
+    def test_postgresql(self, as_text):
+        document = [{
+            'Plan': {
+                'Node Type': 'Nested Loop',
+                'Plans': [
+                    {
+                        'Node Type': 'Seq Scan',
+                        'Relation Name': 'foo',
+                        'Filter': "((name)::text = 'name_1'::text)",
+                    },
+                    {
+                        'Node Type': 'Index Scan',
+                        'Relation Name': 'bar',
+                        'Index Name': 'bar_pkey',
+                        'Index Cond': '(id = foo.bar_id)',
+                    },
+                ],
+            },
+        }]
+        rows = [(json.dumps(document) if as_text else document,)]
+
+        plan = parse_plan('postgresql', rows)
+
+        assert plan.nodes == [
+            PlanNode('Nested Loop', None, None, False, ''),
+            PlanNode(
+                'Seq Scan', 'foo', None, True,
+                "((name)::text = 'name_1'::text)"
+            ),
+            PlanNode(
+                'Index Scan', 'bar', 'bar_pkey', False, '(id = foo.bar_id)'
+            ),
+        ]
+        assert plan.full_scans == ['foo']
+        assert plan.indexes == ['bar_pkey']
+
+    def test_mysql(self):
+        columns = ['id', 'select_type', 'table', 'type', 'key', 'Extra']
+        rows = [
+            (1, 'SIMPLE', 'foo', 'ALL', None, 'Using filesort'),
+            (1, 'SIMPLE', 'bar', 'eq_ref', 'PRIMARY', None),
+        ]
+
+        plan = parse_plan('mysql', rows, columns)
+
+        assert plan.nodes == [
+            PlanNode('ALL', 'foo', None, True, 'Using filesort'),
+            PlanNode('eq_ref', 'bar', 'PRIMARY', False, ''),
+        ]
+
+    def test_unknown_dialect(self):
+        plan = parse_plan('oracle', [('plan',)])
+
+        assert plan.nodes == []
+        assert plan.raw == [('plan',)]
+
+
+class TestExplain(object):
+
+    @pytest.fixture(autouse=True)
+    def sqlite_only(self, is_sqlite):
+        if not is_sqlite:
+            pytest.skip(SQLITE_PLAN_ONLY)
+
+    def test_full_scan(self, session):
+        query = apply_filters(
+            session.query(Foo), [{'field': 'name', 'value': 'name_1'}]
+        )
+
+        plan = explain(query)
+
+        assert plan.dialect == 'sqlite'
+        assert plan.full_scans == ['foo']
+        assert plan.indexes == []
+
+    def test_index_usage(self, session):
+        query = apply_filters(
+            session.query(Foo), [{'field': 'bar_id', 'value': 1}]
+        )
+        query = apply_sort(query, [{'field': 'name', 'direction': 'asc'}])
+        query, _ = apply_pagination(query, page_number=2, page_size=5)
+
+        plan = explain(query)
+
+        assert plan.full_scans == []
+        assert plan.indexes == ['ix_foo_bar_id']
+        assert plan.nodes[-1].operation == 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class TestPlanSampler(object):
+
+    @pytest.fixture(autouse=True)
+    def sqlite_only(self, is_sqlite):
+        if not is_sqlite:
+            pytest.skip(SQLITE_PLAN_ONLY)
+
+    @pytest.fixture
+    def captured(self):
+        return []
+
+    @pytest.fixture
+    def sampler(self, session, captured):
+        sampler = PlanSampler(captured.append, threshold=0)
+        sampler.attach(session.get_bind().engine)
+
+        yield sampler
+
+        if sampler.engine is not None:
+            sampler.detach()
+
+    def test_captures_slow_selects(self, session, sampler, captured):
+        query = apply_filters(
+            session.query(Foo), [{'field': 'bar_id', 'value': 1}]
+        )
+        query.all()
+        sampler.flush()
+
+        assert len(captured) == 1
+        assert captured[0].statement.startswith('SELECT')
+        assert captured[0].parameters == (1,)
+        assert captured[0].duration >= 0
+        assert captured[0].plan.indexes == ['ix_foo_bar_id']
+
+    def test_ignores_other_statements(self, session, sampler, captured):
+        session.add(Foo(id=1, name='name_1'))
+        session.flush()
+        sampler.flush()
+
+        assert captured == []
+
+    @pytest.mark.parametrize('statement', [
+        'WITH ids AS (SELECT 1 AS id) SELECT id FROM ids',
+        '  /* request 1 */\n-- tagged\n  select 1',
+    ])
+    def test_captures_queries_after_comments(
+        self, session, sampler, captured, statement
+    ):
+        session.execute(text(statement)).fetchall()
+        sampler.flush()
+
+        assert [slow_query.statement for slow_query in captured] == [
+            statement
+        ]
+
+    @pytest.mark.parametrize('statement, is_query', [
+        ('(SELECT 1) UNION (SELECT 2)', True),
+        ('DELETE FROM foo', False),
+        ('/* SELECT */ DELETE FROM foo', False),
+        ('SELECTED', False),
+    ])
+    def test_query_pattern(self, statement, is_query):
+        assert bool(_QUERY_RE.match(statement)) is is_query
+
+    def test_ignores_fast_statements(self, session):
+        captured = []
+        sampler = PlanSampler(captured.append, threshold=60)
+        sampler.attach(session.get_bind().engine)
+
+        session.query(Foo).all()
+        sampler.detach()
+
+        assert captured == []
+
+    def test_sample_rate(self, session):
+        captured = []
+        sampler = PlanSampler(captured.append, threshold=0, sample_rate=0)
+        sampler.attach(session.get_bind().engine)
+
+        session.query(Foo).all()
+        sampler.detach()
+
+        assert captured == []
+
+    def test_explain_errors_are_ignored(
+        self, session, sampler, captured, caplog, monkeypatch
+    ):
+        def parse_plan(*args):
+            raise ValueError('Unexpected plan')
+
+        monkeypatch.setattr('sqlalchemy_filters.explain.parse_plan', parse_plan)
+
+        session.query(Foo).all()
+        sampler.detach()
+
+        assert captured == []
+        assert 'Could not explain slow statement.' in caplog.text
+
+    def test_explains_off_the_statement_thread(self, session):
+        threads = []
+        sampler = PlanSampler(
+            lambda slow_query: threads.append(threading.current_thread()),
+            threshold=0,
+        )
+        sampler.attach(session.get_bind().engine)
+
+        session.add(Foo(id=1, name='name_1'))
+        session.flush()
+        assert [foo.id for foo in session.query(Foo)] == [1]
+        sampler.detach()
+        session.commit()
+
+        assert len(threads) == 1
+        assert threads[0] is not threading.current_thread()
+        assert [foo.id for foo in session.query(Foo)] == [1]
+
+    def test_statement_started_before_attach(self, session, sampler, captured):
+        sampler._after_execute(
+            None, None, 'SELECT 1', (), object(), executemany=False
+        )
+        sampler.flush()
+
+        assert captured == []
+
+    def test_callback_errors_are_logged(self, session, caplog):
+
+        def callback(slow_query):
+            raise ValueError('callback')
+
+        sampler = PlanSampler(callback, threshold=0)
+        sampler.attach(session.get_bind().engine)
+
+        session.query(Foo).all()
+        sampler.detach()
+
+        assert 'Could not handle slow statement plan.' in caplog.text
+
+    def test_buffer_size(self, session):
+        captured = []
+        release = threading.Event()
+
+        def callback(slow_query):
+            release.wait()
+            captured.append(slow_query)
+
+        sampler = PlanSampler(callback, threshold=0, buffer_size=1)
+        sampler.attach(session.get_bind().engine)
+
+        # at most one query is explained and one is waiting
+        for _ in range(3):
+            session.query(Foo).all()
+        release.set()
+        sampler.detach()
+
+        assert sampler.dropped >= 1
+        assert len(captured) + sampler.dropped == 3
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.exceptions import BadFacetFormat, BadFilterFormat
+from sqlalchemy_filters.facets import (
+    Facet, FacetCounts, apply_facets, get_facet_columns,
+    get_grouping_sets_query, get_union_query
+)
+from test import error_value
+from test.models import Bar, Foo
+
+
+@pytest.fixture
+def data_inserted(session):
+    session.add_all([
+        Bar(id=1, name='name_1', count=5),
+        Bar(id=2, name='name_2', count=10),
+        Foo(id=1, bar_id=1, name='name_1', count=50),
+        Foo(id=2, bar_id=2, name='name_2', count=50),
+        Foo(id=3, bar_id=1, name='name_1', count=None),
+        Foo(id=4, bar_id=1, name='name_4', count=100),
+    ])
+    session.commit()
+
+
+class TestApplyFacets(object):
+
+    def test_counts(self, session, data_inserted):
+        facets = apply_facets(
+            session.query(Foo),
+            [{'field': 'name'}, {'field': 'count'}],
+        )
+
+        name_facet, count_facet = facets
+        assert name_facet.model == 'Foo'
+        assert name_facet.field == 'name'
+        assert name_facet.counts[0] == ('name_1', 2)
+        assert set(name_facet.counts[1:]) == {('name_2', 1), ('name_4', 1)}
+        assert count_facet.field == 'count'
+        assert count_facet.counts[0] == (50, 2)
+        assert set(count_facet.counts[1:]) == {(None, 1), (100, 1)}
+
+    def test_filtered_query(self, session, data_inserted):
+        query = apply_filters(
+            session.query(Foo), {'field': 'count', 'op': '>=', 'value': 50}
+        )
+
+        facets = apply_facets(query, {'field': 'name'})
+
+        assert sorted(facets[0].counts) == [
+            ('name_1', 1), ('name_2', 1), ('name_4', 1)
+        ]
+
+    def test_related_model_facet(self, session, data_inserted):
+        facets = apply_facets(
+            session.query(Foo), [{'model': 'Bar', 'field': 'name'}]
+        )
+
+        assert facets == [
+            FacetCounts('Bar', 'name', [('name_1', 3), ('name_2', 1)])
+        ]
+
+    def test_exclude_own_filter(self, session, data_inserted):
+        filter_spec = [
+            {'field': 'name', 'op': 'in', 'value': ['name_1']},
+            {'field': 'count', 'op': 'is_not_null'},
+        ]
+
+        name_facet, count_facet, other_name_facet = apply_facets(
+            session.query(Foo),
+            [
+                {'field': 'name', 'exclude_own_filter': True},
+                {'field': 'count', 'exclude_own_filter': True},
+                {'field': 'name'},
+            ],
+            filter_spec,
+        )
+
+        assert sorted(name_facet.counts) == [
+            ('name_1', 1), ('name_2', 1), ('name_4', 1)
+        ]
+        assert set(count_facet.counts) == {(50, 1), (None, 1)}
+        assert other_name_facet.counts == [('name_1', 1)]
+
+    def test_exclude_own_single_filter(self, session, data_inserted):
+        name_facet, count_facet = apply_facets(
+            session.query(Foo),
+            [
+                {'field': 'name', 'exclude_own_filter': True},
+                {'field': 'count'},
+            ],
+            {'field': 'name', 'value': 'name_1'},
+        )
+
+        assert sorted(name_facet.counts) == [
+            ('name_1', 2), ('name_2', 1), ('name_4', 1)
+        ]
+        assert set(count_facet.counts) == {(50, 1), (None, 1)}
+
+    def test_exclude_own_boolean_filter(self, session, data_inserted):
+        filter_spec = {'and': [
+            {'or': [
+                {'field': 'name', 'value': 'name_1'},
+                {'model': 'Foo', 'field': 'name', 'value': 'name_2'},
+            ]},
+            {'or': [
+                {'field': 'name', 'value': 'name_4'},
+                {'field': 'count', 'value': 50},
+            ]},
+        ]}
+
+        facets = apply_facets(
+            session.query(Foo),
+            {'model': 'Foo', 'field': 'name', 'exclude_own_filter': True},
+            filter_spec,
+        )
+
+        # the second `or` is not only on `name`, so it's kept
+        assert sorted(facets[0].counts) == [
+            ('name_1', 1), ('name_2', 1), ('name_4', 1)
+        ]
+
+    def test_same_field_twice(self, session, data_inserted):
+        facets = apply_facets(
+            session.query(Foo),
+            [
+                {'field': 'count'},
+                {'field': 'name'},
+                {'model': 'Foo', 'field': 'name'},
+            ],
+        )
+
+        assert facets[1].counts == facets[2].counts
+        assert sorted(facets[2].counts) == [
+            ('name_1', 2), ('name_2', 1), ('name_4', 1)
+        ]
+
+    def test_grouping_sets(self, session, data_inserted, is_postgresql):
+        if not is_postgresql:
+            pytest.skip('GROUPING SETS are run on PostgreSQL')
+
+        facets = apply_facets(
+            session.query(Foo),
+            [{'field': 'name'}, {'field': 'count'}, {'field': 'name'}],
+        )
+
+        assert facets[0] == facets[2]
+        assert sorted(facets[0].counts) == [
+            ('name_1', 2), ('name_2', 1), ('name_4', 1)
+        ]
+        assert facets[1].counts[0] == (50, 2)
+        assert set(facets[1].counts[1:]) == {(None, 1), (100, 1)}
+
+    def test_grouping_sets_query(self, session):
+        query = get_grouping_sets_query(
+            session.query(Foo), [Foo.name, Foo.count]
+        )
+
+        sql = str(query.statement.compile(dialect=postgresql.dialect()))
+
+        assert 'grouping(foo.name)' in sql
+        assert sql.endswith(
+            'GROUP BY GROUPING SETS((foo.name), (foo.count))'
+        )
+
+    def test_union_query(self, session):
+        query = get_union_query(session.query(Foo), [Foo.name, Foo.count])
+
+        sql = str(query.statement.compile(dialect=mysql.dialect()))
+
+        assert sql.count('UNION ALL') == 1
+        assert 'foo.name AS value_0, NULL AS value_1' in sql
+        assert 'NULL AS value_0, foo.count AS value_1' in sql
+
+    def test_facet_columns(self, session):
+        columns, indexes = get_facet_columns(
+            session.query(Foo),
+            [
+                Facet({'field': 'name'}), Facet({'field': 'count'}),
+                Facet({'model': 'Foo', 'field': 'name'}),
+            ],
+            Foo,
+        )
+
+        assert len(columns) == 2
+        assert indexes == [0, 1, 0]
+
+    @pytest.mark.parametrize('facet_spec, expected_error', [
+        ([{'model': 'Foo'}], '`field` is a mandatory attribute.'),
+        (['name'], 'Facet spec `name` should be a dictionary.'),
+    ])
+    def test_invalid_facet_spec(
+        self, session, facet_spec, expected_error
+    ):
+        with pytest.raises(BadFacetFormat) as err:
+            apply_facets(session.query(Foo), facet_spec)
+
+        assert expected_error == error_value(err)
+
+    def test_invalid_filter_spec(self, session):
+        with pytest.raises(BadFilterFormat):
+            apply_facets(
+                session.query(Foo),
+                [{'field': 'name', 'exclude_own_filter': True}],
+                [{'op': '=='}],
+            )
@@ -12,7 +12,7 @@ from sqlalchemy_filters.exceptions import (
     BadFilterFormat, BadSpec, FieldNotFound
 )
 
-from test.models import Foo, Bar, Qux, Corge
+from test.models import Foo, Bar, Qux, Corge, Grault
 
 
 ARRAY_NOT_SUPPORTED = (
@@ -46,6 +46,16 @@ def multiple_bars_inserted(session):
     session.commit()
 
 
+@pytest.fixture
+def multiple_graults_inserted(session, multiple_foos_inserted):
+    bar_1, bar_2, bar_3 = [session.query(Bar).get(id_) for id_ in (1, 2, 3)]
+    grault_1 = Grault(id=1, name='name_1', bars=[bar_1, bar_2])
+    grault_2 = Grault(id=2, name='name_2', bars=[bar_1, bar_3])
+    foo_5 = Foo(id=5, bar_id=1, name='name_5', count=150)
+    session.add_all([grault_1, grault_2, foo_5])
+    session.commit()
+
+
 @pytest.fixture
 def multiple_quxs_inserted(session):
     qux_1 = Qux(
@@ -302,6 +312,110 @@ class TestAutoJoin:
         assert result[0].bar.count is None
 
 
+@pytest.mark.usefixtures('multiple_graults_inserted')
+class TestExistsFilters:
+
+    def test_one_to_many(self, session):
+        query = session.query(Bar)
+        filters = [{'model': 'Foo', 'field': 'count', 'op': '>=', 'value': 100}]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+        result = filtered_query.order_by(Bar.id).all()
+
+        # bar 1 has two foos, but it's returned only once
+        assert [bar.id for bar in result] == [1, 2, 4]
+        assert 'EXISTS' in str(filtered_query)
+        assert 'JOIN' not in str(filtered_query)
+
+    def test_many_to_one(self, session):
+        query = session.query(Foo)
+        filters = [{'model': 'Bar', 'field': 'count', 'op': 'is_null'}]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+        result = filtered_query.all()
+
+        assert [foo.id for foo in result] == [3]
+
+    def test_many_to_many(self, session):
+        query = session.query(Bar)
+        filters = [{'model': 'Grault', 'field': 'name', 'value': 'name_2'}]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+        result = filtered_query.order_by(Bar.id).all()
+
+        assert [bar.id for bar in result] == [1, 3]
+
+    def test_through_multiple_relationships(self, session):
+        query = session.query(Foo)
+        filters = [{'model': 'Grault', 'field': 'name', 'value': 'name_1'}]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+        result = filtered_query.order_by(Foo.id).all()
+
+        assert [foo.id for foo in result] == [1, 2, 5]
+
+    def test_sibling_predicates_apply_to_the_same_row(self, session):
+        query = session.query(Bar)
+        filters = [
+            {'model': 'Foo', 'field': 'name', 'value': 'name_5'},
+            {'model': 'Foo', 'field': 'count', 'value': 50},
+        ]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+
+        # bar 1 has a foo named `name_5` and a foo with count 50
+        assert filtered_query.all() == []
+        assert str(filtered_query).count('EXISTS') == 1
+
+    def test_or(self, session):
+        query = session.query(Bar)
+        filters = [
+            {'field': 'id', 'op': '<', 'value': 4},
+            {
+                'or': [
+                    {'model': 'Foo', 'field': 'count', 'op': 'is_null'},
+                    {'model': 'Foo', 'field': 'name', 'value': 'name_2'},
+                    {'field': 'name', 'value': 'name_4'},
+                ]
+            }
+        ]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+        result = filtered_query.order_by(Bar.id).all()
+
+        assert [bar.id for bar in result] == [2, 3]
+        assert str(filtered_query).count('EXISTS') == 1
+
+    def test_not(self, session):
+        query = session.query(Bar)
+        filters = [
+            {'not': [{'model': 'Foo', 'field': 'name', 'value': 'name_1'}]}
+        ]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+        result = filtered_query.order_by(Bar.id).all()
+
+        assert [bar.id for bar in result] == [2, 4]
+
+    def test_models_in_the_query_are_not_affected(self, session, db_uri):
+        query = session.query(Bar).join(Foo)
+        filters = [{'model': 'Foo', 'field': 'name', 'value': 'name_1'}]
+
+        filtered_query = apply_filters(query, filters, use_exists=True)
+
+        assert 'EXISTS' not in str(filtered_query)
+        assert [bar.id for bar in filtered_query.all()] == [1, 3]
+
+    def test_unreachable_model(self, session):
+        query = session.query(Bar)
+        filters = [{'model': 'Qux', 'field': 'name', 'value': 'name_1'}]
+
+        with pytest.raises(BadSpec) as err:
+            apply_filters(query, filters, use_exists=True)
+
+        assert 'The query does not contain model `Qux`.' == err.value.args[0]
+
+
 class TestApplyIsNullFilter:
 
     @pytest.mark.usefixtures('multiple_bars_inserted')
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+from sqlalchemy_filters.exceptions import (
+    BadFilterFormat, BadLoadFormat, BadSortFormat
+)
+from sqlalchemy_filters.fingerprint import canonicalize, fingerprint
+from test import error_value
+
+
+class TestCanonicalize(object):
+
+    def test_filters(self):
+        filter_spec = [
+            {'field': 'name', 'op': 'eq', 'value': 'name_1'},
+            {'or': [
+                {'model': 'Bar', 'field': 'id', 'op': 'in', 'value': [3, 1, 3]},
+                {'or': [{'field': 'count', 'op': 'is_null'}]},
+            ]},
+        ]
+
+        filters, sorts, loads = canonicalize(filter_spec)
+
+        assert filters == ['and', [
+            ['==', None, 'name', '"name_1"'],
+            ['or', [
+                ['in', 'Bar', 'id', ['1', '3']],
+                ['is_null', None, 'count'],
+            ]],
+        ]]
+        assert sorts is None
+        assert loads is None
+
+    def test_sorts_and_loads(self):
+        _, sorts, loads = canonicalize(
+            sort_spec={'field': 'name', 'direction': 'asc', 'nullslast': True},
+            load_spec=[
+                {'model': 'Foo', 'fields': ['name', 'id']},
+                {'model': 'Bar', 'fields': ['count']},
+                {'model': 'Foo', 'fields': ['count']},
+            ],
+        )
+
+        assert sorts == [[None, 'name', 'asc', False, True, None, None]]
+        assert loads == [
+            ['Bar', ['count']], ['Foo', ['count', 'id', 'name']]
+        ]
+
+    def test_relationship_loads(self):
+        _, _, loads = canonicalize(load_spec=[
+            {'model': 'Foo', 'fields': ['name']},
+            {'model': 'Foo', 'relationship': 'bar', 'strategy': 'joined',
+             'fields': ['name', 'id']},
+            {'model': 'Foo', 'relationship': 'bar', 'strategy': 'joined',
+             'fields': ['count']},
+            {'model': 'Foo', 'relationship': 'bar', 'strategy': 'subquery'},
+        ])
+
+        assert loads == [
+            ['Foo', 'bar', 'joined', ['count', 'id', 'name']],
+            ['Foo', 'bar', 'subquery', []],
+            ['Foo', ['name']],
+        ]
+
+    def test_ignore_values(self):
+        filters, _, _ = canonicalize(
+            [
+                {'field': 'name', 'value': 'name_1'},
+                {'field': 'id', 'op': 'in', 'value': [1, 2]},
+                {'field': 'count', 'op': 'is_not_null'},
+            ],
+            ignore_values=True,
+        )
+
+        assert filters == ['and', [
+            ['==', None, 'name', '?'],
+            ['in', None, 'id', '?'],
+            ['is_not_null', None, 'count'],
+        ]]
+
+    def test_ignore_rank_values(self):
+        sort_spec = [
+            {'field': 'name', 'direction': 'desc', 'rank': 'red apple'},
+            {'field': 'id', 'direction': 'asc'},
+        ]
+
+        _, sorts, _ = canonicalize(sort_spec=sort_spec, ignore_values=True)
+
+        assert sorts == [
+            [None, 'name', 'desc', False, False, '?', None],
+            [None, 'id', 'asc', False, False, None, None],
+        ]
+
+    def test_empty_filters(self):
+        assert canonicalize([])[0] == ['and', []]
+
+    def test_not(self):
+        filters, _, _ = canonicalize(
+            {'not': [{'field': 'id', 'op': 'eq', 'value': 1}]}
+        )
+
+        assert filters == ['not', ['==', None, 'id', '1']]
+
+    @pytest.mark.parametrize('filter_spec, expected_error', [
+        ('not a dict', 'Filter spec `not a dict` should be a dictionary.'),
+        ({'op': '=='}, '`field` is a mandatory filter attribute.'),
+        ({'field': 'id', 'op': 'op_not_valid'}, 'Operator `op_not_valid` not valid.'),
+        ({'field': 'id', 'op': '>'}, '`value` must be provided.'),
+        (
+            {'not': [{'field': 'id', 'value': 1}, {'field': 'id', 'value': 2}]},
+            '`not` must have one argument',
+        ),
+        (
+            {'field': 'id', 'op': 'in', 'value': 1},
+            'Value of operator `in` must be an iterable.',
+        ),
+    ])
+    def test_invalid_filters(self, filter_spec, expected_error):
+        with pytest.raises(BadFilterFormat) as err:
+            canonicalize(filter_spec)
+
+        assert expected_error == error_value(err)
+
+    @pytest.mark.parametrize('sort_spec, expected_error', [
+        (['name'], 'Sort spec `name` should be a dictionary.'),
+        (
+            {'field': 'name'},
+            '`field` and `direction` are mandatory attributes.',
+        ),
+        ({'field': 'name', 'direction': 'up'}, 'Direction `up` not valid.'),
+    ])
+    def test_invalid_sorts(self, sort_spec, expected_error):
+        with pytest.raises(BadSortFormat) as err:
+            canonicalize(sort_spec=sort_spec)
+
+        assert expected_error == error_value(err)
+
+    @pytest.mark.parametrize('load_spec, expected_error', [
+        (
+            {'relationship': 'bar'},
+            '`relationship` and `strategy` are mandatory attributes.',
+        ),
+        (
+            {'relationship': 'bar', 'strategy': 'lazy'},
+            'Strategy `lazy` not valid.',
+        ),
+        ({'model': 'Foo'}, '`fields` is a mandatory attribute.'),
+        ([1], 'Load spec `1` should be a dictionary.'),
+    ])
+    def test_invalid_loads(self, load_spec, expected_error):
+        with pytest.raises(BadLoadFormat) as err:
+            canonicalize(load_spec=load_spec)
+
+        assert expected_error == error_value(err)
+
+
+class TestFingerprint(object):
+
+    @pytest.mark.parametrize('filter_spec, other_filter_spec', [
+        (
+            {'field': 'name', 'value': 'name_1'},
+            {'field': 'name', 'op': 'eq', 'value': 'name_1'},
+        ),
+        (
+            {'field': 'name', 'op': '==', 'value': 'name_1'},
+            [{'field': 'name', 'op': 'eq', 'value': 'name_1'}],
+        ),
+        (
+            {'and': [
+                {'field': 'id', 'op': 'gt', 'value': 1},
+                {'field': 'name', 'value': 'name_1'},
+            ]},
+            [
+                {'field': 'name', 'value': 'name_1'},
+                {'field': 'id', 'op': '>', 'value': 1},
+            ],
+        ),
+        (
+            {'or': [
+                {'field': 'id', 'value': 1},
+                {'or': [
+                    {'field': 'id', 'value': 2},
+                    {'field': 'id', 'value': 3},
+                ]},
+            ]},
+            {'or': [
+                {'field': 'id', 'value': 3},
+                {'field': 'id', 'value': 1},
+                {'field': 'id', 'value': 2},
+                {'field': 'id', 'value': 1},
+            ]},
+        ),
+        (
+            {'field': 'id', 'op': 'in', 'value': [3, 2, 1]},
+            {'field': 'id', 'op': 'in', 'value': (1, 2, 3, 3)},
+        ),
+    ])
+    def test_identical_specs(self, filter_spec, other_filter_spec):
+        assert fingerprint(filter_spec) == fingerprint(other_filter_spec)
+
+    @pytest.mark.parametrize('filter_spec, other_filter_spec', [
+        (
+            {'field': 'id', 'value': 1},
+            {'field': 'id', 'value': '1'},
+        ),
+        (
+            {'field': 'id', 'value': 1},
+            {'model': 'Foo', 'field': 'id', 'value': 1},
+        ),
+        (
+            {'field': 'created_at', 'value': datetime.date(2016, 7, 12)},
+            {'field': 'created_at', 'value': '2016-07-12'},
+        ),
+        (
+            {'or': [
+                {'field': 'id', 'value': 1},
+                {'field': 'name', 'value': 'name_1'},
+            ]},
+            {'and': [
+                {'field': 'id', 'value': 1},
+                {'field': 'name', 'value': 'name_1'},
+            ]},
+        ),
+        (
+            {'field': 'id', 'op': 'in', 'value': [1]},
+            {'field': 'id', 'op': 'not_in', 'value': [1]},
+        ),
+    ])
+    def test_different_specs(self, filter_spec, other_filter_spec):
+        assert fingerprint(filter_spec) != fingerprint(other_filter_spec)
+
+    def test_sort_order_matters(self):
+        name = {'field': 'name', 'direction': 'asc'}
+        id_ = {'field': 'id', 'direction': 'asc'}
+
+        assert (
+            fingerprint(sort_spec=[name, id_]) !=
+            fingerprint(sort_spec=[id_, name])
+        )
+
+    def test_filters_sorts_and_loads_are_kept_apart(self):
+        assert fingerprint(filter_spec=[]) != fingerprint(sort_spec=[])
+
+    def test_ignore_values(self):
+        assert (
+            fingerprint({'field': 'id', 'value': 1}, ignore_values=True) ==
+            fingerprint({'field': 'id', 'value': 2}, ignore_values=True)
+        )
+        assert (
+            fingerprint({'field': 'id', 'value': 1}, ignore_values=True) !=
+            fingerprint({'field': 'name', 'value': 1}, ignore_values=True)
+        )
+
+    def test_format(self):
+        assert fingerprint(
+            [{'field': 'id', 'op': 'eq', 'value': 1}]
+        ) == 'eaa2d28a90904736fd1882b337ee4356'
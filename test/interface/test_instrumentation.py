@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from sqlalchemy_filters import (
+    apply_filters, apply_loads, apply_pagination, apply_sort
+)
+from sqlalchemy_filters import instrumentation
+from sqlalchemy_filters.cache import ResultCache
+from sqlalchemy_filters.exceptions import BadFilterFormat, BadSpec
+from sqlalchemy_filters.instrumentation import (
+    add_sink, count, instrumented, remove_sink, stage
+)
+from test.models import Bar, Foo
+
+
+@pytest.fixture
+def measurements():
+    measurements = []
+    add_sink(measurements.append)
+    yield measurements
+    remove_sink(measurements.append)
+
+
+@pytest.fixture
+def multiple_foos_inserted(session):
+    session.add_all([
+        Bar(id=1, name='name_1', count=5),
+        Bar(id=2, name='name_2', count=10),
+    ])
+    session.add_all([
+        Foo(id=1, name='name_1', count=5, bar_id=1),
+        Foo(id=2, name='name_2', count=10, bar_id=2),
+    ])
+    session.commit()
+
+
+class TestInstrumentation(object):
+
+    def test_disabled(self):
+        assert instrumentation._sinks == []
+        assert instrumentation._current.get() is None
+
+        @instrumented('function')
+        def function():
+            count('calls')
+            with stage('stage'):
+                return instrumentation._current.get()
+
+        assert function() is None
+
+    def test_apply_filters(self, session, measurements):
+        query = session.query(Foo)
+        filter_spec = {'or': [
+            {'model': 'Bar', 'field': 'name', 'op': '==', 'value': 'name_1'},
+            {'field': 'count', 'op': '>', 'value': 5},
+        ]}
+
+        apply_filters(query, filter_spec)
+
+        measurement, = measurements
+        assert measurement.name == 'apply_filters'
+        assert measurement.counters == {
+            'filters': 2, 'joins_attempted': 1, 'joins': 1,
+        }
+        assert set(measurement.stages) == {'parse', 'resolve', 'join', 'build'}
+        assert all(
+            0 <= duration <= measurement.duration
+            for duration in measurement.stages.values()
+        )
+
+    def test_failed_join(self, session, measurements):
+        query = session.query(Foo)
+        sort_spec = [{'model': 'Qux', 'field': 'name', 'direction': 'asc'}]
+
+        with pytest.raises(BadSpec):
+            apply_sort(query, sort_spec)
+
+        assert measurements[0].name == 'apply_sort'
+        assert measurements[0].counters == {
+            'sorts': 1, 'joins_attempted': 1,
+        }
+
+    def test_apply_loads(self, session, measurements):
+        apply_loads(session.query(Foo), ['name'])
+
+        assert measurements[0].name == 'apply_loads'
+        assert measurements[0].counters == {'loads': 1}
+        assert set(measurements[0].stages) == {
+            'parse', 'resolve', 'join', 'build'
+        }
+
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    def test_apply_pagination(self, session, measurements):
+        apply_pagination(session.query(Foo), page_number=1, page_size=1)
+
+        assert measurements[0].name == 'apply_pagination'
+        assert set(measurements[0].stages) == {'execute'}
+
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    def test_cache(self, session, measurements):
+        cache = ResultCache()
+        query = session.query(Foo)
+
+        cache.all(query)
+        cache.all(query)
+
+        assert [measurement.name for measurement in measurements] == [
+            'ResultCache.all', 'ResultCache.all'
+        ]
+        assert measurements[0].counters == {'cache_misses': 1}
+        assert set(measurements[0].stages) == {'compile', 'execute'}
+        assert measurements[1].counters == {'cache_hits': 1}
+        assert set(measurements[1].stages) == {'compile'}
+
+    def test_error(self, session, measurements):
+        with pytest.raises(BadFilterFormat):
+            apply_filters(session.query(Foo), {'field': 'name', 'op': 'xx'})
+
+        assert measurements[0].name == 'apply_filters'
+        assert instrumentation._current.get() is None
+
+    def test_nested_calls(self, measurements):
+
+        @instrumented('inner')
+        def inner():
+            count('inner')
+
+        @instrumented('outer')
+        def outer():
+            count('outer')
+            inner()
+            count('outer')
+
+        outer()
+
+        assert [
+            (measurement.name, measurement.counters)
+            for measurement in measurements
+        ] == [('inner', {'inner': 1}), ('outer', {'outer': 2})]
+
+    def test_failing_sink(self, session, measurements):
+
+        def sink(measurement):
+            raise ValueError('sink')
+
+        add_sink(sink)
+        try:
+            apply_loads(session.query(Foo), ['name'])
+        finally:
+            remove_sink(sink)
+
+        assert len(measurements) == 1
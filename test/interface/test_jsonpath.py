@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.engine import default
+from sqlalchemy.exc import CompileError
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import visitors
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.exceptions import BadFilterFormat, FieldNotFound
+from sqlalchemy_filters.jsonpath import json_contains
+from test import error_value
+from sqlalchemy_filters.models import sqlalchemy_version_lt
+from test.models import Foo, Garply
+
+
+pytestmark = pytest.mark.skipif(
+    sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+)
+
+
+@pytest.fixture
+def garplys_inserted(session):
+    session.add_all([
+        Garply(id=1, name='name_1', attrs={
+            'color': 'red', 'size': 10, 'active': True,
+            'tags': ['a', 'b'], 'dimensions': {'width': 5, 'height': 7},
+        }),
+        Garply(id=2, name='name_2', attrs={
+            'color': 'blue', 'size': 20, 'active': False,
+            'tags': ['b'], 'dimensions': {'width': 6, 'height': 7},
+        }),
+        Garply(id=3, name='name_3', attrs={'color': 'red'}),
+        Garply(id=4, name='name_4', attrs={}),
+    ])
+    session.commit()
+
+
+def filtered_ids(session, filter_spec):
+    query = apply_filters(session.query(Garply), filter_spec)
+    return sorted(garply.id for garply in query)
+
+
+def compile_filter(filter_spec, dialect):
+    query = apply_filters(Query(Garply), filter_spec)
+    return str(query.statement.compile(
+        dialect=dialect, compile_kwargs={'literal_binds': True}
+    ))
+
+
+class TestJSONPathFilters(object):
+
+    @pytest.fixture(autouse=True)
+    def sqlite_only(self, is_sqlite):
+        if not is_sqlite:
+            pytest.skip('The filters are run on SQLite')
+
+    @pytest.mark.parametrize('filter_spec, expected_ids', [
+        ({'field': 'attrs.color', 'op': '==', 'value': 'red'}, [1, 3]),
+        ({'field': 'attrs.color', 'op': '!=', 'value': 'red'}, [2]),
+        ({'field': 'attrs.size', 'op': '>', 'value': 10}, [2]),
+        ({'field': 'attrs.size', 'op': 'le', 'value': 20}, [1, 2]),
+        ({'field': 'attrs.active', 'op': '==', 'value': True}, [1]),
+        ({'field': 'attrs.dimensions.width', 'value': 6}, [2]),
+        ({'field': 'attrs.tags.0', 'value': 'b'}, [2]),
+        ({'field': 'attrs.color', 'op': 'in', 'value': ['blue', 'green']}, [2]),
+        ({'field': 'attrs.size', 'op': 'is_null'}, [3, 4]),
+        ({'field': 'attrs.color', 'op': 'like', 'value': 'bl%'}, [2]),
+        ({'field': 'attrs.color', 'op': 'is_not_null'}, [1, 2, 3]),
+    ])
+    def test_path_filters(
+        self, session, garplys_inserted, filter_spec, expected_ids
+    ):
+        assert filtered_ids(session, filter_spec) == expected_ids
+
+    @pytest.mark.parametrize('filter_spec, expected_ids', [
+        ({'field': 'attrs', 'op': 'json_contains', 'value': {}}, [1, 2, 3, 4]),
+        (
+            {'field': 'attrs', 'op': 'json_contains', 'value': {'color': 'red'}},
+            [1, 3],
+        ),
+        (
+            {
+                'field': 'attrs', 'op': 'json_contains',
+                'value': {'color': 'red', 'dimensions': {'height': 7}},
+            },
+            [1],
+        ),
+        (
+            {'field': 'attrs', 'op': 'json_contains', 'value': {'tags': ['b']}},
+            [1, 2],
+        ),
+        (
+            {'field': 'attrs.tags', 'op': 'json_contains', 'value': ['a', 'b']},
+            [1],
+        ),
+        ({'field': 'attrs', 'op': 'json_has_key', 'value': 'size'}, [1, 2]),
+        (
+            {'field': 'attrs.dimensions', 'op': 'json_has_key', 'value': 'width'},
+            [1, 2],
+        ),
+    ])
+    def test_json_operators(
+        self, session, garplys_inserted, filter_spec, expected_ids
+    ):
+        assert filtered_ids(session, filter_spec) == expected_ids
+
+    def test_nested_arrays_are_not_supported(self, session):
+        filter_spec = {
+            'field': 'attrs', 'op': 'json_contains', 'value': {'x': [[1]]}
+        }
+
+        with pytest.raises(Exception) as err:
+            filtered_ids(session, filter_spec)
+
+        assert 'not supported by the sqlite dialect' in str(err.value)
+
+
+class TestJSONPathErrors(object):
+
+    @pytest.mark.parametrize('field', [
+        'attrs.', 'attrs.col-or', 'name.color', 'missing.color'
+    ])
+    def test_invalid_path(self, session, field):
+        with pytest.raises(FieldNotFound):
+            apply_filters(session.query(Garply), {'field': field, 'value': 1})
+
+    def test_json_operator_on_other_field(self, session):
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(
+                session.query(Foo),
+                {'field': 'name', 'op': 'json_has_key', 'value': 'color'},
+            )
+
+        expected_error = 'JSON operators can only be applied to JSON fields.'
+        assert expected_error == error_value(err)
+
+    def test_invalid_key(self, session):
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(
+                session.query(Garply),
+                {'field': 'attrs', 'op': 'json_has_key', 'value': "a'b"},
+            )
+
+        assert "JSON key `a'b` not valid." == error_value(err)
+
+
+class TestJSONPathCompilation(object):
+
+    @pytest.mark.parametrize('filter_spec, expected_sql', [
+        (
+            {'field': 'attrs.color', 'value': 'red'},
+            "(garply.attrs ->> 'color') = 'red'",
+        ),
+        (
+            {'field': 'attrs.dimensions.width', 'op': '>', 'value': 5},
+            "CAST((garply.attrs #>> '{dimensions,width}') AS NUMERIC) > 5",
+        ),
+        (
+            {'field': 'attrs.active', 'value': True},
+            "CAST((garply.attrs ->> 'active') AS BOOLEAN) = true",
+        ),
+        (
+            {'field': 'attrs', 'op': 'json_contains', 'value': {'a': 1}},
+            "CAST(garply.attrs AS JSONB) @> CAST('{\"a\": 1}' AS JSONB)",
+        ),
+        (
+            {'field': 'attrs.tags', 'op': 'json_has_key', 'value': 'a'},
+            "CAST((garply.attrs -> 'tags') AS JSONB) ? 'a'",
+        ),
+    ])
+    def test_postgresql(self, filter_spec, expected_sql):
+        sql = compile_filter(filter_spec, postgresql.dialect())
+
+        assert sql.endswith('WHERE ' + expected_sql)
+
+    @pytest.mark.parametrize('filter_spec, expected_sql', [
+        (
+            {'field': 'attrs.color', 'value': 'red'},
+            "JSON_UNQUOTE(JSON_EXTRACT(garply.attrs, '$.color')) = 'red'",
+        ),
+        (
+            {'field': 'attrs.tags.0', 'op': '>', 'value': 5},
+            "JSON_EXTRACT(garply.attrs, '$.tags[0]') > 5",
+        ),
+        (
+            {'field': 'attrs.tags', 'op': 'json_contains', 'value': ['a']},
+            "JSON_CONTAINS(garply.attrs, '[\"a\"]', '$.tags')",
+        ),
+        (
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 'a'},
+            "JSON_CONTAINS_PATH(garply.attrs, 'one', '$.a')",
+        ),
+    ])
+    def test_mysql(self, filter_spec, expected_sql):
+        sql = compile_filter(filter_spec, mysql.dialect())
+
+        assert sql.endswith('WHERE ' + expected_sql)
+
+    def test_postgresql_jsonb(self):
+        table = Table(
+            'documents', MetaData(), Column('document', postgresql.JSONB)
+        )
+
+        sql = str(json_contains(table.c.document, {'a': 1}).compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={'literal_binds': True},
+        ))
+
+        assert sql == (
+            "documents.document @> CAST('{\"a\": 1}' AS JSONB)"
+        )
+
+    def test_invalid_sqlite_keys(self):
+        filter_spec = {
+            'field': 'attrs', 'op': 'json_contains', 'value': {'a-b': 1}
+        }
+
+        with pytest.raises(CompileError) as err:
+            compile_filter(filter_spec, sqlite.dialect())
+
+        assert 'JSON keys `a-b` not valid.' == error_value(err)
+
+    def test_unsupported_dialect(self):
+        with pytest.raises(CompileError) as err:
+            compile_filter(
+                {'field': 'attrs.color', 'value': 'red'},
+                default.DefaultDialect(),
+            )
+
+        assert 'JSON paths are not supported by the default dialect.' == (
+            error_value(err)
+        )
+
+    def test_columns_are_traversed(self):
+        query = apply_filters(Query(Garply), [
+            {'field': 'attrs.color', 'value': 'red'},
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 'size'},
+        ])
+
+        columns = [
+            element for element in visitors.iterate(query.whereclause, {})
+            if element.compare(Garply.__table__.c.attrs)
+        ]
+
+        assert len(columns) == 2
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from sqlalchemy_filters import apply_filters, apply_loads, apply_sort
+from sqlalchemy_filters.exceptions import (
+    BadFilterFormat, BadLoadFormat, BadSortFormat, SpecTooComplex
+)
+from sqlalchemy_filters.limits import Limits, check_sort_spec
+from test.models import Foo, Garply
+from test import error_value
+
+
+def nested_filter_spec(depth):
+    filter_spec = {'field': 'id', 'op': '==', 'value': 1}
+    for _ in range(depth):
+        filter_spec = {'or': [filter_spec]}
+    return filter_spec
+
+
+class TestFilterLimits(object):
+
+    @pytest.mark.parametrize('depth', [0, 3])
+    def test_depth_within_limit(self, session, depth):
+        query = apply_filters(
+            session.query(Foo), nested_filter_spec(depth),
+            limits=Limits(max_depth=3),
+        )
+
+        assert query.all() == []
+
+    def test_depth(self, session):
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(
+                session.query(Foo), nested_filter_spec(4),
+                limits=Limits(max_depth=3),
+            )
+
+        assert error_value(err) == (
+            'Filter spec is nested more than 3 levels deep.'
+        )
+
+    def test_depth_without_recursion(self, session):
+        with pytest.raises(SpecTooComplex):
+            apply_filters(
+                session.query(Foo), nested_filter_spec(10000),
+                limits=Limits(max_depth=10),
+            )
+
+    def test_depth_of_nested_lists(self, session):
+        filter_spec = [[[[{'field': 'id', 'op': '==', 'value': 1}]]]]
+
+        apply_filters(
+            session.query(Foo), filter_spec, limits=Limits(max_depth=3)
+        )
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(
+                session.query(Foo), filter_spec, limits=Limits(max_depth=2)
+            )
+
+        assert error_value(err) == (
+            'Filter spec is nested more than 2 levels deep.'
+        )
+
+    def test_depth_of_lists_in_functions(self, session):
+        filter_spec = {'or': [[{'field': 'id', 'op': '==', 'value': 1}]]}
+
+        with pytest.raises(SpecTooComplex):
+            apply_filters(
+                session.query(Foo), filter_spec, limits=Limits(max_depth=1)
+            )
+
+    def test_predicates(self, session):
+        filter_spec = [
+            {'field': 'id', 'op': '==', 'value': 1},
+            {'or': [
+                {'field': 'name', 'op': '==', 'value': 'name_1'},
+                {'not': [{'field': 'count', 'op': 'is_null'}]},
+            ]},
+        ]
+
+        apply_filters(
+            session.query(Foo), filter_spec, limits=Limits(max_predicates=3)
+        )
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(
+                session.query(Foo), filter_spec,
+                limits=Limits(max_predicates=2),
+            )
+
+        assert error_value(err) == 'Filter spec has more than 2 filters.'
+
+    def test_models(self, session):
+        filter_spec = [
+            {'model': 'Foo', 'field': 'id', 'op': '==', 'value': 1},
+            {'or': [
+                {'model': 'Bar', 'field': 'id', 'op': '==', 'value': 1},
+                {'model': 'Bar', 'field': 'name', 'op': '==', 'value': 'x'},
+            ]},
+        ]
+
+        apply_filters(
+            session.query(Foo), filter_spec, limits=Limits(max_models=2)
+        )
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(
+                session.query(Foo), filter_spec, limits=Limits(max_models=1)
+            )
+
+        assert error_value(err) == 'Filter spec names more than 1 models.'
+
+    def test_list_size(self, session):
+        filter_spec = {'field': 'id', 'op': 'in', 'value': list(range(10))}
+
+        apply_filters(
+            session.query(Foo), filter_spec, limits=Limits(max_list_size=10)
+        )
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(
+                session.query(Foo), filter_spec,
+                limits=Limits(max_list_size=9),
+            )
+
+        assert error_value(err) == (
+            'Value of filter `id` has more than 9 items.'
+        )
+
+    def test_string_size(self, session):
+        filter_spec = {'field': 'name', 'op': 'like', 'value': '%' * 10}
+
+        apply_filters(
+            session.query(Foo), filter_spec, limits=Limits(max_list_size=10)
+        )
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(
+                session.query(Foo), filter_spec,
+                limits=Limits(max_list_size=9),
+            )
+
+        assert error_value(err) == (
+            'Value of filter `name` has more than 9 characters.'
+        )
+
+    def test_dictionary_size(self, session):
+        filter_spec = {
+            'field': 'attrs', 'op': 'json_contains',
+            'value': {'a': {'b': [1, 2]}, 'c': 3},
+        }
+        limits = Limits(max_list_size=4)
+
+        with pytest.raises(SpecTooComplex) as err:
+            apply_filters(session.query(Garply), filter_spec, limits=limits)
+
+        assert error_value(err) == (
+            'Value of filter `attrs` has more than 4 items.'
+        )
+
+    @pytest.mark.parametrize('filter_spec', [{'or': 1}, ['not a dict']])
+    def test_malformed_spec(self, session, filter_spec):
+        with pytest.raises(BadFilterFormat):
+            apply_filters(
+                session.query(Foo), filter_spec, limits=Limits(max_depth=1)
+            )
+
+
+class TestSortLimits(object):
+
+    def test_sort_keys(self, session):
+        sort_spec = [
+            {'field': 'name', 'direction': 'asc'},
+            {'field': 'id', 'direction': 'asc'},
+        ]
+
+        apply_sort(session.query(Foo), sort_spec, limits=Limits(max_sort_keys=2))
+        with pytest.raises(SpecTooComplex) as err:
+            apply_sort(
+                session.query(Foo), sort_spec, limits=Limits(max_sort_keys=1)
+            )
+
+        assert error_value(err) == 'Sort spec has more than 1 items.'
+
+    def test_single_dictionary(self):
+        with pytest.raises(SpecTooComplex) as err:
+            check_sort_spec(
+                {'field': 'name', 'direction': 'asc'},
+                Limits(max_sort_keys=0),
+            )
+
+        assert error_value(err) == 'Sort spec has more than 0 items.'
+
+    def test_malformed_spec(self, session):
+        with pytest.raises(BadSortFormat):
+            apply_sort(
+                session.query(Foo), 'name', limits=Limits(max_sort_keys=1)
+            )
+
+    def test_models(self, session):
+        sort_spec = [
+            {'model': 'Foo', 'field': 'name', 'direction': 'asc'},
+            {'model': 'Bar', 'field': 'name', 'direction': 'asc'},
+        ]
+
+        with pytest.raises(SpecTooComplex) as err:
+            apply_sort(
+                session.query(Foo), sort_spec, limits=Limits(max_models=1)
+            )
+
+        assert error_value(err) == 'Sort spec names more than 1 models.'
+
+
+class TestLoadLimits(object):
+
+    @pytest.mark.parametrize('load_spec', [
+        ['id', 'name', 'bar.name'],
+        [
+            {'model': 'Foo', 'fields': ['id', 'name']},
+            {'relationship': 'bar', 'strategy': 'joined', 'fields': ['name']},
+        ],
+    ])
+    def test_load_fields(self, session, load_spec):
+        apply_loads(
+            session.query(Foo), load_spec, limits=Limits(max_load_fields=3)
+        )
+        with pytest.raises(SpecTooComplex) as err:
+            apply_loads(
+                session.query(Foo), load_spec,
+                limits=Limits(max_load_fields=2),
+            )
+
+        assert error_value(err) == 'Load spec has more than 2 fields.'
+
+    def test_models(self, session):
+        load_spec = [
+            {'model': 'Foo', 'fields': ['id']},
+            {'model': 'Bar', 'fields': ['id']},
+        ]
+
+        with pytest.raises(SpecTooComplex) as err:
+            apply_loads(
+                session.query(Foo), load_spec, limits=Limits(max_models=1)
+            )
+
+        assert error_value(err) == 'Load spec names more than 1 models.'
+
+    def test_malformed_spec(self, session):
+        with pytest.raises(BadLoadFormat):
+            apply_loads(
+                session.query(Foo), 'name', limits=Limits(max_load_fields=1)
+            )
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 import pytest
-from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import Load, joinedload
 
 from sqlalchemy_filters import apply_loads
 from sqlalchemy_filters.exceptions import BadLoadFormat, BadSpec, FieldNotFound
-from test.models import Foo, Bar
+from sqlalchemy_filters.loads import (
+    DeferredColumn, LoadOnly, get_deferred_columns, get_heavy_columns
+)
+from sqlalchemy_filters.models import sqlalchemy_version_lt
+from test.models import Foo, Bar, Corge, Garply, Grault, Waldo
 from test import error_value
 
 
@@ -220,6 +226,355 @@ class TestLoadsApplied(object):
         assert str(restricted_query) == expected
 
 
+class TestRelationshipLoads(object):
+
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    @pytest.mark.parametrize('strategy', [
+        pytest.param('selectin', marks=pytest.mark.skipif(
+            sqlalchemy_version_lt('1.2'),
+            reason='selectin added in SQLAlchemy 1.2'
+        )),
+        'joined',
+        'subquery',
+    ])
+    def test_relationship_is_loaded(self, session, strategy):
+        query = session.query(Foo).order_by(Foo.id)
+        load_spec = [
+            {'model': 'Foo', 'fields': ['name', 'bar_id']},
+            {
+                'model': 'Foo', 'relationship': 'bar', 'strategy': strategy,
+                'fields': ['name'],
+            },
+        ]
+
+        foos = apply_loads(query, load_spec).all()
+
+        assert [foo.id for foo in foos] == [1, 2, 3, 4]
+        for foo in foos:
+            assert 'bar' in inspect(foo).dict
+            assert inspect(foo.bar).unloaded == {'count', 'foos', 'graults'}
+        assert [foo.bar.name for foo in foos] == [
+            'name_1', 'name_2', 'name_1', 'name_4'
+        ]
+
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    def test_collection_without_fields(self, session):
+        query = session.query(Bar).order_by(Bar.id)
+        load_spec = {'relationship': 'foos', 'strategy': 'subquery'}
+
+        bars = apply_loads(query, load_spec).all()
+
+        assert all('foos' in inspect(bar).dict for bar in bars)
+        assert [[foo.count for foo in bar.foos] for bar in bars] == [
+            [5], [10], [None], [15]
+        ]
+
+    def test_joined_statement(self, session):
+        query = session.query(Foo)
+        load_spec = [
+            {'relationship': 'bar', 'strategy': 'joined', 'fields': ['name']},
+        ]
+
+        restricted_query = apply_loads(query, load_spec)
+
+        assert str(restricted_query) == (
+            "SELECT foo.id AS foo_id, foo.name AS foo_name, "
+            "foo.count AS foo_count, foo.bar_id AS foo_bar_id, "
+            "bar_1.id AS bar_1_id, bar_1.name AS bar_1_name \n"
+            "FROM foo LEFT OUTER JOIN bar AS bar_1 ON bar_1.id = foo.bar_id"
+        )
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='raiseload added in SQLAlchemy 1.1'
+    )
+    @pytest.mark.usefixtures('multiple_foos_inserted')
+    def test_raise(self, session):
+        query = session.query(Foo)
+        load_spec = [{'relationship': 'bar', 'strategy': 'raise'}]
+
+        foo = apply_loads(query, load_spec).first()
+
+        with pytest.raises(InvalidRequestError):
+            foo.bar
+
+    def test_load_only_option(self, session):
+        query = session.query(Foo)
+        load = LoadOnly({'fields': ['name']})
+
+        option = load.format_for_sqlalchemy(query, Foo)
+
+        assert isinstance(option, Load)
+        assert str(query.options(option)) == (
+            "SELECT foo.id AS foo_id, foo.name AS foo_name \nFROM foo"
+        )
+
+    def test_load_only_options_per_path(self, session):
+        query = session.query(Foo)
+        load = LoadOnly({'fields': ['name', 'bar.name']})
+
+        assert len(load.get_options(query, Foo)) == 2
+        with pytest.raises(BadLoadFormat) as err:
+            load.format_for_sqlalchemy(query, Foo)
+
+        assert error_value(err) == (
+            "Load spec `{'fields': ['name', 'bar.name']}` needs an option "
+            "per relationship path: use `get_options`."
+        )
+
+    def test_relationship_not_found(self, session):
+        query = session.query(Foo)
+        load_spec = [{'relationship': 'baz', 'strategy': 'joined'}]
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_loads(query, load_spec)
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Foo'> has no relationship `baz`."
+        )
+
+    def test_field_of_related_model_not_found(self, session):
+        query = session.query(Foo)
+        load_spec = [{
+            'relationship': 'bar', 'strategy': 'joined',
+            'fields': ['invalid_field'],
+        }]
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_loads(query, load_spec)
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Bar'> has no column `invalid_field`."
+        )
+
+    @pytest.mark.parametrize('load_spec, expected_error', [
+        (
+            {'relationship': 'bar'},
+            '`relationship` and `strategy` are mandatory attributes.',
+        ),
+        (
+            {'relationship': 'bar', 'strategy': 'lazy'},
+            'Strategy `lazy` not valid.',
+        ),
+        (
+            {'relationship': 'bar', 'strategy': 'raise', 'fields': ['name']},
+            'Fields cannot be loaded with the `raise` strategy.',
+        ),
+    ])
+    def test_invalid_spec(self, session, load_spec, expected_error):
+        with pytest.raises(BadLoadFormat) as err:
+            apply_loads(session.query(Foo), [load_spec])
+
+        assert error_value(err) == expected_error
+
+    @pytest.mark.parametrize('strategy, version', [
+        ('selectin', '1.2'), ('raise', '1.1'),
+    ])
+    def test_strategy_not_supported(
+        self, session, monkeypatch, strategy, version
+    ):
+        monkeypatch.setattr(
+            'sqlalchemy_filters.loads.sqlalchemy_version_lt',
+            lambda min_version: True
+        )
+        load_spec = [{'relationship': 'bar', 'strategy': strategy}]
+
+        with pytest.raises(BadLoadFormat) as err:
+            apply_loads(session.query(Foo), load_spec)
+
+        assert error_value(err) == (
+            'Strategy `{}` requires SQLAlchemy {} or later.'.format(
+                strategy, version
+            )
+        )
+
+
+class TestDottedLoads(object):
+
+    @pytest.fixture
+    def graults_inserted(self, multiple_foos_inserted, session):
+        bar_1 = session.query(Bar).get(1)
+        bar_1.graults = [
+            Grault(id=1, name='name_1', count=1),
+            Grault(id=2, name='name_2', count=2),
+        ]
+        session.commit()
+        session.expunge_all()
+
+    @pytest.mark.usefixtures('graults_inserted')
+    def test_lazy_loaded_relationships(self, session):
+        query = session.query(Foo).filter(Foo.id == 1)
+        load_spec = ['name', 'bar.name', 'bar.graults.name']
+
+        foo = apply_loads(query, load_spec).one()
+
+        assert inspect(foo).unloaded == {'count', 'bar_id', 'bar'}
+        assert foo.bar.name == 'name_1'
+        assert inspect(foo.bar).unloaded == {'count', 'foos', 'graults'}
+        assert sorted(grault.name for grault in foo.bar.graults) == [
+            'name_1', 'name_2'
+        ]
+        assert all(
+            inspect(grault).unloaded == {'count', 'bars'}
+            for grault in foo.bar.graults
+        )
+
+    @pytest.mark.usefixtures('graults_inserted')
+    def test_eager_loaded_relationships(self, session):
+        query = session.query(Foo).filter(Foo.id == 1)
+        load_spec = [
+            {'fields': ['name', 'bar_id']},
+            {
+                'relationship': 'bar', 'strategy': 'joined',
+                'fields': ['count', 'graults.name'],
+            },
+        ]
+
+        foo = apply_loads(query, load_spec).one()
+
+        assert 'bar' in inspect(foo).dict
+        assert inspect(foo.bar).unloaded == {'name', 'foos', 'graults'}
+        assert all(
+            inspect(grault).unloaded == {'count', 'bars'}
+            for grault in foo.bar.graults
+        )
+
+    def test_statement(self, session):
+        query = session.query(Foo)
+        load_spec = [
+            {'fields': ['name', 'bar.name']},
+            {'relationship': 'bar', 'strategy': 'joined'},
+        ]
+
+        restricted_query = apply_loads(query, load_spec)
+
+        assert str(restricted_query) == (
+            "SELECT foo.id AS foo_id, foo.name AS foo_name, "
+            "foo.bar_id AS foo_bar_id, "
+            "bar_1.id AS bar_1_id, bar_1.name AS bar_1_name \n"
+            "FROM foo LEFT OUTER JOIN bar AS bar_1 ON bar_1.id = foo.bar_id"
+        )
+
+    def test_relationship_not_found(self, session):
+        query = session.query(Foo)
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_loads(query, ['name', 'bar.quxs.name'])
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Bar'> has no relationship `quxs`."
+        )
+
+    def test_field_not_found(self, session):
+        query = session.query(Foo)
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_loads(query, ['name', 'bar.invalid_field'])
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Bar'> has no column `invalid_field`."
+        )
+
+
+class TestHeavyColumns(object):
+
+    @pytest.fixture
+    def waldos_inserted(self, session):
+        garply = Garply(id=1, name='name_1', attrs={'size': 1})
+        garply.waldos = [
+            Waldo(
+                id=1, name='name_1', description='description_1',
+                thumbnail=b'thumbnail_1', summary='summary_1', code='c1',
+                notes='notes_1',
+            ),
+        ]
+        session.add(garply)
+        session.commit()
+        session.expunge_all()
+
+    def test_heavy_columns(self):
+        assert get_heavy_columns(Waldo) == [
+            DeferredColumn('Waldo', 'description', 'Text()'),
+            DeferredColumn('Waldo', 'thumbnail', 'LargeBinary()'),
+            DeferredColumn('Waldo', 'summary', 'String(length=2000)'),
+            DeferredColumn('Waldo', 'code', 'info'),
+        ]
+        assert get_heavy_columns(Foo) == []
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='ARRAY added in SQLAlchemy 1.1'
+    )
+    def test_array_columns(self):
+        assert [
+            column.field for column in get_heavy_columns(Corge)
+        ] == ['tags']
+
+    def test_max_length(self):
+        assert [
+            column.field for column in get_heavy_columns(Waldo, 5000)
+        ] == ['description', 'thumbnail', 'code']
+        assert [
+            column.field for column in get_heavy_columns(Bar, 10)
+        ] == ['name']
+
+    @pytest.mark.usefixtures('waldos_inserted')
+    def test_heavy_columns_deferred(self, session):
+        query = session.query(Waldo)
+
+        waldo = apply_loads(query, defer_heavy=True).one()
+
+        assert inspect(waldo).unloaded == {
+            'description', 'thumbnail', 'summary', 'code', 'garply'
+        }
+        assert waldo.notes == 'notes_1'
+        assert waldo.description == 'description_1'
+
+    @pytest.mark.usefixtures('waldos_inserted')
+    def test_not_deferred_by_default(self, session):
+        waldo = apply_loads(session.query(Waldo)).one()
+
+        assert inspect(waldo).unloaded == {'garply'}
+
+    @pytest.mark.usefixtures('waldos_inserted')
+    def test_load_spec_takes_precedence(self, session):
+        query = session.query(Waldo)
+        load_spec = ['name', 'description']
+
+        waldo = apply_loads(query, load_spec, defer_heavy=True).one()
+
+        assert 'description' not in inspect(waldo).unloaded
+        assert get_deferred_columns(query, load_spec) == []
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+    )
+    @pytest.mark.usefixtures('waldos_inserted')
+    def test_relationship_without_fields(self, session):
+        query = session.query(Garply)
+        load_spec = [{'relationship': 'waldos', 'strategy': 'subquery'}]
+
+        garply = apply_loads(query, load_spec, defer_heavy=True).one()
+
+        assert inspect(garply).unloaded == {'attrs'}
+        assert 'waldos' in inspect(garply).dict
+        assert inspect(garply.waldos[0]).unloaded == {
+            'description', 'thumbnail', 'summary', 'code', 'garply'
+        }
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+    )
+    def test_report(self, session):
+        query = session.query(Garply)
+        load_spec = [{'relationship': 'waldos', 'strategy': 'joined'}]
+
+        assert get_deferred_columns(query, load_spec, defer_heavy=5000) == [
+            DeferredColumn('Garply', 'attrs', 'JSON()'),
+            DeferredColumn('Waldo', 'description', 'Text()'),
+            DeferredColumn('Waldo', 'thumbnail', 'LargeBinary()'),
+            DeferredColumn('Waldo', 'code', 'info'),
+        ]
+
+
 class TestAutoJoin:
 
     @pytest.mark.usefixtures('multiple_foos_inserted')
@@ -1,13 +1,18 @@
 import pytest
-from sqlalchemy import func
+from sqlalchemy import Column, Integer, func
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
 from sqlalchemy.orm import joinedload
 
-from sqlalchemy_filters.exceptions import BadSpec, BadQuery
+from sqlalchemy_filters import models
+from sqlalchemy_filters.exceptions import BadModel, BadSpec, BadQuery
 from sqlalchemy_filters.models import (
     auto_join, get_default_model, get_query_models, get_model_class_by_name,
-    get_model_from_spec, sqlalchemy_version_lt, get_model_from_table
+    get_model_from_spec, sqlalchemy_version_lt, get_model_from_table,
+    get_model_field_names, get_relationship_path, prepare
 )
-from test.models import Base, Bar, Foo, Qux
+from test.models import Base, Bar, Baz, Foo, Grault, Qux
+from test import error_value
 
 
 class TestGetQueryModels(object):
@@ -270,3 +275,130 @@ class TestAutoJoin:
 
         query = auto_join(query, 'Missing')
         assert str(query) == expected   # no change
+
+
+class TestPrepare:
+
+    @pytest.fixture(autouse=True)
+    def clear_lookups(self):
+        yield
+
+        models._prepared_models.clear()
+        models._field_names.clear()
+        models._models_by_name.clear()
+        models._models_by_table.clear()
+        models._relationship_paths.clear()
+
+    def test_prepare_base(self):
+        prepared = prepare(Base)
+
+        assert {Foo, Bar, Baz, Qux, Grault} <= set(prepared)
+        assert models._field_names[Foo] == {
+            'id', 'name', 'count', 'bar_id', 'count_square',
+            'three_times_count',
+        }
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.4'), reason='registry added in SQLAlchemy 1.4'
+    )
+    def test_prepare_registry(self):
+        assert set(prepare(Base.registry)) == set(prepare(Base))
+
+    def test_lookups_are_not_recomputed(self, monkeypatch):
+        prepare([Foo, Bar, Grault, Qux])
+
+        def fail(*args):
+            raise AssertionError('not cached')
+
+        monkeypatch.setattr(models, '_get_model_field_names', fail)
+        monkeypatch.setattr(models, '_get_relationship_paths', fail)
+
+        assert 'count_square' in get_model_field_names(Foo)
+        assert get_relationship_path([Foo], 'Grault') == [
+            Foo.bar.property, Bar.graults.property
+        ]
+        assert get_relationship_path([Foo], 'Qux') is None
+        assert get_model_class_by_name(
+            models.get_model_registry(Foo), 'Bar'
+        ) == Bar
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.4'), reason='tests sqlalchemy 1.4 code'
+    )
+    def test_model_from_table_is_not_recomputed(self, monkeypatch):
+        prepare([Foo])
+
+        monkeypatch.setattr(models, '_get_model_from_table', None)
+
+        assert get_model_from_table(Foo.__table__) == Foo
+
+    def test_multiple_models_path_is_cached(self, monkeypatch):
+        prepare([Foo, Bar, Grault])
+        path = get_relationship_path([Bar, Foo], 'Grault')
+
+        monkeypatch.setattr(models, '_get_relationship_paths', None)
+
+        assert get_relationship_path([Bar, Foo], 'Grault') == path
+        assert path == [Bar.graults.property]
+
+    def test_freeze(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(models.gc, 'freeze', lambda: calls.append(1))
+
+        prepare([Foo])
+        prepare([Foo], freeze=True)
+
+        assert calls == [1]
+
+    def test_failing_hybrid(self):
+
+        class Waldo(declarative_base()):
+            __tablename__ = 'waldo'
+            id = Column(Integer, primary_key=True)
+
+            @hybrid_property
+            def broken(self):
+                return self.missing
+
+        with pytest.raises(BadModel) as err:
+            prepare([Waldo])
+
+        assert error_value(err).startswith(
+            'Hybrid attribute `Waldo.broken` could not be evaluated as a SQL '
+            'expression: AttributeError('
+        )
+        assert Waldo not in models._field_names
+
+    def test_hybrid_property_not_an_expression(self):
+
+        class Waldo(declarative_base()):
+            __tablename__ = 'waldo'
+            id = Column(Integer, primary_key=True)
+
+            @hybrid_property
+            def constant(self):
+                return 42
+
+        with pytest.raises(BadModel) as err:
+            prepare([Waldo])
+
+        assert error_value(err).startswith(
+            'Hybrid attribute `Waldo.constant` is not a SQL expression: '
+        )
+
+    def test_hybrid_method_not_an_expression(self):
+
+        class Waldo(declarative_base()):
+            __tablename__ = 'waldo'
+            id = Column(Integer, primary_key=True)
+
+            @hybrid_method
+            def constant(self):
+                return 42
+
+        with pytest.raises(BadModel) as err:
+            prepare([Waldo])
+
+        assert error_value(err) == (
+            'Hybrid attribute `Waldo.constant` is not a SQL expression: 42'
+        )
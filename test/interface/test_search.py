@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import CompileError
+
+from sqlalchemy_filters import apply_filters, apply_sort
+from sqlalchemy_filters.exceptions import BadFilterFormat, BadSpec
+from sqlalchemy_filters.search import (
+    FTS_INDEXES, register_fts_index, unregister_fts_index
+)
+from test import error_value
+from test.models import Bar, Foo
+
+
+FULL_TEXT_SEARCH_NOT_SUPPORTED = (
+    "Full-text search only tested on SQLite and PostgreSQL"
+)
+
+
+@pytest.fixture
+def fts_index():
+    index = register_fts_index(Foo, ['name'])
+
+    yield index
+
+    unregister_fts_index(index)
+
+
+@pytest.fixture
+def multiple_foos_inserted(session, fts_index, is_sqlite, is_postgresql):
+    if not (is_sqlite or is_postgresql):
+        pytest.skip(FULL_TEXT_SEARCH_NOT_SUPPORTED)
+
+    if is_sqlite:
+        session.execute(text(
+            "CREATE VIRTUAL TABLE foo_fts USING fts5("
+            "name, content='foo', content_rowid='id')"
+        ))
+
+    session.add_all([
+        Foo(id=1, name='red apple'),
+        Foo(id=2, name='apple pie apple'),
+        Foo(id=3, name='banana'),
+        Foo(id=4, name='apples and pears'),
+        Foo(id=5, name='cherry'),
+        Foo(id=6, name='plum'),
+    ])
+    session.flush()
+
+    if is_sqlite:
+        session.execute(text("INSERT INTO foo_fts(foo_fts) VALUES('rebuild')"))
+    session.commit()
+
+    yield
+
+    if is_sqlite:
+        session.execute(text("DROP TABLE foo_fts"))
+        session.commit()
+
+
+class TestFullTextIndex(object):
+
+    def test_register(self, fts_index):
+        assert FTS_INDEXES[(Foo, 'name')] is fts_index
+        assert fts_index.name == 'foo_fts'
+        assert fts_index.fields == ['name']
+
+    def test_unregister(self):
+        index = register_fts_index(Bar, {'name': 'title'}, name='bar_search')
+
+        assert index.columns == {'name': 'title'}
+
+        unregister_fts_index(index)
+
+        assert (Bar, 'name') not in FTS_INDEXES
+
+    def test_invalid_config(self):
+        with pytest.raises(BadSpec) as err:
+            register_fts_index(Foo, ['name'], config="english'; --")
+
+        expected_error = "Text search configuration `english'; --` not valid."
+        assert expected_error == error_value(err)
+
+    def test_field_without_index(self, session):
+        query = session.query(Bar)
+        filters = [{'field': 'name', 'op': 'match', 'value': 'apple'}]
+
+        with pytest.raises(BadSpec) as err:
+            apply_filters(query, filters)
+
+        expected_error = (
+            "Field `name` of model <class 'test.models.Bar'> has no "
+            "full-text index."
+        )
+        assert expected_error == error_value(err)
+
+    def test_sqlite_statement(self, session, fts_index, is_sqlite):
+        if not is_sqlite:
+            pytest.skip(FULL_TEXT_SEARCH_NOT_SUPPORTED)
+
+        query = session.query(Foo.id)
+        filters = [{'field': 'name', 'op': 'search', 'value': 'red "x'}]
+
+        filtered_query = apply_filters(query, filters)
+
+        assert str(filtered_query.statement.compile(session.bind)) == (
+            "SELECT foo.id \nFROM foo \nWHERE foo.id IN "
+            "(SELECT rowid FROM foo_fts WHERE foo_fts.name MATCH ?)"
+        )
+        assert filtered_query.statement.compile(
+            session.bind
+        ).params.popitem()[1] == '"red" """x"'
+
+    @pytest.mark.parametrize('operator', ['match', 'search'])
+    def test_terms_not_a_string(self, session, fts_index, operator):
+        filters = [{'field': 'name', 'op': operator, 'value': ['apple']}]
+
+        with pytest.raises(BadFilterFormat) as err:
+            apply_filters(session.query(Foo), filters)
+
+        expected_error = (
+            "Value `['apple']` of operator `{}` must be a string.".format(
+                operator
+            )
+        )
+        assert expected_error == error_value(err)
+
+    def test_unsupported_dialect(self, session, fts_index):
+        from sqlalchemy.dialects import mssql
+
+        query = session.query(Foo.id)
+        filters = [{'field': 'name', 'op': 'match', 'value': 'apple'}]
+
+        filtered_query = apply_filters(query, filters)
+
+        with pytest.raises(CompileError) as err:
+            filtered_query.statement.compile(dialect=mssql.dialect())
+
+        expected_error = (
+            'Full-text search is not supported by the mssql dialect.'
+        )
+        assert expected_error == error_value(err)
+
+
+@pytest.mark.usefixtures('multiple_foos_inserted')
+class TestFullTextFilters(object):
+
+    def test_search(self, session):
+        query = session.query(Foo)
+        filters = [{'field': 'name', 'op': 'search', 'value': 'apple pie'}]
+
+        result = apply_filters(query, filters).all()
+
+        assert [foo.id for foo in result] == [2]
+
+    def test_match(self, session, is_sqlite):
+        query = session.query(Foo)
+        value = 'red | banana' if not is_sqlite else 'red OR banana'
+        filters = [{'field': 'name', 'op': 'match', 'value': value}]
+
+        result = apply_filters(query, filters).order_by(Foo.id).all()
+
+        assert [foo.id for foo in result] == [1, 3]
+
+    def test_combined_with_other_filters(self, session):
+        query = session.query(Foo)
+        filters = {
+            'and': [
+                {'field': 'name', 'op': 'search', 'value': 'apple'},
+                {'field': 'id', 'op': '>', 'value': 1},
+            ]
+        }
+
+        result = apply_filters(query, filters).all()
+
+        assert [foo.id for foo in result] == [2]
+
+    def test_sort_by_rank(self, session):
+        query = session.query(Foo)
+        filters = [{'field': 'name', 'op': 'search', 'value': 'apple'}]
+        sort_spec = [
+            {'field': 'name', 'direction': 'desc', 'rank': 'apple'},
+        ]
+
+        result = apply_sort(apply_filters(query, filters), sort_spec).all()
+
+        assert sorted(foo.id for foo in result) == [1, 2]
+        # the name with the highest frequency of the term comes first
+        assert result[0].id == 2
+
+    def test_sort_by_rank_without_filter(self, session):
+        query = session.query(Foo)
+        sort_spec = [
+            {'field': 'name', 'direction': 'asc', 'rank': 'banana'},
+            {'field': 'id', 'direction': 'asc'},
+        ]
+
+        result = apply_sort(query, sort_spec).all()
+
+        assert [foo.id for foo in result] == [1, 2, 4, 5, 6, 3]
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from sqlalchemy_filters import apply_filters, apply_loads, apply_sort
+from sqlalchemy_filters.fingerprint import fingerprint
+from sqlalchemy_filters.slowlog import SPECS_OPTION, SlowSpecLog
+from test.models import Foo
+
+
+def _values(parameters):
+    if isinstance(parameters, dict):
+        return list(parameters.values())
+    return list(parameters)
+
+
+@pytest.fixture
+def attach(session):
+    slow_logs = []
+
+    def attach(*args, **kwargs):
+        slow_log = SlowSpecLog(*args, **kwargs)
+        slow_log.attach(session.get_bind().engine)
+        slow_logs.append(slow_log)
+        return slow_log
+
+    yield attach
+
+    for slow_log in slow_logs:
+        if slow_log.engine is not None:
+            slow_log.detach()
+
+
+class TestSlowSpecLog(object):
+
+    def test_records_specs(self, session, attach):
+        captured = []
+        slow_log = attach(captured.append, threshold=0)
+        filter_spec = [{'field': 'name', 'op': '==', 'value': 'name_1'}]
+        sort_spec = [{'field': 'id', 'direction': 'desc'}]
+        load_spec = ['name']
+
+        query = apply_filters(session.query(Foo), filter_spec)
+        query = apply_loads(apply_sort(query, sort_spec), load_spec)
+        query.all()
+        session.query(Foo).all()
+        slow_log.flush()
+
+        record, = captured
+        assert record.specs == {
+            'filter_spec': filter_spec,
+            'sort_spec': sort_spec,
+            'load_spec': load_spec,
+        }
+        assert record.fingerprint == fingerprint(
+            filter_spec, sort_spec, load_spec, ignore_values=True
+        )
+        assert record.statement.startswith('SELECT')
+        assert _values(record.parameters) == ['name_1']
+        assert record.duration >= 0
+        slow_log.detach()
+
+    def test_not_tagged_when_detached(self, session):
+        query = apply_filters(
+            session.query(Foo), [{'field': 'id', 'op': '==', 'value': 1}]
+        )
+
+        assert SPECS_OPTION not in query.get_execution_options()
+
+    def test_threshold(self, session, attach):
+        captured = []
+        slow_log = attach(captured.append, threshold=60)
+
+        apply_sort(session.query(Foo), {'field': 'id', 'direction': 'asc'}).all()
+        slow_log.detach()
+
+        assert captured == []
+
+    def test_redact(self, session, attach):
+        captured = []
+        slow_log = attach(
+            captured.append, threshold=0,
+            redact=lambda record: record._replace(parameters=None),
+        )
+
+        apply_filters(
+            session.query(Foo), [{'field': 'id', 'op': '==', 'value': 1}]
+        ).all()
+        slow_log.detach()
+
+        assert len(captured) == 1
+        assert captured[0].parameters is None
+
+    def test_default_handler(self, session, attach, caplog):
+        slow_log = attach(threshold=0)
+
+        with caplog.at_level(logging.WARNING, 'sqlalchemy_filters.slowlog'):
+            apply_filters(
+                session.query(Foo), [{'field': 'id', 'op': '==', 'value': 1}]
+            ).all()
+            slow_log.flush()
+        slow_log.detach()
+
+        record, = caplog.records
+        assert record.getMessage().startswith('Slow query (')
+        assert record.slow_spec.specs == {
+            'filter_spec': [{'field': 'id', 'op': '==', 'value': 1}]
+        }
+
+    def test_failing_handler(self, session, attach, caplog):
+
+        def handler(record):
+            raise ValueError('handler')
+
+        slow_log = attach(handler, threshold=0)
+
+        apply_sort(session.query(Foo), {'field': 'id', 'direction': 'asc'}).all()
+        slow_log.detach()
+
+        assert caplog.records[-1].getMessage() == (
+            'Could not handle slow query record.'
+        )
+
+    def test_buffer_size(self, session, attach):
+        captured = []
+        release = threading.Event()
+
+        def handler(record):
+            release.wait()
+            captured.append(record)
+
+        slow_log = attach(handler, threshold=0, buffer_size=1)
+        query = apply_sort(
+            session.query(Foo), {'field': 'id', 'direction': 'asc'}
+        )
+
+        # at most one record is handled and one is waiting
+        for _ in range(3):
+            query.all()
+        release.set()
+        slow_log.detach()
+
+        assert slow_log.dropped >= 1
+        assert len(captured) + slow_log.dropped == 3
+
+    def test_statement_started_before_attach(self, attach):
+        captured = []
+        slow_log = attach(captured.append, threshold=0)
+
+        slow_log._after_execute(
+            None, None, 'SELECT 1', (), object(), executemany=False
+        )
+        slow_log.flush()
+
+        assert captured == []
+
+    def test_failed_statements(self, session, attach):
+        slow_log = attach(threshold=0)
+        connection = session.connection()
+
+        with pytest.raises(DBAPIError):
+            connection.execute(text('SELECT * FROM missing_table'))
+
+        assert not any(
+            'slowlog' in str(key) for key in connection.info
+        )
+        slow_log.detach()
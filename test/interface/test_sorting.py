@@ -4,11 +4,13 @@ import datetime
 
 import pytest
 
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Column, ForeignKey, Integer, func
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Query, joinedload, relationship
 from sqlalchemy_filters.exceptions import BadSortFormat, BadSpec, FieldNotFound
 from sqlalchemy_filters.sorting import apply_sort
 from test import error_value
-from test.models import Foo, Bar, Qux
+from test.models import Foo, Bar, Grault, Qux
 
 
 NULLSFIRST_NOT_SUPPORTED = (
@@ -636,3 +638,262 @@ class TestSortHybridAttributes(object):
         assert [result.three_times_count() for result in results] == [
             45, 36, 30, 15, 9, 6, 6, 3
         ]
+
+
+class TestSortTiebreaker(object):
+
+    def order_by(self, query):
+        return str(query.statement).split('ORDER BY')[1].strip()
+
+    @pytest.mark.usefixtures('multiple_bars_with_no_nulls_inserted')
+    def test_primary_key_is_appended(self, session):
+        query = session.query(Bar)
+        order_by = [{'field': 'name', 'direction': 'asc'}]
+
+        sorted_query = apply_sort(query, order_by, tiebreaker=True)
+        results = sorted_query.all()
+
+        assert self.order_by(sorted_query) == 'bar.name ASC, bar.id ASC'
+        assert [result.id for result in results] == [1, 3, 5, 7, 2, 4, 6, 8]
+
+    @pytest.mark.usefixtures('multiple_bars_with_no_nulls_inserted')
+    def test_direction_of_last_sort(self, session):
+        query = session.query(Bar)
+        order_by = [{'field': 'name', 'direction': 'desc'}]
+
+        sorted_query = apply_sort(query, order_by, tiebreaker=True)
+        results = sorted_query.all()
+
+        assert self.order_by(sorted_query) == 'bar.name DESC, bar.id DESC'
+        assert [result.id for result in results] == [8, 6, 4, 2, 7, 5, 3, 1]
+
+    def test_sorted_fields_are_not_repeated(self, session):
+        query = session.query(Bar)
+        order_by = [
+            {'field': 'id', 'direction': 'desc'},
+            {'field': 'name', 'direction': 'asc'},
+        ]
+
+        sorted_query = apply_sort(
+            query, order_by, tiebreaker=['name', 'id', 'count']
+        )
+
+        assert self.order_by(sorted_query) == (
+            'bar.id DESC, bar.name ASC, bar.count ASC'
+        )
+
+    def test_empty_sort(self, session):
+        query = session.query(Bar)
+
+        sorted_query = apply_sort(query, [], tiebreaker='name')
+
+        assert self.order_by(sorted_query) == 'bar.name ASC'
+
+    def test_first_entity_of_multiple_models(self, session):
+        query = session.query(Foo, Bar).join(Bar)
+        order_by = [{'model': 'Bar', 'field': 'name', 'direction': 'asc'}]
+
+        sorted_query = apply_sort(query, order_by, tiebreaker=True)
+
+        assert self.order_by(sorted_query) == 'bar.name ASC, foo.id ASC'
+
+    def test_disabled_by_default(self, session):
+        query = session.query(Bar)
+        order_by = [{'field': 'name', 'direction': 'asc'}]
+
+        sorted_query = apply_sort(query, order_by)
+
+        assert self.order_by(sorted_query) == 'bar.name ASC'
+
+    def test_invalid_field(self, session):
+        query = session.query(Bar)
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_sort(query, [], tiebreaker=['uuid'])
+
+        assert 'Model <class \'test.models.Bar\'> has no column `uuid`.' in (
+            error_value(err)
+        )
+
+    def test_query_without_model(self, session):
+        query = session.query(func.count())
+
+        with pytest.raises(BadSortFormat) as err:
+            apply_sort(query, [], tiebreaker=True)
+
+        assert error_value(err) == 'The query has no model to break ties by.'
+
+
+@pytest.fixture
+def bars_with_foos_inserted(session):
+    bar_1 = Bar(id=1, name='name_1', count=5)
+    bar_2 = Bar(id=2, name='name_2', count=10)
+    bar_3 = Bar(id=3, name='name_3', count=15)
+    bar_4 = Bar(id=4, name='name_4', count=20)
+    grault_1 = Grault(id=1, name='name_1', bars=[bar_1, bar_2, bar_3])
+    grault_2 = Grault(id=2, name='name_2', bars=[bar_3])
+    session.add_all([bar_1, bar_2, bar_3, bar_4, grault_1, grault_2])
+    session.add_all([
+        Foo(id=1, name='name_1', count=1, bar_id=1),
+        Foo(id=2, name='name_2', count=50, bar_id=2),
+        Foo(id=3, name='name_3', count=3, bar_id=3),
+        Foo(id=4, name='name_4', count=4, bar_id=3),
+        Foo(id=5, name='name_5', count=None, bar_id=3),
+        Foo(id=6, name='name_6', count=2, bar_id=1),
+    ])
+    session.commit()
+
+
+@pytest.fixture(params=['correlated', 'joined'])
+def aggregate_strategy(request, monkeypatch, session):
+    if request.param == 'joined':
+        dialect_name = session.get_bind().dialect.name
+        monkeypatch.setattr(
+            'sqlalchemy_filters.sorting.JOINED_AGGREGATE_DIALECTS',
+            {dialect_name},
+        )
+    return request.param
+
+
+@pytest.mark.usefixtures('bars_with_foos_inserted', 'aggregate_strategy')
+class TestSortAggregates(object):
+
+    def test_count(self, session):
+        query = session.query(Bar)
+        order_by = [
+            {'field': 'foos', 'aggregate': 'count', 'direction': 'desc'},
+            {'field': 'id', 'direction': 'asc'},
+        ]
+
+        sorted_query = apply_sort(query, order_by)
+
+        assert [bar.id for bar in sorted_query] == [3, 1, 2, 4]
+
+    def test_count_of_field(self, session):
+        query = session.query(Bar)
+        order_by = [
+            {'field': 'foos.count', 'aggregate': 'count', 'direction': 'desc'},
+            {'field': 'id', 'direction': 'desc'},
+        ]
+
+        sorted_query = apply_sort(query, order_by)
+
+        # the `NULL` count of foo 5 is not counted
+        assert [bar.id for bar in sorted_query] == [3, 1, 2, 4]
+
+    @pytest.mark.parametrize('aggregate, expected_ids', [
+        ('max', [2, 3, 1]),
+        ('min', [2, 3, 1]),
+        ('sum', [2, 3, 1]),
+    ])
+    def test_aggregate_of_field(self, session, aggregate, expected_ids):
+        query = session.query(Bar).filter(Bar.id != 4)
+        order_by = [
+            {'field': 'foos.count', 'aggregate': aggregate, 'direction': 'desc'},
+        ]
+
+        sorted_query = apply_sort(query, order_by)
+
+        assert [bar.id for bar in sorted_query] == expected_ids
+
+    def test_many_to_many(self, session):
+        query = session.query(Bar)
+        order_by = [
+            {'field': 'graults', 'aggregate': 'count', 'direction': 'asc'},
+            {'field': 'id', 'direction': 'desc'},
+        ]
+
+        sorted_query = apply_sort(query, order_by)
+
+        assert [bar.id for bar in sorted_query] == [4, 2, 1, 3]
+
+    def test_many_to_one(self, session):
+        query = session.query(Foo)
+        order_by = [
+            {'field': 'bar.count', 'aggregate': 'max', 'direction': 'desc'},
+            {'field': 'id', 'direction': 'asc'},
+        ]
+
+        sorted_query = apply_sort(query, order_by)
+
+        assert [foo.id for foo in sorted_query] == [3, 4, 5, 2, 1, 6]
+
+    def test_named_model_with_pagination(self, session):
+        query = session.query(Foo, Bar).join(Bar)
+        order_by = [
+            {
+                'model': 'Bar', 'field': 'foos', 'aggregate': 'count',
+                'direction': 'desc',
+            },
+            {'model': 'Foo', 'field': 'id', 'direction': 'asc'},
+        ]
+
+        sorted_query = apply_sort(query, order_by).limit(3)
+
+        assert [(foo.id, bar.id) for foo, bar in sorted_query] == [
+            (3, 3), (4, 3), (5, 3)
+        ]
+
+
+class TestSortAggregatesErrors(object):
+
+    def test_invalid_aggregate(self, session):
+        order_by = [{'field': 'foos', 'aggregate': 'avg', 'direction': 'asc'}]
+
+        with pytest.raises(BadSortFormat) as err:
+            apply_sort(session.query(Bar), order_by)
+
+        assert error_value(err) == 'Aggregate `avg` not valid.'
+
+    def test_not_a_relationship(self, session):
+        order_by = [{'field': 'name', 'aggregate': 'count', 'direction': 'asc'}]
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_sort(session.query(Bar), order_by)
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Bar'> has no relationship `name`."
+        )
+
+    def test_field_of_related_model_not_found(self, session):
+        order_by = [
+            {'field': 'foos.size', 'aggregate': 'max', 'direction': 'asc'},
+        ]
+
+        with pytest.raises(FieldNotFound) as err:
+            apply_sort(session.query(Bar), order_by)
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Foo'> has no column `size`."
+        )
+
+    def test_self_referential_relationship(self):
+
+        class Node(declarative_base()):
+            __tablename__ = 'node'
+            id = Column(Integer, primary_key=True)
+            parent_id = Column(Integer, ForeignKey('node.id'))
+            children = relationship('Node')
+
+        order_by = [
+            {'field': 'children', 'aggregate': 'count', 'direction': 'asc'},
+        ]
+
+        with pytest.raises(BadSortFormat) as err:
+            apply_sort(Query(Node), order_by)
+
+        assert error_value(err) == (
+            'Aggregates over the self-referential relationship `children` '
+            'are not supported.'
+        )
+
+    def test_aggregate_needs_field(self, session):
+        order_by = [{'field': 'foos', 'aggregate': 'max', 'direction': 'asc'}]
+
+        with pytest.raises(BadSortFormat) as err:
+            apply_sort(session.query(Bar), order_by)
+
+        assert error_value(err) == (
+            'Aggregate `max` needs a field of the related model, e.g. '
+            '`foos.id`.'
+        )
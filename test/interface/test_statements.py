@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy import event
+
+from sqlalchemy_filters import apply_loads, statements
+from sqlalchemy_filters.exceptions import TooManyStatements
+from sqlalchemy_filters.models import sqlalchemy_version_lt
+from sqlalchemy_filters.statements import (
+    LazyLoadBurst, StatementCounter, StatementShape, get_statement_shape
+)
+from test.models import Bar, Foo
+from test import error_value
+
+
+@pytest.fixture
+def multiple_foos_inserted(session):
+    session.add_all([
+        Bar(id=1, name='name_1'),
+        Bar(id=2, name='name_2'),
+        Bar(id=3, name='name_3'),
+    ])
+    session.add_all([
+        Foo(id=1, name='name_1', bar_id=1),
+        Foo(id=2, name='name_2', bar_id=2),
+        Foo(id=3, name='name_3', bar_id=3),
+    ])
+    session.commit()
+    session.expunge_all()
+
+
+class TestStatementShape(object):
+
+    @pytest.mark.parametrize('statement, expected_shape', [
+        (
+            'SELECT foo.id \nFROM foo \nWHERE foo.id = ?',
+            'SELECT foo.id FROM foo WHERE foo.id = ?',
+        ),
+        (
+            'SELECT foo.id FROM foo WHERE foo.id IN (?, ?, ?)',
+            'SELECT foo.id FROM foo WHERE foo.id IN (...)',
+        ),
+        (
+            'SELECT foo.id FROM foo WHERE foo.id IN (%(id_1_1)s, %(id_1_2)s)',
+            'SELECT foo.id FROM foo WHERE foo.id IN (...)',
+        ),
+        (
+            'INSERT INTO foo (id, name) VALUES (%s, %s)',
+            'INSERT INTO foo (id, name) VALUES (...)',
+        ),
+    ])
+    def test_shape(self, statement, expected_shape):
+        assert get_statement_shape(statement) == expected_shape
+
+
+@pytest.mark.usefixtures('multiple_foos_inserted')
+class TestStatementCounter(object):
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.4'), reason='do_orm_execute added in 1.4'
+    )
+    def test_lazy_loads(self, session):
+        with StatementCounter(session) as counter:
+            foos = session.query(Foo).order_by(Foo.id).all()
+            names = [foo.bar.name for foo in foos]
+
+        assert names == ['name_1', 'name_2', 'name_3']
+        assert counter.count == 4
+        assert counter.lazy_loads == {'Foo.bar': 3}
+        assert counter.bursts == [LazyLoadBurst('Foo.bar', 3)]
+        assert len(counter.repeated) == 1
+        assert counter.repeated[0].count == 3
+        assert 'FROM bar' in counter.repeated[0].statement
+
+    def test_load_spec(self, session):
+        query = session.query(Foo).order_by(Foo.id)
+        load_spec = [{'relationship': 'bar', 'strategy': 'subquery'}]
+
+        with StatementCounter(session) as counter:
+            foos = apply_loads(query, load_spec).all()
+            [foo.bar.name for foo in foos]
+
+        assert counter.count == 2
+        assert counter.bursts == []
+        assert counter.repeated == []
+        assert [shape.count for shape in counter.shapes] == [1, 1]
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.4'), reason='do_orm_execute added in 1.4'
+    )
+    def test_burst_size(self, session):
+        with StatementCounter(session, burst_size=4) as counter:
+            [foo.bar for foo in session.query(Foo).all()]
+
+        assert counter.lazy_loads == {'Foo.bar': 3}
+        assert counter.bursts == []
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.4'), reason='do_orm_execute added in 1.4'
+    )
+    def test_max_lazy_loads(self, session):
+        foos = session.query(Foo).order_by(Foo.id).all()
+
+        with StatementCounter(session, max_lazy_loads=2) as counter:
+            foos[0].bar
+            foos[1].bar
+            with pytest.raises(TooManyStatements) as err:
+                foos[2].bar
+
+        assert error_value(err) == (
+            'Relationship `Foo.bar` lazy loaded 3 times, more than 2. Load '
+            'it with a strategy in the load spec.'
+        )
+        assert counter.count == 2
+
+    def test_max_statements(self, session):
+        with StatementCounter(session, max_statements=1) as counter:
+            session.query(Foo).all()
+            with pytest.raises(TooManyStatements) as err:
+                session.query(Bar).all()
+
+        assert error_value(err).startswith(
+            '2 statements executed, more than 1. Last statement: SELECT '
+        )
+        assert counter.count == 2
+
+    def test_detach(self, session):
+        with StatementCounter(session) as counter:
+            session.query(Foo).all()
+        session.query(Foo).all()
+
+        assert counter.count == 1
+        assert counter.shapes == [
+            StatementShape(get_statement_shape(counter.statements[0]), 1)
+        ]
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.4'), reason='do_orm_execute added in 1.4'
+    )
+    def test_failed_attach(self, session, monkeypatch):
+        listen = event.listen
+
+        def failing_listen(target, identifier, fn):
+            if identifier == 'do_orm_execute':
+                raise ValueError('listen')
+            listen(target, identifier, fn)
+
+        monkeypatch.setattr(statements.event, 'listen', failing_listen)
+        counter = StatementCounter(session)
+        engine = session.get_bind()
+
+        with pytest.raises(ValueError):
+            counter.attach()
+
+        assert not event.contains(
+            engine, 'before_cursor_execute', counter._before_execute
+        )
+        assert counter.engine is None
+
+    def test_lazy_loads_not_counted_before_sqlalchemy_1_4(
+        self, session, monkeypatch
+    ):
+        monkeypatch.setattr(
+            statements, 'sqlalchemy_version_lt', lambda version: True
+        )
+
+        with pytest.raises(ValueError) as err:
+            StatementCounter(session, max_lazy_loads=1)
+
+        assert error_value(err) == (
+            'Counting lazy loads requires SQLAlchemy 1.4 or later.'
+        )
+
+        with StatementCounter(session) as counter:
+            foos = session.query(Foo).order_by(Foo.id).all()
+            [foo.bar.name for foo in foos]
+
+        assert counter.count == 4
+        with pytest.raises(ValueError):
+            counter.bursts
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.exceptions import (
+    BadGroupFormat, BadQuery, BadSortFormat, FieldNotFound, InvalidPage
+)
+from sqlalchemy_filters.top_n import apply_top_n
+from test import error_value
+from test.models import Bar, Foo
+
+
+@pytest.fixture
+def data_inserted(session):
+    session.add_all([
+        Bar(id=1, name='name_1', count=5),
+        Bar(id=2, name='name_2', count=10),
+        Bar(id=3, name='name_1', count=15),
+        Foo(id=1, bar_id=1, name='name_1', count=10),
+        Foo(id=2, bar_id=1, name='name_2', count=30),
+        Foo(id=3, bar_id=1, name='name_3', count=20),
+        Foo(id=4, bar_id=1, name='name_4', count=40),
+        Foo(id=5, bar_id=2, name='name_5', count=50),
+        Foo(id=6, bar_id=3, name='name_6', count=10),
+        Foo(id=7, bar_id=3, name='name_7', count=10),
+        Foo(id=8, bar_id=None, name='name_8', count=60),
+    ])
+    session.commit()
+
+
+@pytest.mark.usefixtures('data_inserted')
+class TestApplyTopN(object):
+
+    def test_top_n_per_group(self, session):
+        query = apply_top_n(
+            session.query(Foo),
+            [{'field': 'bar_id'}],
+            [{'field': 'count', 'direction': 'desc'}],
+            2,
+        )
+
+        results = [(foo.bar_id, foo.id) for foo in query]
+
+        # NULL values are a group of their own
+        assert sorted(results, key=lambda item: (item[0] or 0, item[1])) == [
+            (None, 8), (1, 2), (1, 4), (2, 5), (3, 6), (3, 7)
+        ]
+        assert [foo.id for foo in query if foo.bar_id == 1] == [4, 2]
+
+    def test_filtered_query(self, session):
+        query = apply_filters(
+            session.query(Foo),
+            {'field': 'count', 'op': '<', 'value': 40},
+        )
+
+        query = apply_top_n(
+            query,
+            [{'field': 'bar_id'}],
+            [{'field': 'count', 'direction': 'desc'}],
+            1,
+        )
+
+        assert [(foo.bar_id, foo.id) for foo in query if foo.bar_id == 1] == [
+            (1, 2)
+        ]
+
+    def test_group_by_related_model(self, session):
+        query = apply_top_n(
+            session.query(Foo),
+            [{'model': 'Bar', 'field': 'name'}],
+            [{'field': 'count', 'direction': 'desc'}],
+            2,
+            tiebreaker=True,
+        )
+
+        # bars 1 and 3 share the same name, and foo 8 has no bar
+        assert [foo.id for foo in query] == [4, 2, 5]
+
+    def test_tiebreaker(self, session):
+        query = apply_top_n(
+            session.query(Foo),
+            [{'field': 'bar_id'}],
+            [{'field': 'count', 'direction': 'asc'}],
+            1,
+            tiebreaker=True,
+        )
+
+        assert [foo.id for foo in query if foo.bar_id == 3] == [6]
+
+    def test_single_group(self, session):
+        query = apply_top_n(
+            session.query(Foo), [], [{'field': 'count', 'direction': 'desc'}],
+            3,
+        )
+
+        assert [foo.id for foo in query] == [8, 5, 4]
+
+    def test_single_dictionaries(self, session):
+        query = apply_top_n(
+            session.query(Foo),
+            {'field': 'bar_id'},
+            {'field': 'count', 'direction': 'desc'},
+            1,
+        )
+
+        # foos 6 and 7 of bar 3 have the same count
+        assert sorted(foo.id for foo in query if foo.bar_id != 3) == [4, 5, 8]
+
+    def test_returns_entities(self, session):
+        query = apply_top_n(
+            session.query(Foo), [{'field': 'bar_id'}],
+            [{'field': 'id', 'direction': 'asc'}], 1,
+        )
+
+        assert all(isinstance(foo, Foo) for foo in query)
+        assert str(query.statement).count('row_number()') == 1
+
+
+class TestApplyTopNErrors(object):
+
+    @pytest.mark.parametrize('n', [0, -1])
+    def test_invalid_n(self, session, n):
+        with pytest.raises(InvalidPage) as err:
+            apply_top_n(session.query(Foo), [], [], n)
+
+        assert error_value(err) == (
+            'Top-N size should be positive: {}'.format(n)
+        )
+
+    @pytest.mark.parametrize('query_entities', [(Foo, Bar), (Foo.id,)])
+    def test_not_a_single_model(self, session, query_entities):
+        with pytest.raises(BadQuery) as err:
+            apply_top_n(session.query(*query_entities), [], [], 1)
+
+        assert error_value(err) == (
+            'Top-N queries need a query of a single model.'
+        )
+
+    @pytest.mark.parametrize('group_spec, expected_error', [
+        ([{'model': 'Foo'}], '`field` is a mandatory attribute.'),
+        (['bar_id'], 'Group spec `bar_id` should be a dictionary.'),
+    ])
+    def test_invalid_group(self, session, group_spec, expected_error):
+        with pytest.raises(BadGroupFormat) as err:
+            apply_top_n(session.query(Foo), group_spec, [], 1)
+
+        assert error_value(err) == expected_error
+
+    def test_group_field_not_found(self, session):
+        with pytest.raises(FieldNotFound) as err:
+            apply_top_n(session.query(Foo), [{'field': 'baz_id'}], [], 1)
+
+        assert error_value(err) == (
+            "Model <class 'test.models.Foo'> has no column `baz_id`."
+        )
+
+    def test_invalid_sort(self, session):
+        with pytest.raises(BadSortFormat) as err:
+            apply_top_n(session.query(Foo), [], [{'field': 'id'}], 1)
+
+        assert error_value(err) == (
+            '`field` and `direction` are mandatory attributes.'
+        )
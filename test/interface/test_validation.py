@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from sqlalchemy_filters.exceptions import (
+    BadFilterFormat, BadLoadFormat, BadSortFormat, BadSpec, FieldNotFound,
+    InvalidSpec
+)
+from sqlalchemy_filters.models import sqlalchemy_version_lt
+from sqlalchemy_filters.validation import SpecError, SpecValidator
+from test import error_value
+from test.models import Bar, Foo, Garply, Qux
+
+
+@pytest.fixture
+def validator():
+    return SpecValidator([Foo, Bar], default_model=Foo)
+
+
+class TestSpecValidator(object):
+
+    def test_valid_specs(self, validator):
+        errors = validator.validate(
+            filter_spec={
+                'or': [
+                    {'field': 'name', 'op': '==', 'value': 'name_1'},
+                    {'model': 'Bar', 'field': 'count_square', 'op': 'is_null'},
+                ]
+            },
+            sort_spec={'model': 'Bar', 'field': 'id', 'direction': 'asc'},
+            load_spec=['name', 'three_times_count'],
+        )
+
+        assert errors == []
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+    )
+    def test_json_paths(self):
+        validator = SpecValidator([Garply])
+
+        errors = validator.validate(filter_spec=[
+            {'field': 'attrs.color', 'value': 'red'},
+            {'field': 'attrs.col-or', 'value': 'red'},
+        ])
+
+        assert [(error.path, error.exception) for error in errors] == [
+            ('filters[1]', FieldNotFound)
+        ]
+
+    def test_no_specs(self, validator):
+        assert validator.validate() == []
+
+    def test_reports_all_filter_errors(self, validator):
+        filter_spec = [
+            {'field': 'name', 'op': 'op_not_valid', 'value': 'name_1'},
+            {
+                'and': [
+                    {'field': 'invalid_field', 'value': 1},
+                    {'model': 'Qux', 'field': 'id', 'value': 1},
+                    {'field': 'id', 'op': '=='},
+                ]
+            },
+            {'not': [{'field': 'id', 'value': 1}, {'field': 'id', 'value': 2}]},
+            {'or': 'not a list'},
+            'not a dict',
+        ]
+
+        errors = validator.validate(filter_spec=filter_spec)
+
+        assert errors == [
+            SpecError(
+                'filters[0]', BadFilterFormat,
+                'Operator `op_not_valid` not valid.'
+            ),
+            SpecError(
+                'filters[1].and[0]', FieldNotFound,
+                "Model <class 'test.models.Foo'> has no column "
+                "`invalid_field`."
+            ),
+            SpecError(
+                'filters[1].and[1]', BadSpec,
+                'The query does not contain model `Qux`.'
+            ),
+            SpecError(
+                'filters[1].and[2]', BadFilterFormat,
+                '`value` must be provided.'
+            ),
+            SpecError(
+                'filters[2].not', BadFilterFormat, '`not` must have one argument'
+            ),
+            SpecError(
+                'filters[3].or', BadFilterFormat,
+                '`or` value must be an iterable across the function arguments'
+            ),
+            SpecError(
+                'filters[4]', BadFilterFormat,
+                'Filter spec `not a dict` should be a dictionary.'
+            ),
+        ]
+
+    def test_reports_filter_value_errors(self):
+        validator = SpecValidator([Qux])
+        filter_spec = [
+            {'field': 'created_at', 'op': 'between', 'value': ['2016-07-12']},
+            {'field': 'created_at', 'op': 'on_date', 'value': 'today'},
+            {'field': 'created_at', 'op': 'in_month', 'value': '2016-13'},
+            {'field': 'created_at', 'op': 'within_last', 'value': '7'},
+            {'field': 'created_at', 'op': 'in_month', 'value': '2016-07'},
+            {'field': 'created_at', 'op': 'within_last', 'value': {'days': 7}},
+        ]
+
+        errors = validator.validate(filter_spec=filter_spec)
+
+        assert errors == [
+            SpecError(
+                'filters[0]', BadFilterFormat,
+                'Value of operator `between` must be a pair of dates.'
+            ),
+            SpecError(
+                'filters[1]', BadFilterFormat,
+                'Value `today` of operator `on_date` is not a date.'
+            ),
+            SpecError(
+                'filters[2]', BadFilterFormat,
+                'Value `2016-13` of operator `in_month` is not a date.'
+            ),
+            SpecError(
+                'filters[3]', BadFilterFormat,
+                'Value `7` of operator `within_last` is not a valid duration.'
+            ),
+        ]
+
+    @pytest.mark.skipif(
+        sqlalchemy_version_lt('1.1'), reason='JSON added in SQLAlchemy 1.1'
+    )
+    def test_reports_json_key_errors(self):
+        validator = SpecValidator([Garply])
+
+        errors = validator.validate(filter_spec=[
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 'color'},
+            {'field': 'attrs', 'op': 'json_has_key', 'value': "a'); --"},
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 1},
+        ])
+
+        assert errors == [
+            SpecError(
+                'filters[1]', BadFilterFormat, "JSON key `a'); --` not valid."
+            ),
+            SpecError('filters[2]', BadFilterFormat, 'JSON key `1` not valid.'),
+        ]
+
+    def test_reports_sort_errors(self, validator):
+        sort_spec = [
+            {'field': 'name', 'direction': 'up'},
+            {'field': 'invalid_field', 'direction': 'asc'},
+            {'field': 'name'},
+            {'field': 'name', 'direction': 'desc'},
+        ]
+
+        errors = validator.validate(sort_spec=sort_spec)
+
+        assert [(error.path, error.exception) for error in errors] == [
+            ('sort[0]', BadSortFormat),
+            ('sort[1]', FieldNotFound),
+            ('sort[2]', BadSortFormat),
+        ]
+
+    def test_reports_aggregate_sort_errors(self, validator):
+        sort_spec = [
+            {'field': 'bar.count', 'aggregate': 'max', 'direction': 'asc'},
+            {'field': 'name', 'aggregate': 'count', 'direction': 'asc'},
+            {'model': 'Bar', 'field': 'foos.size', 'aggregate': 'max',
+             'direction': 'asc'},
+            {'model': 'Bar', 'field': 'foos', 'aggregate': 'avg',
+             'direction': 'asc'},
+            {'model': 'Qux', 'field': 'foos', 'aggregate': 'count',
+             'direction': 'asc'},
+        ]
+
+        errors = validator.validate(sort_spec=sort_spec)
+
+        assert [(error.path, error.exception) for error in errors] == [
+            ('sort[1]', FieldNotFound),
+            ('sort[2]', FieldNotFound),
+            ('sort[3]', BadSortFormat),
+            ('sort[4]', BadSpec),
+        ]
+
+    def test_reports_relationship_load_errors(self, validator):
+        load_spec = [
+            {'relationship': 'bar', 'strategy': 'subquery',
+             'fields': ['name']},
+            {'relationship': 'baz', 'strategy': 'subquery'},
+            {'relationship': 'bar', 'strategy': 'joined',
+             'fields': ['name', 'invalid_field']},
+            {'relationship': 'bar', 'strategy': 'eager'},
+            {'model': 'Qux', 'relationship': 'bar', 'strategy': 'joined'},
+        ]
+
+        errors = validator.validate(load_spec=load_spec)
+
+        assert errors == [
+            SpecError(
+                'loads[1]', FieldNotFound,
+                "Model <class 'test.models.Foo'> has no relationship `baz`."
+            ),
+            SpecError(
+                'loads[2].fields[1]', FieldNotFound,
+                "Model <class 'test.models.Bar'> has no column "
+                "`invalid_field`."
+            ),
+            SpecError(
+                'loads[3]', BadLoadFormat, 'Strategy `eager` not valid.'
+            ),
+            SpecError(
+                'loads[4]', BadSpec, 'The query does not contain model `Qux`.'
+            ),
+        ]
+
+    def test_reports_dotted_load_errors(self, validator):
+        load_spec = [
+            {'fields': ['name', 'bar.name', 'bar.graults.invalid_field']},
+            {'model': 'Bar', 'fields': ['foos.bar.quxs.id']},
+            {'relationship': 'bar', 'strategy': 'subquery',
+             'fields': ['graults.name', 'foos.size']},
+        ]
+
+        errors = validator.validate(load_spec=load_spec)
+
+        assert errors == [
+            SpecError(
+                'loads[0].fields[2]', FieldNotFound,
+                "Model <class 'test.models.Grault'> has no column "
+                "`invalid_field`."
+            ),
+            SpecError(
+                'loads[1].fields[0]', FieldNotFound,
+                "Model <class 'test.models.Bar'> has no relationship `quxs`."
+            ),
+            SpecError(
+                'loads[2].fields[1]', FieldNotFound,
+                "Model <class 'test.models.Foo'> has no column `size`."
+            ),
+        ]
+
+    def test_reports_load_errors(self, validator):
+        load_spec = [
+            {'model': 'Bar', 'fields': ['name', 'invalid_field']},
+            {'model': 'Bar'},
+        ]
+
+        errors = validator.validate(load_spec=load_spec)
+
+        assert errors == [
+            SpecError(
+                'loads[0].fields[1]', FieldNotFound,
+                "Model <class 'test.models.Bar'> has no column "
+                "`invalid_field`."
+            ),
+            SpecError(
+                'loads[1]', BadLoadFormat, '`fields` is a mandatory attribute.'
+            ),
+        ]
+
+    def test_ambiguous_spec_without_default_model(self):
+        validator = SpecValidator([Foo, Bar])
+
+        errors = validator.validate(filter_spec={'field': 'id', 'value': 1})
+
+        assert errors == [
+            SpecError(
+                'filters', BadSpec, 'Ambiguous spec. Please specify a model.'
+            )
+        ]
+
+    def test_single_model_is_the_default_model(self):
+        validator = SpecValidator([Bar])
+
+        assert validator.default_model == 'Bar'
+        assert validator.validate(filter_spec={'field': 'id', 'value': 1}) == []
+
+    def test_validate_many(self, validator):
+        specs = [
+            {'filter_spec': {'field': 'id', 'value': 1}},
+            {'sort_spec': [{'field': 'id', 'direction': 'sideways'}]},
+            {},
+        ]
+
+        results = validator.validate_many(specs)
+
+        assert [len(errors) for errors in results] == [0, 1, 0]
+
+    def test_check(self, validator):
+        filter_spec = [
+            {'field': 'invalid_field', 'value': 1},
+            {'field': 'id', 'op': 'op_not_valid', 'value': 1},
+        ]
+
+        with pytest.raises(InvalidSpec) as err:
+            validator.check(filter_spec=filter_spec)
+
+        expected_error = (
+            "filters[0]: Model <class 'test.models.Foo'> has no column "
+            "`invalid_field`.; filters[1]: Operator `op_not_valid` not valid."
+        )
+        assert expected_error == error_value(err)
+        assert len(err.value.errors) == 2
+
+    def test_check_valid_spec(self, validator):
+        validator.check(filter_spec={'field': 'id', 'value': 1})
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+from sqlalchemy_filters import apply_filters
+from sqlalchemy_filters.exceptions import BadFilterFormat, FieldNotFound
+from test import error_value
+from test.models import Foo, Qux
+
+np = pytest.importorskip('numpy')
+
+from sqlalchemy_filters.vectorized import (  # noqa: E402
+    apply_filters_to_columns, compile_mask
+)
+
+
+ROWS = [
+    {'id': 1, 'name': 'name_1', 'count': 50, 'bar_id': 1},
+    {'id': 2, 'name': 'name_2', 'count': 100, 'bar_id': 2},
+    {'id': 3, 'name': 'name_1', 'count': None, 'bar_id': None},
+    {'id': 4, 'name': 'name_4', 'count': 150, 'bar_id': 4},
+    {'id': 5, 'name': 'other_50%', 'count': 0, 'bar_id': 1},
+]
+
+
+def object_columns():
+    return {
+        name: np.array([row[name] for row in ROWS], dtype=object)
+        for name in ROWS[0]
+    }
+
+
+def typed_columns():
+    return {
+        'id': np.array([row['id'] for row in ROWS]),
+        'name': np.array([row['name'] for row in ROWS]),
+        'count': np.array(
+            [np.nan if row['count'] is None else row['count'] for row in ROWS]
+        ),
+        'bar_id': np.ma.masked_equal(
+            [row['bar_id'] or 0 for row in ROWS], 0
+        ),
+    }
+
+
+@pytest.fixture
+def foos(session):
+    session.add_all([Foo(**row) for row in ROWS])
+    session.commit()
+
+
+class TestSameResultsAsDatabase(object):
+
+    @pytest.mark.parametrize('filter_spec', [
+        [],
+        {'field': 'count', 'op': 'is_null'},
+        {'field': 'bar_id', 'op': 'is_not_null'},
+        {'field': 'name', 'op': '==', 'value': 'name_1'},
+        {'field': 'count', 'op': 'eq', 'value': None},
+        {'field': 'bar_id', 'op': '!=', 'value': None},
+        {'field': 'count', 'op': '!=', 'value': 50},
+        {'field': 'count', 'op': '>', 'value': 50},
+        {'field': 'count', 'op': 'ge', 'value': 50},
+        {'field': 'bar_id', 'op': '<', 'value': 2},
+        {'field': 'count', 'op': 'le', 'value': 100},
+        {'field': 'name', 'op': 'like', 'value': 'name%'},
+        {'field': 'name', 'op': 'like', 'value': '%1'},
+        {'field': 'name', 'op': 'like', 'value': '%e_%'},
+        {'field': 'name', 'op': 'like', 'value': '%50%'},
+        {'field': 'name', 'op': 'like', 'value': 'name_4'},
+        {'field': 'name', 'op': 'ilike', 'value': 'NAME_%'},
+        {'field': 'name', 'op': 'ilike', 'value': 'NAME'},
+        {'field': 'name', 'op': 'not_ilike', 'value': '%_1'},
+        {'field': 'count', 'op': 'in', 'value': [0, 50, 150]},
+        {'field': 'bar_id', 'op': 'in', 'value': [2, None]},
+        {'field': 'count', 'op': 'not_in', 'value': [50]},
+        {'field': 'bar_id', 'op': 'not_in', 'value': [2, None]},
+        {'field': 'count', 'op': 'in', 'value': []},
+        {'field': 'count', 'op': 'not_in', 'value': []},
+        [
+            {'field': 'name', 'value': 'name_1'},
+            {'field': 'count', 'op': '>', 'value': 10},
+        ],
+        {'or': [
+            {'field': 'count', 'op': '>', 'value': 100},
+            {'field': 'name', 'value': 'name_1'},
+        ]},
+        {'or': [
+            {'field': 'count', 'op': '>', 'value': 1000},
+            {'field': 'bar_id', 'op': '==', 'value': 1},
+        ]},
+        {'not': [{'field': 'count', 'op': '>', 'value': 50}]},
+        {'not': [{'or': [
+            {'field': 'count', 'op': '==', 'value': 50},
+            {'field': 'name', 'op': '==', 'value': 'name_2'},
+        ]}]},
+        {'not': [{'and': [
+            {'field': 'count', 'op': '>', 'value': 0},
+            {'field': 'bar_id', 'op': '==', 'value': 1},
+        ]}]},
+    ])
+    @pytest.mark.parametrize('columns', [object_columns, typed_columns])
+    def test_same_results(self, session, foos, filter_spec, columns):
+        expected = sorted(
+            foo.id for foo in apply_filters(session.query(Foo), filter_spec)
+        )
+
+        result = apply_filters_to_columns(columns(), filter_spec)
+
+        assert sorted(result['id'].tolist()) == expected
+
+
+def qux_rows():
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return [
+        {
+            'id': 1, 'name': 'name_1', 'created_at': datetime.date(2016, 6, 30),
+            'execution_time': datetime.datetime(2016, 6, 30, 23, 30),
+        },
+        {
+            'id': 2, 'name': 'name_2', 'created_at': datetime.date(2016, 7, 1),
+            'execution_time': datetime.datetime(2016, 7, 1),
+        },
+        {
+            'id': 3, 'name': 'name_3', 'created_at': datetime.date(2016, 7, 31),
+            'execution_time': datetime.datetime(2016, 7, 31, 23, 59, 59),
+        },
+        {'id': 4, 'name': 'name_4', 'created_at': None, 'execution_time': None},
+        {
+            'id': 5, 'name': 'name_5',
+            'created_at': (now - datetime.timedelta(days=3)).date(),
+            'execution_time': now - datetime.timedelta(days=3),
+        },
+        {
+            'id': 6, 'name': 'name_6',
+            'created_at': (now - datetime.timedelta(hours=1)).date(),
+            'execution_time': now - datetime.timedelta(hours=1),
+        },
+    ]
+
+
+def qux_object_columns(rows):
+    return {
+        name: np.array([row[name] for row in rows], dtype=object)
+        for name in rows[0]
+    }
+
+
+def qux_typed_columns(rows):
+    return {
+        'id': np.array([row['id'] for row in rows]),
+        'created_at': np.array(
+            [row['created_at'] for row in rows], dtype='datetime64[D]'
+        ),
+        'execution_time': np.array(
+            [row['execution_time'] for row in rows], dtype='datetime64[us]'
+        ),
+    }
+
+
+class TestDatesSameResultsAsDatabase(object):
+
+    @pytest.fixture
+    def quxs(self, session):
+        rows = qux_rows()
+        session.add_all([Qux(**row) for row in rows])
+        session.commit()
+        return rows
+
+    @pytest.mark.parametrize('filter_spec', [
+        {
+            'field': 'created_at', 'op': 'between',
+            'value': ['2016-07-01', '2016-07-31'],
+        },
+        {
+            'field': 'execution_time', 'op': 'between',
+            'value': ['2016-06-30T23:30:00', '2016-07-31T23:59:59'],
+        },
+        {
+            'field': 'execution_time', 'op': 'between',
+            'value': ['2016-07-01T00:30:00+01:00', '2016-08-01'],
+        },
+        {'field': 'created_at', 'op': 'on_date', 'value': '2016-07-01'},
+        {'field': 'execution_time', 'op': 'on_date', 'value': '2016-06-30'},
+        {'field': 'created_at', 'op': 'in_month', 'value': '2016-07'},
+        {
+            'field': 'execution_time', 'op': 'in_month',
+            'value': datetime.date(2016, 6, 15),
+        },
+        {'field': 'created_at', 'op': 'within_last', 'value': 7},
+        {
+            'field': 'execution_time', 'op': 'within_last',
+            'value': {'hours': 2},
+        },
+        {'not': [{'field': 'created_at', 'op': 'in_month', 'value': '2016-07'}]},
+    ])
+    @pytest.mark.parametrize('columns', [qux_object_columns, qux_typed_columns])
+    def test_same_results(self, session, quxs, filter_spec, columns):
+        expected = sorted(
+            qux.id for qux in apply_filters(session.query(Qux), filter_spec)
+        )
+
+        result = apply_filters_to_columns(columns(quxs), filter_spec)
+
+        assert sorted(result['id'].tolist()) == expected
+
+
+class TestCompileMask(object):
+
+    def test_mask(self):
+        mask = compile_mask({'field': 'count', 'op': '<', 'value': 100})
+
+        assert mask(object_columns()).tolist() == [
+            True, False, False, False, True
+        ]
+
+    def test_filters_every_column(self):
+        result = apply_filters_to_columns(
+            typed_columns(), {'field': 'id', 'op': '>', 'value': 3}
+        )
+
+        assert result['name'].tolist() == ['name_4', 'other_50%']
+        assert result['count'].tolist() == [150, 0]
+
+    def test_no_columns(self):
+        assert compile_mask([])({}).tolist() == []
+
+    def test_comparison_with_null(self):
+        mask = compile_mask({'field': 'count', 'op': '>', 'value': None})
+        not_mask = compile_mask(
+            {'not': [{'field': 'count', 'op': '>', 'value': None}]}
+        )
+
+        assert not mask(object_columns()).any()
+        assert not not_mask(object_columns()).any()
+
+    def test_datetime_nulls(self):
+        columns = {
+            'created_at': np.array(['2016-07-12', 'NaT'], dtype='datetime64[D]')
+        }
+        mask = compile_mask(
+            {'not': [{'field': 'created_at', 'op': '>', 'value': '2016-07-13'}]}
+        )
+
+        assert mask(columns).tolist() == [True, False]
+
+    def test_datetime_values(self):
+        columns = {
+            'created_at': np.array(['2016-07-12', 'NaT'], dtype='datetime64[D]')
+        }
+        mask = compile_mask({
+            'field': 'created_at', 'op': '<',
+            'value': datetime.date(2016, 7, 13),
+        })
+
+        assert mask(columns).tolist() == [True, False]
+
+    def test_any(self):
+        columns = {
+            'tags': np.array([['a', 'b'], ['b'], None, ['b', None]], dtype=object)
+        }
+
+        any_mask = compile_mask({'field': 'tags', 'op': 'any', 'value': 'a'})
+        not_any_mask = compile_mask(
+            {'field': 'tags', 'op': 'not_any', 'value': 'a'}
+        )
+
+        assert any_mask(columns).tolist() == [True, False, False, False]
+        assert not_any_mask(columns).tolist() == [False, True, False, False]
+
+    def test_search(self):
+        columns = {'name': np.array(['pie with apple', 'apple crumble'])}
+        mask = compile_mask({'field': 'name', 'op': 'search', 'value': 'pie'})
+
+        assert mask(columns).tolist() == [True, False]
+
+    def test_json_operators(self):
+        columns = {
+            'attrs': np.array([
+                {'color': 'red', 'tags': ['a', 'b']}, {'tags': ['b']}, None,
+            ], dtype=object)
+        }
+        contains = compile_mask(
+            {'field': 'attrs', 'op': 'json_contains', 'value': {'tags': ['a']}}
+        )
+        has_key = compile_mask(
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 'color'}
+        )
+        not_has_key = compile_mask({'not': [
+            {'field': 'attrs', 'op': 'json_has_key', 'value': 'color'}
+        ]})
+
+        assert contains(columns).tolist() == [True, False, False]
+        assert has_key(columns).tolist() == [True, False, False]
+        assert not_has_key(columns).tolist() == [False, True, False]
+
+    def test_match_cannot_be_evaluated(self):
+        with pytest.raises(BadFilterFormat) as err:
+            compile_mask({'field': 'name', 'op': 'match', 'value': 'a'})
+
+        expected_error = 'Operator `match` cannot be evaluated with NumPy.'
+        assert expected_error == error_value(err)
+
+    def test_missing_column(self):
+        mask = compile_mask({'field': 'invalid_field', 'value': 1})
+
+        with pytest.raises(FieldNotFound) as err:
+            mask(object_columns())
+
+        assert 'Column `invalid_field` not found.' == error_value(err)
+
+    def test_numpy_not_installed(self, monkeypatch):
+        monkeypatch.setattr('sqlalchemy_filters.vectorized.np', None)
+
+        with pytest.raises(ImportError) as err:
+            compile_mask({'field': 'count', 'op': '<', 'value': 100})
+
+        assert 'NumPy is required to compile filters to masks.' == (
+            error_value(err)
+        )
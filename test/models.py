@@ -1,13 +1,20 @@
 # -*- coding: utf-8 -*-
 
 from sqlalchemy import (
-    Column, Date, DateTime, ForeignKey, Integer, String, Time
+    Column, Date, DateTime, ForeignKey, Index, Integer, LargeBinary, String,
+    Table, Text, Time
 )
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property, hybrid_method
 from sqlalchemy.orm import relationship
 
+try:
+    from sqlalchemy.types import JSON
+except ImportError:  # pragma: no cover
+    # SQLAlchemy < 1.1, where JSON paths are not supported
+    from sqlalchemy_utils import JSONType as JSON
+
 
 class Base(object):
     id = Column(Integer, primary_key=True)
@@ -31,7 +38,7 @@ class Foo(Base):
 
     __tablename__ = 'foo'
 
-    bar_id = Column(Integer, ForeignKey('bar.id'), nullable=True)
+    bar_id = Column(Integer, ForeignKey('bar.id'), nullable=True, index=True)
     bar = relationship('Bar', back_populates='foos')
 
 
@@ -39,6 +46,9 @@ class Bar(Base):
 
     __tablename__ = 'bar'
     foos = relationship('Foo', back_populates='bar')
+    graults = relationship(
+        'Grault', secondary='bar_grault', back_populates='bars'
+    )
 
 
 class Baz(Base):
@@ -51,12 +61,51 @@ class Baz(Base):
 class Qux(Base):
 
     __tablename__ = 'qux'
+    __table_args__ = (
+        Index('ix_qux_created_at_name', 'created_at', 'name'),
+    )
 
     created_at = Column(Date)
     execution_time = Column(DateTime)
     expiration_time = Column(Time)
 
 
+bar_grault = Table(
+    'bar_grault', Base.metadata,
+    Column('bar_id', Integer, ForeignKey('bar.id'), primary_key=True),
+    Column('grault_id', Integer, ForeignKey('grault.id'), primary_key=True),
+)
+
+
+class Grault(Base):
+
+    __tablename__ = 'grault'
+    bars = relationship(
+        'Bar', secondary='bar_grault', back_populates='graults'
+    )
+
+
+class Garply(Base):
+
+    __tablename__ = 'garply'
+
+    attrs = Column(JSON, nullable=True)
+    waldos = relationship('Waldo', back_populates='garply')
+
+
+class Waldo(Base):
+
+    __tablename__ = 'waldo'
+
+    garply_id = Column(Integer, ForeignKey('garply.id'), nullable=True)
+    description = Column(Text, nullable=True)
+    thumbnail = Column(LargeBinary, nullable=True)
+    summary = Column(String(2000), nullable=True)
+    code = Column(String(10), nullable=True, info={'heavy': True})
+    notes = Column(Text, nullable=True, info={'heavy': False})
+    garply = relationship('Garply', back_populates='waldos')
+
+
 class Corge(BasePostgresqlSpecific):
 
     __tablename__ = 'corge'